@@ -0,0 +1,245 @@
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import cv2
+import numpy as np
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QRectF, QPointF, QT_VERSION_STR
+
+from utils import (resource_path, convert_qpixmap_to_opencv, convert_opencv_to_qpixmap, pixmap_from_array,
+                   apply_blur, apply_pixelate, detect_qr_content)
+
+FRAME_SIZES = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+    "multi": (7680, 1440),
+}
+DEFAULT_BASELINE = resource_path(os.path.join("benchmarks", "baseline.json"))
+DEFAULT_TOLERANCE = 0.25
+QR_OFFSET = 64
+QR_SIZE = 400
+
+def synthetic_frame(width, height, seed=0):
+    # Flat panels, borders and text look enough like a desktop for the codecs and filters
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), (46, 42, 40), np.uint8)
+    for _ in range(max(8, width * height // 200000)):
+        x, y = int(rng.integers(0, width - 50)), int(rng.integers(0, height - 50))
+        w, h = int(rng.integers(50, 900)), int(rng.integers(50, 600))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, -1)
+        cv2.rectangle(img, (x, y), (x + w, y + h), (200, 200, 200), 1)
+        for line in range(y + 20, min(y + h, height) - 5, 22):
+            cv2.putText(img, "SparkyShot benchmark text", (x + 8, line), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5, (20, 20, 20), 1, cv2.LINE_AA)
+    qr = cv2.QRCodeEncoder.create().encode("https://example.com/sparkyshot")
+    qr = cv2.resize(qr, (QR_SIZE - 80, QR_SIZE - 80), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=255)
+    img[QR_OFFSET:QR_OFFSET + QR_SIZE, QR_OFFSET:QR_OFFSET + QR_SIZE] = qr[:, :, None]
+    return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+
+def measure(func, repeat, setup=None):
+    times = []
+    for i in range(repeat + 1):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if i > 0: times.append(elapsed)
+    return {"median_ms": statistics.median(times), "min_ms": min(times),
+            "mean_ms": statistics.fmean(times), "runs": repeat}
+
+def bench_utils(frame, pixmap, repeat):
+    h, w = frame.shape[:2]
+    rx, ry, rw, rh = w // 4, h // 4, min(800, w // 2), min(600, h // 2)
+    # The filters work in place; each timed call gets an untouched copy, made outside the timing
+    work = {}
+
+    def fresh_frame():
+        work["frame"] = frame.copy()
+
+    return {
+        "convert_qpixmap_to_opencv": measure(lambda: convert_qpixmap_to_opencv(pixmap), repeat),
+        "convert_opencv_to_qpixmap": measure(lambda: convert_opencv_to_qpixmap(frame), repeat),
+        "pixmap_from_array": measure(lambda: pixmap_from_array(frame), repeat),
+        "apply_blur": measure(lambda: apply_blur(work["frame"], rx, ry, rw, rh, 51), repeat, fresh_frame),
+        "apply_pixelate": measure(lambda: apply_pixelate(work["frame"], rx, ry, rw, rh, 10), repeat, fresh_frame),
+    }
+
+def wait_for_pyramid(item, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while item.levels is None and time.perf_counter() < deadline:
+        QApplication.processEvents()
+        time.sleep(0.005)
+
+def bench_editor(pixmap, repeat):
+    from editor import EditorWindow
+    editor = EditorWindow(pixmap, resource_path("icons"))
+    w, h = pixmap.width(), pixmap.height()
+    rect = QRectF(w / 4, h / 4, min(800, w / 2), min(600, h / 2))
+    p1, p2 = QPointF(w / 3, h / 3), QPointF(w / 2, h / 2)
+
+    arrow_size = editor.draw_size * 3
+    arrow_rect = QRectF(p1, p2).normalized().adjusted(-arrow_size, -arrow_size, arrow_size, arrow_size)
+    # Time the edits the way the editor applies them: paint, then update the canvas tiles
+    wait_for_pyramid(editor.image_item)
+
+    def shape(tool):
+        editor.paint_shape(tool, rect)
+        editor.refresh_canvas(rect)
+
+    def arrow():
+        editor.paint_arrow(p1, p2)
+        editor.refresh_canvas(arrow_rect)
+
+    def pen_stroke():
+        editor.paint_on_pixmap("pen", p1, p2)
+        editor.refresh_canvas(QRectF(p1, p2))
+
+    results = {
+        "editor_push_undo": measure(editor.push_undo, repeat),
+        "editor_paint_rect": measure(lambda: shape("rect"), repeat),
+        "editor_paint_blur": measure(lambda: shape("blur"), repeat),
+        "editor_paint_pixelate": measure(lambda: shape("pixelate"), repeat),
+        "editor_paint_arrow": measure(arrow, repeat),
+        "editor_pen_stroke": measure(pen_stroke, repeat),
+        # Display and pyramid upkeep alone, which scales with the dirty rect rather than the frame
+        "editor_refresh_dirty": measure(lambda: editor.refresh_canvas(rect), repeat),
+    }
+    editor.deleteLater()
+    return results
+
+def bench_snipper(frame, repeat):
+    from snipper import Snipper
+    snipper = Snipper(resource_path("icons"), "region", frame=frame)
+    snipper.show()
+    QApplication.processEvents()
+    h, w = frame.shape[:2]
+    snipper.start_selection(QPointF(w / 4, h / 4))
+    step = [0]
+
+    def move():
+        step[0] += 1
+        snipper.update_selection(QPointF(w / 2 + step[0] % 50, h / 2 + step[0] % 30))
+        snipper.view.viewport().repaint()
+
+    results = {"snipper_overlay_update": measure(move, repeat)}
+    snipper.is_selecting = False
+    snipper.hide()
+    snipper.deleteLater()
+    return results
+
+def bench_diff(frame, repeat):
+    from diff import compare, images_differ
+    changed = frame.copy()
+    h, w = frame.shape[:2]
+    changed[h // 2:h // 2 + 40, w // 3:w // 3 + 200] = 0
+    same = frame.copy()
+    return {
+        "diff_identical": measure(lambda: compare(frame, same, shift=(0, 0)), repeat),
+        "diff_changed": measure(lambda: compare(frame, changed, shift=(0, 0)), repeat),
+        "diff_aligned": measure(lambda: compare(frame, changed), repeat),
+        "diff_early_exit": measure(lambda: images_differ(frame, changed), repeat),
+    }
+
+def run_benchmarks(sizes, repeat):
+    results = {}
+    qr_done = False
+    for size_name in sizes:
+        width, height = FRAME_SIZES[size_name]
+        frame = synthetic_frame(width, height)
+        pixmap = pixmap_from_array(frame)
+        groups = [bench_utils(frame, pixmap, repeat), bench_editor(pixmap, repeat), bench_snipper(frame, repeat),
+                  bench_diff(frame, repeat)]
+        if not qr_done:
+            crop = frame[:QR_OFFSET * 2 + QR_SIZE, :QR_OFFSET * 2 + QR_SIZE]
+            groups.append({"detect_qr_content": measure(lambda: detect_qr_content(crop), repeat)})
+            qr_done = True
+        for group in groups:
+            for name, stats in group.items():
+                key = name if name == "detect_qr_content" else f"{name}[{size_name}]"
+                results[key] = stats
+                print(f"{key:<45} {stats['median_ms']:>10.2f} ms", flush=True)
+        QApplication.processEvents()
+    return results
+
+def environment_info():
+    return {"python": platform.python_version(), "qt": QT_VERSION_STR, "opencv": cv2.__version__,
+            "numpy": np.__version__, "machine": platform.machine(), "system": platform.system(),
+            "qpa": os.environ.get("QT_QPA_PLATFORM", "")}
+
+def missing_entries(results, baseline):
+    # Benchmarks the baseline has no numbers for, e.g. ones added since it was recorded
+    recorded = baseline.get("results", {})
+    return [name for name in results if not recorded.get(name)]
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'benchmark':<45} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<45} {'-':>10} {stats['median_ms']:>10.2f} {'-':>7} MISSING")
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else 1.0
+        flag = " REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<45} {base['median_ms']:>10.2f} {stats['median_ms']:>10.2f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SparkyShot hot-path benchmarks")
+    parser.add_argument("--sizes", default=",".join(FRAME_SIZES), help="Comma separated frame sizes: " + ", ".join(FRAME_SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="Only measure, without checking a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before a run counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in FRAME_SIZES]
+    if unknown:
+        parser.error("unknown sizes: " + ", ".join(unknown))
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    report = {"environment": environment_info(), "results": run_benchmarks(sizes, args.repeat)}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if args.no_compare:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nWARNING: baseline {args.baseline} not found; run with --save-baseline or --no-compare", file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if compare(report["results"], baseline, args.tolerance):
+        return 1
+    missing = missing_entries(report["results"], baseline)
+    if missing:
+        print(f"\nWARNING: {len(missing)} benchmarks have no baseline entry in {args.baseline}; "
+              "re-record it with --save-baseline", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import math
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PyQt6.QtWidgets import QGraphicsItem
+from PyQt6.QtCore import Qt, QObject, QRect, QRectF, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QPainter
+
+from utils import frame_conversions, array_from_image
+
+TILE_SIZE = 512
+TILE_CACHE_LIMIT = 96
+CANVAS_FORMATS = (QImage.Format.Format_RGB32, QImage.Format.Format_ARGB32_Premultiplied)
+
+def canvas_image(image):
+    if image.format() in CANVAS_FORMATS:
+        return image
+    frame_conversions["canvas_image"] += 1
+    return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+def downsample(region, out_w, out_h):
+    # 2x2 box filter: every output pixel depends only on its own 2x2 input block,
+    # so updating a dirty rect gives exactly the same pixels as a full rebuild
+    pad_y, pad_x = 2 * out_h - region.shape[0], 2 * out_w - region.shape[1]
+    if pad_x > 0 or pad_y > 0:
+        region = cv2.copyMakeBorder(region, 0, max(pad_y, 0), 0, max(pad_x, 0), cv2.BORDER_REPLICATE)
+    region = region[:2 * out_h, :2 * out_w].astype(np.uint16)
+    total = region[0::2, 0::2] + region[1::2, 0::2] + region[0::2, 1::2] + region[1::2, 1::2]
+    return ((total + 2) >> 2).astype(np.uint8)
+
+def build_levels(base):
+    levels = []
+    prev = base
+    while max(prev.shape[0], prev.shape[1]) > TILE_SIZE:
+        prev = downsample(prev, (prev.shape[1] + 1) // 2, (prev.shape[0] + 1) // 2)
+        levels.append(prev)
+    return levels
+
+class PyramidSignals(QObject):
+    built = pyqtSignal(int, object)
+
+    def __init__(self, item):
+        super().__init__()
+        self.item = item
+        self.built.connect(self.on_built)
+
+    def on_built(self, generation, levels):
+        self.item.pyramid_built(generation, levels)
+
+class TiledImageItem(QGraphicsItem):
+    # Full resolution is drawn straight from the source; zoomed-out views use cached
+    # tiles from a mipmap pyramid that is built on a worker thread once per image.
+    # A QImage source is shown through a display pixmap that is only re-uploaded
+    # over the dirty rect of each edit.
+    def __init__(self, source):
+        super().__init__()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self.source = None
+        self.display = None
+        self.width = 0
+        self.height = 0
+        self.levels = None
+        self.format = QImage.Format.Format_RGB32
+        self.generation = 0
+        self.building = False
+        self.pending_dirty = []
+        self.tiles = OrderedDict()
+        self.signals = PyramidSignals(self)
+        self.set_source(source)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.width, self.height)
+
+    def set_source(self, source, dirty=None):
+        size_changed = source.width() != self.width or source.height() != self.height
+        self.source = source
+        if size_changed:
+            self.prepareGeometryChange()
+            self.width, self.height = source.width(), source.height()
+        if dirty is None or size_changed:
+            self.display = source if isinstance(source, QPixmap) else QPixmap.fromImage(source)
+            self.tiles.clear()
+            self.start_pyramid()
+            self.update()
+            return
+        dirty = dirty.intersected(QRect(0, 0, self.width, self.height))
+        if dirty.isEmpty(): return
+        self.update_display(dirty)
+        if self.levels is not None:
+            self.update_pyramid(dirty)
+        else:
+            self.pending_dirty.append(dirty)
+        for key in [k for k in self.tiles if self.tile_rect(*k).intersects(dirty)]:
+            del self.tiles[key]
+        self.update(QRectF(dirty))
+
+    def update_display(self, dirty):
+        if isinstance(self.source, QPixmap):
+            self.display = self.source
+            return
+        painter = QPainter(self.display)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.drawImage(dirty, self.source, dirty)
+        painter.end()
+
+    def source_image(self, rect=None):
+        if isinstance(self.source, QPixmap):
+            image = self.source.toImage() if rect is None else self.source.copy(rect).toImage()
+        else:
+            image = self.source if rect is None else self.source.copy(rect)
+        return canvas_image(image)
+
+    def start_pyramid(self):
+        self.generation += 1
+        self.levels = None
+        self.pending_dirty = []
+        self.building = False
+        if self.level_count() == 1:
+            self.levels = []
+            return
+        image = self.source_image()
+        if image is self.source:
+            # The editor keeps painting into its canvas while the worker reads
+            image = image.copy()
+        self.format = image.format()
+        generation = self.generation
+        signals = self.signals
+
+        def work():
+            signals.built.emit(generation, build_levels(array_from_image(image, writable=False)))
+
+        self.building = True
+        threading.Thread(target=work, daemon=True).start()
+
+    def pyramid_built(self, generation, levels):
+        if generation != self.generation: return
+        self.building = False
+        self.levels = levels
+        for dirty in self.pending_dirty:
+            self.update_pyramid(dirty)
+        self.pending_dirty = []
+        self.tiles.clear()
+        self.update()
+
+    def update_pyramid(self, dirty):
+        x0, y0, x1, y1 = dirty.left(), dirty.top(), dirty.right() + 1, dirty.bottom() + 1
+        prev = None
+        for target in self.levels:
+            nx0, ny0, nx1, ny1 = x0 // 2, y0 // 2, (x1 + 1) // 2, (y1 + 1) // 2
+            nx1, ny1 = min(nx1, target.shape[1]), min(ny1, target.shape[0])
+            if nx1 <= nx0 or ny1 <= ny0: break
+            src = QRect(nx0 * 2, ny0 * 2, (nx1 - nx0) * 2, (ny1 - ny0) * 2)
+            if prev is None:
+                src = src.intersected(QRect(0, 0, self.width, self.height))
+                image = self.source_image(src)
+                region = array_from_image(image, writable=False)
+            else:
+                region = prev[src.top():src.top() + src.height(), src.left():src.left() + src.width()]
+            target[ny0:ny1, nx0:nx1] = downsample(region, nx1 - nx0, ny1 - ny0)
+            prev = target
+            x0, y0, x1, y1 = nx0, ny0, nx1, ny1
+
+    def memory_usage(self):
+        size = sum(p.width() * p.height() * p.depth() // 8 for p in self.tiles.values())
+        if self.display is not None and self.display is not self.source:
+            size += self.display.width() * self.display.height() * self.display.depth() // 8
+        if self.levels:
+            size += sum(level.nbytes for level in self.levels)
+        return size
+
+    def release_cache(self):
+        self.tiles.clear()
+        self.levels = None
+        self.pending_dirty = []
+        self.building = False
+        self.generation += 1
+
+    def level_count(self):
+        count, size = 1, max(self.width, self.height)
+        while size > TILE_SIZE:
+            size = (size + 1) // 2
+            count += 1
+        return count
+
+    def tile_rect(self, level, tx, ty):
+        extent = TILE_SIZE << level
+        return QRect(tx * extent, ty * extent, extent, extent)
+
+    def tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self.tiles.get(key)
+        if pixmap is not None:
+            self.tiles.move_to_end(key)
+            return pixmap
+        array = self.levels[level - 1]
+        block = np.ascontiguousarray(array[ty * TILE_SIZE:(ty + 1) * TILE_SIZE, tx * TILE_SIZE:(tx + 1) * TILE_SIZE])
+        image = QImage(block.data, block.shape[1], block.shape[0], block.shape[1] * 4, self.format)
+        pixmap = QPixmap.fromImage(image)
+        self.tiles[key] = pixmap
+        if len(self.tiles) > TILE_CACHE_LIMIT:
+            self.tiles.popitem(last=False)
+        return pixmap
+
+    def level_for_scale(self, scale):
+        if scale <= 0 or scale >= 1: return 0
+        return min(int(math.log2(1 / scale)), self.level_count() - 1)
+
+    def paint(self, painter, option, widget=None):
+        scale = painter.worldTransform().m11()
+        bounds = QRect(0, 0, self.width, self.height)
+        exposed = option.exposedRect.toAlignedRect().intersected(bounds)
+        if exposed.isEmpty(): return
+        level = self.level_for_scale(scale)
+        if self.levels is None:
+            # Until the worker delivers the pyramid, draw from full resolution
+            if level > 0 and not self.building:
+                self.start_pyramid()
+            level = 0
+
+        painter.save()
+        painter.setClipRect(QRectF(bounds))
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, scale < 1)
+        if level == 0:
+            painter.drawPixmap(QRectF(exposed), self.display, QRectF(exposed))
+        else:
+            factor = 1 << level
+            extent = TILE_SIZE * factor
+            for ty in range(exposed.top() // extent, exposed.bottom() // extent + 1):
+                for tx in range(exposed.left() // extent, exposed.right() // extent + 1):
+                    pixmap = self.tile(level, tx, ty)
+                    target = QRectF(tx * extent, ty * extent, pixmap.width() * factor, pixmap.height() * factor)
+                    painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        painter.restore()
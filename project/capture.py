@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import statistics
+import numpy as np
+from PyQt6.QtCore import QRect, QRectF, QPointF
+from PyQt6.QtGui import QGuiApplication
+
+from settings import get_setting, set_setting
+from utils import CANVAS_FORMAT, array_from_image
+
+BENCHMARK_RUNS = 3
+
+class Monitor:
+    def __init__(self, logical, ratio, physical):
+        self.logical = QRect(logical)
+        self.ratio = ratio
+        self.physical = QRect(physical)
+
+class MonitorLayout:
+    # Maps between overlay scene coordinates (Qt's logical desktop, shifted so the
+    # top-left screen starts at 0,0) and capture frame pixels (the physical desktop,
+    # shifted the same way). Each monitor maps with its own scale factor.
+    def __init__(self, monitors):
+        self.monitors = list(monitors)
+        self.logical_bounds = QRect()
+        self.bounds = QRect()
+        for monitor in self.monitors:
+            self.logical_bounds = self.logical_bounds.united(monitor.logical)
+            self.bounds = self.bounds.united(monitor.physical)
+
+    @classmethod
+    def from_screens(cls, screens=None):
+        # Qt keeps each screen's native top-left as its logical position and only
+        # divides the size by the scale factor, so mixed-DPI desktops can have gaps
+        screens = QGuiApplication.screens() if screens is None else screens
+        monitors = []
+        for screen in screens:
+            g, r = screen.geometry(), screen.devicePixelRatio()
+            monitors.append(Monitor(g, r, QRect(g.x(), g.y(), round(g.width() * r), round(g.height() * r))))
+        return cls(monitors)
+
+    @classmethod
+    def single(cls, left, top, width, height, ratio=1.0):
+        logical = QRect(left, top, round(width / ratio), round(height / ratio))
+        return cls([Monitor(logical, ratio, QRect(left, top, width, height))])
+
+    def scene_bounds(self):
+        return QRectF(0, 0, self.logical_bounds.width(), self.logical_bounds.height())
+
+    def frame_bounds(self):
+        return QRect(0, 0, self.bounds.width(), self.bounds.height())
+
+    def nearest(self, x, y, logical=True):
+        # The monitor containing the point, or the closest one for points in a gap
+        def distance(monitor):
+            r = monitor.logical if logical else monitor.physical
+            dx = max(r.x() - x, x - (r.x() + r.width()), 0)
+            dy = max(r.y() - y, y - (r.y() + r.height()), 0)
+            return dx * dx + dy * dy
+        return min(self.monitors, key=distance)
+
+    def to_capture(self, pos):
+        x, y = pos.x() + self.logical_bounds.x(), pos.y() + self.logical_bounds.y()
+        m = self.nearest(x, y)
+        return QPointF(m.physical.x() + (x - m.logical.x()) * m.ratio - self.bounds.x(),
+                       m.physical.y() + (y - m.logical.y()) * m.ratio - self.bounds.y())
+
+    def to_scene(self, pos):
+        x, y = pos.x() + self.bounds.x(), pos.y() + self.bounds.y()
+        m = self.nearest(x, y, logical=False)
+        return QPointF(m.logical.x() + (x - m.physical.x()) / m.ratio - self.logical_bounds.x(),
+                       m.logical.y() + (y - m.physical.y()) / m.ratio - self.logical_bounds.y())
+
+    def to_capture_rect(self, rect):
+        # Scene rect -> capture pixels; each corner maps through its own monitor
+        return QRectF(self.to_capture(rect.topLeft()), self.to_capture(rect.bottomRight())).toRect()
+
+    def to_scene_rect(self, rect):
+        return QRectF(self.to_scene(QPointF(rect.topLeft())), self.to_scene(QPointF(rect.x() + rect.width(), rect.y() + rect.height())))
+
+    def tiles(self):
+        # (scene rect, capture rect) per monitor: drawing each capture rect into its
+        # scene rect on a screen of that monitor's scale is a 1:1 pixel copy
+        for m in self.monitors:
+            source = QRectF(m.physical.translated(-self.bounds.x(), -self.bounds.y()))
+            target = QRectF(m.logical.translated(-self.logical_bounds.x(), -self.logical_bounds.y()))
+            yield target, source
+
+class CaptureBackend:
+    # Grabs areas of the virtual desktop as BGRA arrays. Coordinates are desktop
+    # pixels; grab() fills out when given, so callers can hand in pooled buffers.
+    name = None
+
+    def bounds(self):
+        raise NotImplementedError
+
+    def grab(self, left, top, width, height, out=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def layout(self):
+        # Qt's screens when they tile this backend's desktop exactly; otherwise
+        # (a platform that reports screens differently) one monitor at the
+        # primary screen's scale
+        left, top, width, height = self.bounds()
+        layout = MonitorLayout.from_screens()
+        if layout.bounds == QRect(left, top, width, height):
+            return layout
+        primary = QGuiApplication.primaryScreen()
+        return MonitorLayout.single(left, top, width, height, primary.devicePixelRatio() if primary else 1.0)
+
+class MssBackend(CaptureBackend):
+    name = "mss"
+
+    def __init__(self):
+        import mss
+        self.sct = mss.mss()
+
+    def bounds(self):
+        monitor = self.sct.monitors[0]
+        return monitor["left"], monitor["top"], monitor["width"], monitor["height"]
+
+    def grab(self, left, top, width, height, out=None):
+        shot = self.sct.grab({"left": left, "top": top, "width": width, "height": height})
+        raw = np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+        if out is None:
+            return raw.copy()
+        np.copyto(out, raw)
+        return out
+
+    def close(self):
+        self.sct.close()
+
+class QtBackend(CaptureBackend):
+    # QScreen.grabWindow per screen, composed into one frame; works wherever Qt
+    # can read the framebuffer, including Wayland portals and offscreen tests.
+    # Screens are placed by the monitor layout, so mixed scale factors work.
+    name = "qt"
+
+    def __init__(self):
+        self.screens = QGuiApplication.screens()
+        if not self.screens:
+            raise RuntimeError("no screens")
+        self.monitors = MonitorLayout.from_screens(self.screens)
+
+    def bounds(self):
+        rect = self.monitors.bounds
+        return rect.x(), rect.y(), rect.width(), rect.height()
+
+    def layout(self):
+        return self.monitors
+
+    def grab(self, left, top, width, height, out=None):
+        if out is None:
+            out = np.zeros((height, width, 4), np.uint8)
+        elif len(self.screens) > 1:
+            # Gaps between screens of different sizes would keep stale pooled pixels
+            out.fill(0)
+        area = QRect(left, top, width, height)
+        for screen, monitor in zip(self.screens, self.monitors.monitors):
+            geometry, ratio = monitor.physical, monitor.ratio
+            part = area.intersected(geometry)
+            if part.isEmpty(): continue
+            # grabWindow takes logical coordinates relative to the screen
+            x, y = (part.x() - geometry.x()) / ratio, (part.y() - geometry.y()) / ratio
+            pixmap = screen.grabWindow(0, round(x), round(y), round(part.width() / ratio), round(part.height() / ratio))
+            image = pixmap.toImage()
+            if image.format() != CANVAS_FORMAT:
+                image = image.convertToFormat(CANVAS_FORMAT)
+            pixels = array_from_image(image)
+            h, w = min(pixels.shape[0], part.height()), min(pixels.shape[1], part.width())
+            out[part.y() - top:part.y() - top + h, part.x() - left:part.x() - left + w] = pixels[:h, :w]
+        return out
+
+# Tried in this order when nothing is recorded; add new backends here
+BACKENDS = {"mss": MssBackend, "qt": QtBackend}
+
+_backend = None
+
+def available_backends():
+    backends = []
+    for name, cls in BACKENDS.items():
+        try:
+            backends.append(cls())
+        except Exception:
+            continue
+    return backends
+
+def display_signature():
+    screens = QGuiApplication.screens()
+    return ";".join(f"{s.name()}:{s.geometry().getRect()}@{s.devicePixelRatio()}" for s in screens)
+
+def benchmark_backends(runs=BENCHMARK_RUNS):
+    # Median full-desktop grab time per backend, after one warm-up grab each
+    timings = {}
+    backends = available_backends()
+    for backend in backends:
+        try:
+            left, top, width, height = backend.bounds()
+            out = np.empty((height, width, 4), np.uint8)
+            backend.grab(left, top, width, height, out)
+            times = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                backend.grab(left, top, width, height, out)
+                times.append((time.perf_counter() - start) * 1000.0)
+            timings[backend.name] = round(statistics.median(times), 2)
+        except Exception:
+            continue
+        finally:
+            backend.close()
+    return timings
+
+def select_backend(rebenchmark=False):
+    # capture/backend pins a backend by name; "auto" uses the recorded benchmark
+    # for this display layout, running one on first use or when asked to
+    choice = get_setting("capture/backend")
+    if choice != "auto" and choice in BACKENDS and not rebenchmark:
+        try:
+            return set_backend(BACKENDS[choice]())
+        except Exception as e:
+            print(f"SparkyShot: capture backend {choice} unavailable: {e}", file=sys.stderr)
+    record = {}
+    try:
+        record = json.loads(get_setting("capture/benchmark") or "{}")
+    except ValueError:
+        pass
+    if rebenchmark or record.get("display") != display_signature() or record.get("chosen") not in BACKENDS:
+        timings = benchmark_backends()
+        if not timings:
+            raise RuntimeError("no capture backend works on this display")
+        record = {"display": display_signature(), "chosen": min(timings, key=timings.get), "timings": timings}
+        set_setting("capture/benchmark", json.dumps(record))
+    try:
+        return set_backend(BACKENDS[record["chosen"]]())
+    except Exception:
+        # The recorded winner stopped working; measure again
+        if rebenchmark: raise
+        set_setting("capture/benchmark", "")
+        return select_backend(True)
+
+def set_backend(backend):
+    global _backend
+    if _backend is not None:
+        _backend.close()
+    _backend = backend
+    return backend
+
+# One backend for the whole process, so each capture skips opening a new display
+# connection. Captures only run on the GUI thread, which keeps it on one thread.
+def capture_backend():
+    if _backend is None:
+        select_backend()
+    return _backend
+
+def benchmark_report():
+    try:
+        return json.loads(get_setting("capture/benchmark") or "{}")
+    except ValueError:
+        return {}
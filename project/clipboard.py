@@ -0,0 +1,65 @@
+from PyQt6.QtCore import QMimeData, QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication
+
+from pngwriter import encode_png
+from utils import to_canvas_image, array_from_image
+from memory import track_memory
+from tracing import span
+
+QT_IMAGE_MIME = "application/x-qt-image"
+# MIME type -> Qt format name for the encoded formats offered besides PNG
+QT_ENCODED = {"image/bmp": "BMP", "image/jpeg": "JPG", "image/webp": "WEBP"}
+IMAGE_FORMATS = ["image/png"] + list(QT_ENCODED)
+
+class ImageMimeData(QMimeData):
+    # Advertises every image format up front but encodes one only when a paste
+    # target asks for it, caching the bytes for later requests. The image is an
+    # implicitly shared copy of the canvas: no pixels are duplicated unless the
+    # editor paints again, and after the editor closes it holds the only copy.
+    def __init__(self, image):
+        super().__init__()
+        self.image = QImage(image)
+        self.encoded = {}
+        track_memory(self)
+
+    def formats(self):
+        return [QT_IMAGE_MIME] + IMAGE_FORMATS
+
+    def hasFormat(self, mime_type):
+        return mime_type in self.formats()
+
+    def retrieveData(self, mime_type, preferred_type):
+        if mime_type == QT_IMAGE_MIME:
+            return self.image
+        if mime_type not in IMAGE_FORMATS:
+            return super().retrieveData(mime_type, preferred_type)
+        if mime_type not in self.encoded:
+            with span("ImageMimeData.encode", mime_type=mime_type):
+                self.encoded[mime_type] = self.encode(mime_type)
+        return self.encoded[mime_type]
+
+    def encode(self, mime_type):
+        if mime_type == "image/png" and not self.image.hasAlphaChannel():
+            return QByteArray(encode_png(array_from_image(to_canvas_image(self.image), writable=False)))
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        self.image.save(buffer, QT_ENCODED.get(mime_type, "PNG"))
+        return data
+
+    def memory_usage(self):
+        # Only reported while on the clipboard; Qt deletes replaced mime data
+        return {"clipboard": self.image.sizeInBytes() + sum(d.size() for d in self.encoded.values())}
+
+    def trim_memory(self):
+        # Encoded bytes can always be produced again from the image
+        if not self.encoded: return False
+        self.encoded.clear()
+        return True
+
+def copy_image_to_clipboard(image):
+    # The clipboard takes ownership of the mime data and keeps it after the editor closes
+    mime = ImageMimeData(image)
+    QApplication.clipboard().setMimeData(mime)
+    return mime
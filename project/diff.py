@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+from tracing import traced
+
+BLOCK_SIZE = 32
+# Largest per-channel difference still counted as equal, which absorbs dithering
+# and compression noise in captures that went through a lossy format
+DEFAULT_THRESHOLD = 8
+ALIGN_SCALE = 4
+REFINE_SIZE = 512
+
+def gray(img):
+    if img.ndim == 2: return img
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+def phase_shift(before, after):
+    (dx, dy), _ = cv2.phaseCorrelate(before.astype(np.float32), after.astype(np.float32))
+    return dx, dy
+
+@traced
+def estimate_shift(before, after):
+    # Coarse phase correlation on a downscaled frame, then refined at full
+    # resolution on a central patch, so large frames never go through a full FFT
+    h, w = min(before.shape[0], after.shape[0]), min(before.shape[1], after.shape[1])
+    if h < ALIGN_SCALE * 8 or w < ALIGN_SCALE * 8: return 0, 0
+    size = (w // ALIGN_SCALE, h // ALIGN_SCALE)
+    small_a = cv2.resize(gray(before[:h, :w]), size, interpolation=cv2.INTER_AREA)
+    small_b = cv2.resize(gray(after[:h, :w]), size, interpolation=cv2.INTER_AREA)
+    dx, dy = phase_shift(small_a, small_b)
+    dx, dy = round(dx * ALIGN_SCALE), round(dy * ALIGN_SCALE)
+    # Overlap in before's coordinates, where after's pixel is at (x + dx, y + dy)
+    ox0, ox1 = max(0, -dx), min(w, w - dx)
+    oy0, oy1 = max(0, -dy), min(h, h - dy)
+    pw, ph = min(REFINE_SIZE, ox1 - ox0), min(REFINE_SIZE, oy1 - oy0)
+    if pw < 16 or ph < 16: return dx, dy
+    x0, y0 = ox0 + (ox1 - ox0 - pw) // 2, oy0 + (oy1 - oy0 - ph) // 2
+    patch_a = gray(before[y0:y0 + ph, x0:x0 + pw])
+    patch_b = gray(after[y0 + dy:y0 + dy + ph, x0 + dx:x0 + dx + pw])
+    fx, fy = phase_shift(patch_a, patch_b)
+    return dx + round(fx), dy + round(fy)
+
+def align(before, after, shift=None):
+    # Views of the region both captures show, with after's content moved by shift
+    dx, dy = estimate_shift(before, after) if shift is None else shift
+    h = min(before.shape[0] - max(-dy, 0), after.shape[0] - max(dy, 0))
+    w = min(before.shape[1] - max(-dx, 0), after.shape[1] - max(dx, 0))
+    if h <= 0 or w <= 0:
+        raise ValueError("the captures do not overlap")
+    return (before[max(-dy, 0):max(-dy, 0) + h, max(-dx, 0):max(-dx, 0) + w],
+            after[max(dy, 0):max(dy, 0) + h, max(dx, 0):max(dx, 0) + w])
+
+@traced
+def block_mask(before, after, block=BLOCK_SIZE, threshold=DEFAULT_THRESHOLD, limit=0):
+    # One bool per block that holds a pixel differing by more than threshold.
+    # Each band of block rows is first checked with a single norm, so unchanged
+    # bands cost one pass over memory; with limit set the scan stops once that
+    # many changed blocks are found.
+    h, w = before.shape[:2]
+    rows, cols = -(-h // block), -(-w // block)
+    mask = np.zeros((rows, cols), bool)
+    found = 0
+    for row in range(rows):
+        a = before[row * block:(row + 1) * block]
+        b = after[row * block:(row + 1) * block]
+        if cv2.norm(a, b, cv2.NORM_INF) <= threshold: continue
+        delta = cv2.absdiff(a, b)
+        pad = cols * block - w
+        if pad:
+            delta = cv2.copyMakeBorder(delta, 0, 0, 0, pad, cv2.BORDER_CONSTANT, value=0)
+        # Rows of a band laid out as (row, block column, block pixels and channels);
+        # reducing the contiguous last axis is much faster than a strided channel max
+        mask[row] = delta.reshape(delta.shape[0], cols, -1).max(axis=(0, 2)) > threshold
+        found += int(mask[row].sum())
+        if limit and found >= limit: break
+    return mask
+
+def changed_regions(mask, block=BLOCK_SIZE):
+    # Bounding boxes (x, y, w, h) in pixels of connected groups of changed blocks
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    return [(int(x) * block, int(y) * block, int(w) * block, int(h) * block)
+            for x, y, w, h, _ in stats[1:count]]
+
+def images_differ(before, after, threshold=DEFAULT_THRESHOLD):
+    if before.shape != after.shape: return True
+    return bool(block_mask(before, after, threshold=threshold, limit=1).any())
+
+@traced
+def compare(before, after, block=BLOCK_SIZE, threshold=DEFAULT_THRESHOLD, shift=None):
+    # Returns the aligned after view and the changed regions in its coordinates
+    before, after = align(before, after, shift)
+    mask = block_mask(before, after, block, threshold)
+    h, w = after.shape[:2]
+    regions = [(x, y, min(rw, w - x), min(rh, h - y)) for x, y, rw, rh in changed_regions(mask, block)]
+    return after, regions
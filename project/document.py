@@ -0,0 +1,131 @@
+import os
+import json
+import zlib
+import struct
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QPixmap
+
+MAGIC = b"SPARKY\x00\x01"
+CHUNK_HEADER = struct.Struct("<4sI")
+CHUNK_CRC = struct.Struct("<I")
+PNG_QUALITY = 50
+# Rewrite the file once appended annotation chunks outgrow the live annotation data
+COMPACT_FACTOR = 4
+COMPACT_MIN_BYTES = 64 * 1024
+EXTENSION = ".sparky"
+
+class DocumentError(ValueError):
+    pass
+
+def encode_chunk(tag, payload):
+    return CHUNK_HEADER.pack(tag, len(payload)) + payload + CHUNK_CRC.pack(zlib.crc32(tag + payload))
+
+def read_chunks(data):
+    # Yields (tag, offset, length) of every intact chunk; a torn tail from an
+    # interrupted append is ignored
+    pos = len(MAGIC)
+    while pos + CHUNK_HEADER.size <= len(data):
+        tag, length = CHUNK_HEADER.unpack_from(data, pos)
+        start = pos + CHUNK_HEADER.size
+        end = start + length
+        if end + CHUNK_CRC.size > len(data): return
+        (crc,) = CHUNK_CRC.unpack_from(data, end)
+        if crc != zlib.crc32(tag + data[start:end]): return
+        yield tag, start, length
+        pos = end + CHUNK_CRC.size
+
+def encode_pixmap(pixmap):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    pixmap.save(buffer, "PNG", PNG_QUALITY)
+    buffer.close()
+    return bytes(data)
+
+def common_prefix(old, new):
+    count = 0
+    for a, b in zip(old, new):
+        if a != b: break
+        count += 1
+    return count
+
+def ops_payload(keep, ops):
+    return json.dumps({"keep": keep, "ops": ops}, separators=(",", ":")).encode()
+
+class Document:
+    # A .sparky project: the original capture stored once as a PNG chunk, followed by
+    # annotation chunks. Each save appends {"keep": n, "ops": [...]}, meaning "keep the
+    # first n annotations and add these", so re-saving writes only what changed.
+    def __init__(self, path):
+        self.path = path
+        self.saved_ops = None
+        self.base_range = None
+        self.ops_bytes = 0
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise DocumentError(f"{os.path.basename(path)} is not a SparkyShot project")
+        doc = cls(path)
+        ops = []
+        for tag, start, length in read_chunks(data):
+            if tag == b"BASE":
+                doc.base_range = (start, length)
+            elif tag == b"OPS ":
+                try:
+                    update = json.loads(data[start:start + length])
+                except ValueError:
+                    raise DocumentError("corrupt annotation chunk")
+                ops = ops[:update["keep"]] + update["ops"]
+                doc.ops_bytes += length
+        if doc.base_range is None:
+            raise DocumentError(f"{os.path.basename(path)} has no image")
+        base = QPixmap()
+        start, length = doc.base_range
+        if not base.loadFromData(data[start:start + length], "PNG"):
+            raise DocumentError("corrupt image chunk")
+        doc.saved_ops = list(ops)
+        return doc, base, ops
+
+    def save(self, base_pixmap, ops):
+        if self.saved_ops is None or not os.path.exists(self.path):
+            self.write(encode_pixmap(base_pixmap), ops)
+            return
+        keep = common_prefix(self.saved_ops, ops)
+        if keep == len(ops) == len(self.saved_ops): return
+        payload = ops_payload(keep, ops[keep:])
+        if self.ops_bytes + len(payload) > max(COMPACT_FACTOR * len(ops_payload(0, ops)), COMPACT_MIN_BYTES):
+            self.write(self.read_base(), ops)
+            return
+        with open(self.path, "ab") as f:
+            f.write(encode_chunk(b"OPS ", payload))
+            f.flush()
+            os.fsync(f.fileno())
+        self.ops_bytes += len(payload)
+        self.saved_ops = list(ops)
+
+    def read_base(self):
+        start, length = self.base_range
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def write(self, base_png, ops):
+        # Full rewrite through a temporary file; the PNG bytes are reused as they are
+        payload = ops_payload(0, ops)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(CHUNK_HEADER.pack(b"BASE", len(base_png)))
+            base_start = f.tell()
+            f.write(base_png)
+            f.write(CHUNK_CRC.pack(zlib.crc32(b"BASE" + base_png)))
+            f.write(encode_chunk(b"OPS ", payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.base_range = (base_start, len(base_png))
+        self.ops_bytes = len(payload)
+        self.saved_ops = list(ops)
@@ -0,0 +1,64 @@
+import threading
+import cv2
+import numpy as np
+
+BAND_SIZE = 32
+EDGE_THRESHOLD = 40
+MIN_COVERAGE = 0.6
+SNAP_RADIUS = 8
+
+class EdgeIndex:
+    # Row/column projections of strong UI edges, built once per screenshot on a
+    # background thread. Lookups are a slice + argmax over a few pixels.
+    def __init__(self, image, band_size=BAND_SIZE):
+        self.band_size = band_size
+        self.min_count = max(1, int(band_size * MIN_COVERAGE))
+        self.vertical = None
+        self.horizontal = None
+        self.ready = threading.Event()
+        self._thread = threading.Thread(target=self._build, args=(image,), daemon=True)
+        self._thread.start()
+
+    def _build(self, image):
+        if image.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            gray = cv2.cvtColor(image, code)
+        else:
+            gray = image
+        gray = gray.astype(np.int16)
+        h, w = gray.shape
+        band = self.band_size
+
+        # Vertical edges: jumps between column x-1 and x, counted per band of rows
+        v_edges = np.abs(np.diff(gray, axis=1)) > EDGE_THRESHOLD
+        v_bands = -(-h // band)
+        v_edges = np.pad(v_edges, ((0, v_bands * band - h), (1, 0)))
+        self.vertical = v_edges.reshape(v_bands, band, w).sum(axis=1, dtype=np.uint8)
+
+        # Horizontal edges: jumps between row y-1 and y, counted per band of columns
+        h_edges = np.abs(np.diff(gray, axis=0)) > EDGE_THRESHOLD
+        h_bands = -(-w // band)
+        h_edges = np.pad(h_edges, ((1, 0), (0, h_bands * band - w)))
+        self.horizontal = h_edges.reshape(h, h_bands, band).sum(axis=2, dtype=np.uint8).T.copy()
+
+        self.ready.set()
+
+    def _nearest(self, table, band_pos, pos, radius):
+        band = min(max(int(band_pos) // self.band_size, 0), table.shape[0] - 1)
+        center = int(round(pos))
+        lo = max(center - radius, 0)
+        hi = min(center + radius + 1, table.shape[1])
+        if lo >= hi: return None
+        # Neighbouring bands are included so corners near a band boundary still snap
+        window = table[max(band - 1, 0):band + 2, lo:hi].max(axis=0)
+        hits = np.flatnonzero(window >= self.min_count)
+        if hits.size == 0: return None
+        return lo + int(hits[np.argmin(np.abs(hits + lo - center))])
+
+    def snap_x(self, x, y, radius=SNAP_RADIUS):
+        if not self.ready.is_set(): return None
+        return self._nearest(self.vertical, y, x, radius)
+
+    def snap_y(self, x, y, radius=SNAP_RADIUS):
+        if not self.ready.is_set(): return None
+        return self._nearest(self.horizontal, x, y, radius)
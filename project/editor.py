@@ -3,23 +3,37 @@ import cv2
 import numpy as np
 import datetime
 from PyQt6.QtWidgets import (QMainWindow, QGraphicsView, QGraphicsScene, QWidget,
-                             QVBoxLayout, QFileDialog, QApplication, QGraphicsPixmapItem,
-                             QInputDialog, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSignal, QPointF, QRectF
-from PyQt6.QtGui import QPixmap, QPainter, QPen, QColor, QFont, QAction, QPainterPath, QBrush, QPolygonF
+                             QVBoxLayout, QFileDialog, QApplication, QInputDialog, QMessageBox)
+from PyQt6.QtCore import Qt, pyqtSignal, QPointF, QRect, QRectF
+from PyQt6.QtGui import (QPixmap, QPainter, QPen, QColor, QAction, QPainterPath, QBrush, QPolygonF,
+                         QShortcut, QKeySequence)
 
 from toolbar import EditorToolbar
-from utils import apply_blur, apply_pixelate, calculate_ngon_points, convert_opencv_to_qpixmap, convert_qpixmap_to_opencv
+from canvas import TiledImageItem
+from tracing import traced, span
+from memory import track_memory, enforce_ceiling, pixmap_bytes
+from document import Document, EXTENSION
+from journal import EditJournal
+from export import export_image, load_profiles
+from pngwriter import SaveSignals, save_png_async
+from clipboard import copy_image_to_clipboard
+from settings import get_setting
+from render import draw_annotation, draw_shape, draw_filter, draw_arrow, draw_line, draw_text
+from utils import calculate_ngon_points, to_canvas_image
+
+UNDO_LIMIT = 20
 
 class EditorWindow(QMainWindow):
     closed_signal = pyqtSignal()
 
-    def __init__(self, pixmap, icons_path, capture_mode="region"):
+    @traced
+    def __init__(self, pixmap, icons_path, capture_mode="region", document=None, annotations=()):
         super().__init__()
         self.icons_path = icons_path
         self.capture_mode = capture_mode
         self.setWindowTitle("SparkyShot Editor")
         self.setGeometry(100, 100, 900, 700)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
 
         container = QWidget()
         self.setCentralWidget(container)
@@ -38,15 +52,23 @@ class EditorWindow(QMainWindow):
         layout.addWidget(self.view)
 
         self.base_pixmap = pixmap
-        self.current_pixmap = pixmap.copy()
+        # Working canvas: painting and the OpenCV filters share this image's pixels,
+        # and only dirty rects are copied into the view's display pixmap
+        self.canvas = to_canvas_image(pixmap.toImage())
 
-        self.image_item = QGraphicsPixmapItem(self.current_pixmap)
+        self.image_item = TiledImageItem(self.canvas)
         self.image_item.setZValue(0)
         self.scene.addItem(self.image_item)
 
         self.undo_stack = []
         self.redo_stack = []
-        self.undo_stack.append(self.current_pixmap.copy())
+        self.edited_rect = QRect()
+        self.undo_stack.append(self.canvas.copy())
+        # One entry per undo step, replayable on the original capture
+        self.annotations = []
+        self.redo_annotations = []
+        self.document = document
+        self.journal = EditJournal(pixmap) if get_setting("recovery/enabled") else None
 
         self.current_tool = "cursor"
         self.draw_color = QColor(255, 0, 0)
@@ -59,6 +81,9 @@ class EditorWindow(QMainWindow):
         self.start_point = None
         self.temp_item = None
         self.is_drawing = False
+        self.diff_items = []
+        self.save_signals = SaveSignals()
+        self.save_signals.finished.connect(self.on_image_saved)
 
         self.toolbar.tool_selected.connect(self.set_tool)
         self.toolbar.color_changed.connect(self.set_color)
@@ -77,7 +102,25 @@ class EditorWindow(QMainWindow):
         self.toolbar.zoom_in_signal.connect(self.zoom_in)
         self.toolbar.zoom_out_signal.connect(self.zoom_out)
 
+        QShortcut(QKeySequence.StandardKey.Save, self, self.quick_save)
+        QShortcut(QKeySequence("Ctrl+Shift+E"), self, self.export_profiles)
+
         self.view.viewport().installEventFilter(self)
+        track_memory(self)
+
+        # Older steps are replayed without snapshots; only the last UNDO_LIMIT can be undone
+        replay_only = max(len(annotations) - UNDO_LIMIT, 0)
+        for op in annotations[:replay_only]:
+            self.apply_annotation(op)
+            self.annotations.append(op)
+        if replay_only:
+            self.undo_stack = [self.canvas.copy()]
+        for op in annotations[replay_only:]:
+            self.push_undo(op)
+            self.apply_annotation(op)
+        if annotations:
+            self.refresh_canvas()
+            self.record_edit()
 
     def set_tool(self, tool_name):
         self.current_tool = tool_name
@@ -125,37 +168,143 @@ class EditorWindow(QMainWindow):
         self.toolbar.set_zoom_value(new_val)
         self.set_zoom(new_val)
 
-    def push_undo(self):
-        if len(self.undo_stack) > 20:
+    @traced
+    def push_undo(self, op=None):
+        if len(self.undo_stack) > UNDO_LIMIT:
+            self.undo_stack.pop(0)
+        self.undo_stack.append(self.canvas.copy())
+        self.redo_stack.clear()
+        if op is not None:
+            self.annotations.append(op)
+            self.redo_annotations.clear()
+        enforce_ceiling()
+
+    def annotation(self, tool, **fields):
+        op = {"tool": tool, **fields}
+        if tool in ("blur", "pixelate"):
+            op["value"] = self.blur_val if tool == "blur" else self.pixel_val
+            return op
+        op["color"] = self.draw_color.name(QColor.NameFormat.HexArgb)
+        if tool == "text":
+            op["font_size"] = self.text_font_size
+            return op
+        op["size"] = self.draw_size
+        if tool == "polygon":
+            op["sides"] = self.poly_sides
+        return op
+
+    def apply_annotation(self, op):
+        draw_annotation(self.canvas, op, {"color": self.draw_color, "size": self.draw_size, "sides": self.poly_sides,
+                                          "font_size": self.text_font_size, "blur": self.blur_val, "pixelate": self.pixel_val})
+
+    def record_edit(self):
+        if self.journal is not None:
+            self.journal.record(self.annotations)
+
+    def memory_usage(self):
+        return {
+            "snapshots": pixmap_bytes(self.base_pixmap),
+            "undo_history": sum(pixmap_bytes(p) for p in self.undo_stack + self.redo_stack),
+            "scene": pixmap_bytes(self.canvas) + self.image_item.memory_usage(),
+        }
+
+    def trim_memory(self):
+        if self.redo_stack:
+            self.redo_stack.pop(0)
+            return True
+        if len(self.undo_stack) > 1:
             self.undo_stack.pop(0)
-        self.undo_stack.append(self.current_pixmap.copy())
+            return True
+        if self.image_item.tiles:
+            self.image_item.release_cache()
+            return True
+        return False
+
+    def release_buffers(self):
+        self.undo_stack.clear()
         self.redo_stack.clear()
+        self.image_item.release_cache()
 
     def undo_action(self):
         if len(self.undo_stack) > 1:
             current = self.undo_stack.pop()
             self.redo_stack.append(current)
             prev = self.undo_stack[-1]
-            self.current_pixmap = prev.copy()
-            self.image_item.setPixmap(self.current_pixmap)
+            self.canvas = prev.copy()
+            if self.annotations:
+                self.redo_annotations.append(self.annotations.pop())
+            self.image_item.set_source(self.canvas, self.edited_rect)
+            self.record_edit()
 
     def redo_action(self):
         if self.redo_stack:
             nxt = self.redo_stack.pop()
             self.undo_stack.append(nxt)
-            self.current_pixmap = nxt.copy()
-            self.image_item.setPixmap(self.current_pixmap)
+            self.canvas = nxt.copy()
+            if self.redo_annotations:
+                self.annotations.append(self.redo_annotations.pop())
+            self.image_item.set_source(self.canvas, self.edited_rect)
+            self.record_edit()
+
+    def refresh_canvas(self, dirty=None):
+        if dirty is not None:
+            margin = self.draw_size + 2
+            dirty = dirty.normalized().adjusted(-margin, -margin, margin, margin).toAlignedRect()
+            # Undo and redo can only touch pixels some edit has changed
+            self.edited_rect = self.edited_rect.united(dirty)
+        else:
+            self.edited_rect = self.canvas.rect()
+        self.image_item.set_source(self.canvas, dirty)
 
     def save_image(self):
         now_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         default_name = f"sparkyshot_{now_str}.png"
-        path, _ = QFileDialog.getSaveFileName(self, "Save Image", default_name, "PNG Files (*.png);;JPG Files (*.jpg);;All Files (*)")
-        if path:
-            self.current_pixmap.save(path)
+        path, _ = QFileDialog.getSaveFileName(self, "Save Image", default_name,
+                                              f"PNG Files (*.png);;JPG Files (*.jpg);;SparkyShot Project (*{EXTENSION});;All Files (*)")
+        if not path: return
+        if path.endswith(EXTENSION):
+            self.save_project(path)
+            return
+        with span("EditorWindow.save", path=os.path.basename(path)):
+            if path.lower().endswith(".png"):
+                # Screenshot-tuned encoder on a worker thread; the editor stays usable
+                save_png_async(self.canvas, path, self.save_signals)
+            elif not self.canvas.save(path):
+                QMessageBox.warning(self, "Save Image", f"Could not write {path}")
+
+    def on_image_saved(self, path, error):
+        if error:
+            QMessageBox.warning(self, "Save Image", error)
+
+    def save_project(self, path):
+        if self.document is None or self.document.path != path:
+            self.document = Document(path)
+        with span("EditorWindow.save_project", ops=len(self.annotations)):
+            self.document.save(self.base_pixmap, self.annotations)
+
+    def export_profiles(self):
+        directory = QFileDialog.getExistingDirectory(self, "Export With All Profiles")
+        if not directory: return
+        stem = datetime.datetime.now().strftime("sparkyshot_%Y-%m-%d_%H-%M-%S")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with span("EditorWindow.export_profiles"):
+                export_image(self.canvas, list(load_profiles()), directory, stem)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Export", str(e))
+        finally:
+            QApplication.restoreOverrideCursor()
+
+    def quick_save(self):
+        if self.document is not None:
+            self.save_project(self.document.path)
+        else:
+            self.save_image()
 
+    @traced
     def copy_image(self):
-        clipboard = QApplication.clipboard()
-        clipboard.setPixmap(self.current_pixmap)
+        # Formats are encoded lazily when something pastes
+        copy_image_to_clipboard(self.canvas)
         self.toolbar.show_copy_feedback()
 
     def eventFilter(self, source, event):
@@ -210,7 +359,7 @@ class EditorWindow(QMainWindow):
             self.handle_text_input(sp)
             self.is_drawing = False
         elif self.current_tool == "pen":
-            self.push_undo()
+            self.push_undo(self.annotation("pen", points=[[sp.x(), sp.y()]]))
 
     def update_drawing(self, event):
         if not self.start_point: return
@@ -219,7 +368,8 @@ class EditorWindow(QMainWindow):
 
         if self.current_tool == "pen":
             self.paint_on_pixmap(self.current_tool, self.start_point, current_point, final=False)
-            self.image_item.setPixmap(self.current_pixmap)
+            self.annotations[-1]["points"].append([current_point.x(), current_point.y()])
+            self.refresh_canvas(QRectF(self.start_point, current_point))
             self.start_point = current_point
         elif self.current_tool in ["rect", "circle", "polygon", "blur", "pixelate"]:
             rect = self.get_draw_rect(self.start_point, current_point, event.modifiers())
@@ -239,107 +389,88 @@ class EditorWindow(QMainWindow):
         if self.current_tool != "pen":
              if self.current_tool == "arrow":
                  final_p2 = self.get_arrow_point(self.start_point, end_point, event.modifiers())
-                 self.push_undo()
+                 self.push_undo(self.annotation("arrow", p1=[self.start_point.x(), self.start_point.y()],
+                                                p2=[final_p2.x(), final_p2.y()]))
                  self.paint_arrow(self.start_point, final_p2)
+                 arrow_size = self.draw_size * 3
+                 dirty = QRectF(self.start_point, final_p2).normalized().adjusted(-arrow_size, -arrow_size, arrow_size, arrow_size)
              else:
                  rect = self.get_draw_rect(self.start_point, end_point, event.modifiers())
                  if rect.width() < 2 or rect.height() < 2: return
 
-                 self.push_undo()
+                 self.push_undo(self.annotation(self.current_tool, rect=[rect.x(), rect.y(), rect.width(), rect.height()]))
                  self.paint_shape(self.current_tool, rect)
+                 dirty = rect
 
-             self.image_item.setPixmap(self.current_pixmap)
+             self.refresh_canvas(dirty)
+        self.record_edit()
 
+    @traced
     def paint_shape(self, tool, rect):
-        painter = QPainter(self.current_pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        pen = QPen(self.draw_color, self.draw_size, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
-        painter.setPen(pen)
-
-        if tool == "rect":
-            painter.drawRect(rect)
-        elif tool == "circle":
-            painter.drawEllipse(rect)
-        elif tool == "polygon":
-            cx, cy = rect.center().x(), rect.center().y()
-            rx, ry = rect.width()/2, rect.height()/2
-            radius = min(rx, ry)
-            points = calculate_ngon_points(cx, cy, radius, self.poly_sides)
-            if points:
-                qpoints = [QPointF(x, y) for x, y in points]
-                painter.drawPolygon(*qpoints)
-
-        painter.end()
-
-        if (tool == "blur" or tool == "pixelate") and not rect.isEmpty():
-             cv_img = convert_qpixmap_to_opencv(self.current_pixmap)
-             x, y, w, h = int(rect.x()), int(rect.y()), int(rect.width()), int(rect.height())
-
-             if tool == "blur":
-                 processed = apply_blur(cv_img, x, y, w, h, self.blur_val)
-             else:
-                 processed = apply_pixelate(cv_img, x, y, w, h, self.pixel_val)
-
-             self.current_pixmap = convert_opencv_to_qpixmap(processed)
+        if tool in ("blur", "pixelate"):
+            draw_filter(self.canvas, tool, rect, self.blur_val if tool == "blur" else self.pixel_val)
+        else:
+            draw_shape(self.canvas, tool, rect, self.draw_color, self.draw_size, self.poly_sides)
 
+    @traced
     def paint_arrow(self, p1, p2):
-        painter = QPainter(self.current_pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        pen = QPen(self.draw_color, self.draw_size, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
-        painter.setPen(pen)
-
-        line = QPointF(p2.x() - p1.x(), p2.y() - p1.y())
-        length = (line.x()**2 + line.y()**2)**0.5
-
-        if length > 0:
-            angle = np.arctan2(line.y(), line.x())
-            arrow_size = self.draw_size * 3
-
-            p_arrow1 = QPointF(p2.x() - arrow_size * np.cos(angle - np.pi/6),
-                               p2.y() - arrow_size * np.sin(angle - np.pi/6))
-            p_arrow2 = QPointF(p2.x() - arrow_size * np.cos(angle + np.pi/6),
-                               p2.y() - arrow_size * np.sin(angle + np.pi/6))
-
-            path = QPainterPath()
-            path.moveTo(p2)
-            path.lineTo(p_arrow1)
-            path.lineTo(p_arrow2)
-            path.closeSubpath()
-
-            painter.setBrush(QBrush(self.draw_color))
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.drawPath(path)
-
-            offset = arrow_size * 0.5
-            p2_adjusted = QPointF(p2.x() - offset * np.cos(angle),
-                                  p2.y() - offset * np.sin(angle))
-
-            painter.setPen(pen)
-            painter.setBrush(Qt.BrushStyle.NoBrush)
-            painter.drawLine(p1, p2_adjusted)
-        painter.end()
+        draw_arrow(self.canvas, p1, p2, self.draw_color, self.draw_size)
 
+    @traced
     def paint_on_pixmap(self, tool, p1, p2, final=True):
-        painter = QPainter(self.current_pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        pen = QPen(self.draw_color, self.draw_size, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
-        painter.setPen(pen)
         if tool == "pen":
-            painter.drawLine(p1, p2)
-        painter.end()
+            draw_line(self.canvas, p1, p2, self.draw_color, self.draw_size)
 
     def handle_text_input(self, pos):
         text, ok = QInputDialog.getText(self, "Add Text", "Enter text:")
         if ok and text:
-            self.push_undo()
-            painter = QPainter(self.current_pixmap)
-            painter.setPen(QColor(self.draw_color))
-            font = QFont("Arial", self.text_font_size)
-            font.setBold(True)
-            painter.setFont(font)
-            painter.drawText(pos, text)
-            painter.end()
-            self.image_item.setPixmap(self.current_pixmap)
+            self.push_undo(self.annotation("text", pos=[pos.x(), pos.y()], text=text))
+            self.refresh_canvas(self.paint_text(pos, text))
+            self.record_edit()
+
+    def paint_text(self, pos, text):
+        with span("EditorWindow.paint_text"):
+            return draw_text(self.canvas, pos, text, self.draw_color, self.text_font_size)
+
+    def show_diff(self, regions):
+        # Overlay only: the highlights are scene items and never painted into the canvas
+        self.clear_diff()
+        pen = QPen(QColor(255, 0, 80), 2)
+        brush = QBrush(QColor(255, 0, 80, 50))
+        for x, y, w, h in regions:
+            item = self.scene.addRect(QRectF(x, y, w, h), pen, brush)
+            item.setZValue(1)
+            self.diff_items.append(item)
+
+    def show_preview(self, full_size):
+        # A reduced image stands in while the file decodes; it is scaled to the full
+        # size so zoom and scroll stay put, and the window is disabled so nothing is
+        # drawn on or saved from the preview
+        self.image_item.setScale(full_size.width() / self.canvas.width())
+        self.scene.setSceneRect(QRectF(0, 0, full_size.width(), full_size.height()))
+        self.setEnabled(False)
+
+    def replace_image(self, image):
+        # Swaps the preview for the full-resolution image; edits start from here
+        self.base_pixmap = QPixmap.fromImage(image)
+        self.canvas = to_canvas_image(image)
+        self.image_item.setScale(1)
+        self.image_item.set_source(self.canvas)
+        self.scene.setSceneRect(self.image_item.boundingRect())
+        self.undo_stack = [self.canvas.copy()]
+        self.redo_stack.clear()
+        self.annotations = []
+        self.redo_annotations = []
+        self.edited_rect = QRect()
+        if self.journal is not None:
+            self.journal = EditJournal(self.base_pixmap)
+        self.setEnabled(True)
+        enforce_ceiling()
+
+    def clear_diff(self):
+        for item in self.diff_items:
+            self.scene.removeItem(item)
+        self.diff_items = []
 
     def refresh_temp_item_rect(self, rect):
         if self.temp_item:
@@ -385,9 +516,15 @@ class EditorWindow(QMainWindow):
         self.temp_item = self.scene.addPath(path, QPen(self.draw_color, self.draw_size))
 
     def closeEvent(self, event):
-        reply = QMessageBox.question(self, 'Close Editor', 'Are you sure you want to discard changes?',
-                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+        # A preview still waiting for its full image has nothing to discard
+        reply = QMessageBox.StandardButton.Yes
+        if self.isEnabled():
+            reply = QMessageBox.question(self, 'Close Editor', 'Are you sure you want to discard changes?',
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            if self.journal is not None:
+                self.journal.close(discard=True)
+            self.release_buffers()
             self.closed_signal.emit()
             event.accept()
         else:
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+
+from settings import get_setting
+from pngwriter import write_png
+
+DEFAULT_PROFILES = {
+    "archive": {"format": "png", "max_size": 0, "quality": -1, "suffix": ""},
+    "chat": {"format": "webp", "max_size": 1920, "quality": 85, "suffix": "_chat"},
+    "thumbnail": {"format": "jpg", "max_size": 320, "quality": 80, "suffix": "_thumb"},
+}
+
+def load_profiles():
+    # export/profiles holds a JSON object of extra or overriding profiles
+    profiles = dict(DEFAULT_PROFILES)
+    custom = get_setting("export/profiles")
+    if custom:
+        try:
+            profiles.update(json.loads(custom))
+        except ValueError:
+            pass
+    return profiles
+
+def output_path(directory, stem, profile):
+    return os.path.join(directory, f"{stem}{profile['suffix']}.{profile['format']}")
+
+def render_profile(image, profile, path):
+    max_size = profile["max_size"]
+    if max_size and max(image.width(), image.height()) > max_size:
+        image = image.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    if profile["format"] in ("jpg", "jpeg") and image.hasAlphaChannel():
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+    if profile["format"] == "png":
+        return write_png(image, path)
+    if not image.save(path, profile["format"].upper(), profile["quality"]):
+        raise OSError(f"could not write {path}")
+    return path
+
+def export_image(image, names, directory, stem, profiles=None):
+    # Every profile scales and encodes from the same rasterized image; QImage is
+    # implicitly shared and only read, so the workers never copy the full frame
+    profiles = profiles or load_profiles()
+    unknown = [name for name in names if name not in profiles]
+    if unknown:
+        raise ValueError("unknown export profiles: " + ", ".join(unknown))
+    os.makedirs(directory, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=min(len(names), os.cpu_count() or 1) or 1) as pool:
+        futures = [pool.submit(render_profile, image, profiles[name], output_path(directory, stem, profiles[name]))
+                   for name in names]
+        return [future.result() for future in futures]
+
+def load_source(path):
+    # Projects are replayed with the editor's painting code, without an editor window
+    # or the recovery journal it would start
+    from document import Document, EXTENSION
+    if not path.endswith(EXTENSION):
+        return QImage(path)
+    from render import render_annotations
+    _, base, annotations = Document.open(path)
+    return render_annotations(base.toImage(), annotations)
+
+def main(argv=None):
+    from PyQt6.QtWidgets import QApplication
+    profiles = load_profiles()
+    parser = argparse.ArgumentParser(description="Export an image or SparkyShot project with export profiles")
+    parser.add_argument("source", help="Image file or .sparky project")
+    parser.add_argument("--profile", action="append", dest="profiles",
+                        help="Profile to export, repeatable (default: all): " + ", ".join(profiles))
+    parser.add_argument("--output", "-o", default=".", help="Output directory")
+    args = parser.parse_args(argv)
+
+    names = args.profiles or list(profiles)
+    unknown = [name for name in names if name not in profiles]
+    if unknown:
+        parser.error("unknown profiles: " + ", ".join(unknown))
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    image = load_source(args.source)
+    if image.isNull():
+        print(f"Cannot read {args.source}", file=sys.stderr)
+        return 1
+    stem = os.path.splitext(os.path.basename(args.source))[0]
+    for path in export_image(image, names, args.output, stem, profiles):
+        print(path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
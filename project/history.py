@@ -0,0 +1,301 @@
+import os
+import json
+import mmap
+import queue
+import datetime
+import threading
+from collections import OrderedDict
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QListView, QLabel, QPushButton, QAbstractItemView
+from PyQt6.QtCore import (Qt, QObject, QSize, QBuffer, QByteArray, QIODevice, QAbstractListModel,
+                          QModelIndex, pyqtSignal)
+from PyQt6.QtGui import QImage, QPixmap
+
+from utils import app_data_path, to_canvas_image, array_from_image, image_from_array
+from settings import get_setting
+from store import TileStore
+from pngwriter import write_png
+
+THUMB_SIZE = QSize(200, 125)
+THUMB_QUALITY = 80
+THUMB_CACHE_LIMIT = 256
+PACK_NAME = "thumbs.pack"
+INDEX_NAME = "index.jsonl"
+
+class HistorySignals(QObject):
+    added = pyqtSignal(dict)
+
+class CaptureHistory:
+    # Every capture is written as a PNG next to a single thumbnail pack: JPEG thumbnails
+    # appended back to back, located through one JSON line per capture in the index.
+    # Encoding happens on a worker thread; the gallery reads thumbnails from a mmap.
+    def __init__(self, root=None):
+        self.root = root
+        self.signals = HistorySignals()
+        self.queue = queue.Queue()
+        self.worker = None
+        self.pack = None
+        self.pack_file = None
+        self.tile_store = None
+
+    def path(self, name):
+        if self.root is None:
+            self.root = app_data_path("history")
+        return os.path.join(self.root, name)
+
+    def entries(self):
+        index_path = self.path(INDEX_NAME)
+        if not os.path.exists(index_path): return []
+        pack_path = self.path(PACK_NAME)
+        pack_size = os.path.getsize(pack_path) if os.path.exists(pack_path) else 0
+        entries = []
+        with open(index_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash while it was being written
+                    continue
+                if entry["offset"] + entry["length"] <= pack_size:
+                    entries.append(entry)
+        return entries
+
+    def add(self, pixmap):
+        # QPixmap is GUI-thread only; the worker gets a QImage
+        self.queue.put((pixmap.toImage(), get_setting("history/dedup")))
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self.run, daemon=True)
+            self.worker.start()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None: return
+                self.signals.added.emit(self.store(*item))
+            finally:
+                self.queue.task_done()
+
+    def store(self, image, dedup=False):
+        now = datetime.datetime.now()
+        name = now.strftime("capture_%Y-%m-%d_%H-%M-%S_%f.png")
+        if dedup:
+            # Only tiles that differ from earlier captures reach the disk
+            image = to_canvas_image(image)
+            self.tiles().put(name, array_from_image(image))
+        else:
+            write_png(image, self.path(name))
+
+        thumb = image.scaled(THUMB_SIZE, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        thumb.save(buffer, "JPG", THUMB_QUALITY)
+        buffer.close()
+
+        # Pack first, index second: an index line always points at bytes already on disk
+        with open(self.path(PACK_NAME), "ab") as f:
+            offset = f.tell()
+            f.write(bytes(data))
+        entry = {"file": name, "time": now.isoformat(timespec="seconds"), "width": image.width(),
+                 "height": image.height(), "offset": offset, "length": data.size()}
+        with open(self.path(INDEX_NAME), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def tiles(self):
+        if self.tile_store is None:
+            self.tile_store = TileStore(self.path("store"))
+        return self.tile_store
+
+    def load_image(self, path):
+        # Full capture from its PNG, or rebuilt from the tile store when deduplicated
+        if os.path.exists(path) or os.path.dirname(path) != self.root:
+            return QImage(path)
+        array = self.tiles().get(os.path.basename(path))
+        if array is None: return QImage()
+        return image_from_array(array).copy()
+
+    def find_duplicates(self, image, max_distance=None):
+        # Names of deduplicated captures that look the same as image, closest first
+        image = to_canvas_image(image)
+        args = () if max_distance is None else (max_distance,)
+        return [name for _, name in self.tiles().find_similar(array_from_image(image), *args)]
+
+    def wait(self):
+        self.queue.join()
+
+    def thumbnail(self, entry):
+        end = entry["offset"] + entry["length"]
+        if self.pack is None or end > len(self.pack):
+            # The worker has appended since the pack was mapped
+            self.close_pack()
+            self.pack_file = open(self.path(PACK_NAME), "rb")
+            self.pack = mmap.mmap(self.pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if end > len(self.pack): return QImage()
+        return QImage.fromData(self.pack[entry["offset"]:end], "JPG")
+
+    def close_pack(self):
+        if self.pack is not None:
+            self.pack.close()
+            self.pack = None
+        if self.pack_file is not None:
+            self.pack_file.close()
+            self.pack_file = None
+
+    def prune(self, max_entries):
+        # Drops the oldest captures beyond max_entries (0 keeps everything) with their
+        # PNGs or stored tiles, thumbnails and index lines; returns how many went
+        entries = self.entries()
+        if not max_entries or len(entries) <= max_entries: return 0
+        old, kept = entries[:-max_entries], entries[-max_entries:]
+        self.close_pack()
+        with open(self.path(PACK_NAME), "rb") as f:
+            pack = f.read()
+        # Rewritten beside the originals and moved over them, pack first as in store()
+        pack_tmp, index_tmp = self.path(PACK_NAME + ".tmp"), self.path(INDEX_NAME + ".tmp")
+        with open(pack_tmp, "wb") as pack_file, open(index_tmp, "w") as index_file:
+            for entry in kept:
+                thumb = pack[entry["offset"]:entry["offset"] + entry["length"]]
+                index_file.write(json.dumps(dict(entry, offset=pack_file.tell())) + "\n")
+                pack_file.write(thumb)
+        os.replace(pack_tmp, self.path(PACK_NAME))
+        os.replace(index_tmp, self.path(INDEX_NAME))
+        stored = []
+        for entry in old:
+            path = self.path(entry["file"])
+            if os.path.exists(path):
+                os.remove(path)
+            else:
+                stored.append(entry["file"])
+        if stored:
+            self.tiles().remove(stored)
+        return len(old)
+
+    def close(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join()
+        self.worker = None
+        self.close_pack()
+        # Retention runs once the worker is done and, at exit, no gallery is reading the
+        # pack; a history never touched this session is left alone
+        if self.root is not None:
+            self.prune(get_setting("history/max_entries"))
+        if self.tile_store is not None:
+            self.tile_store.close()
+
+class HistoryModel(QAbstractListModel):
+    # Newest first. Views only ask for the rows they show, so thumbnails are decoded
+    # on demand and kept in a small LRU cache.
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.items = list(reversed(history.entries()))
+        self.cache = OrderedDict()
+        history.signals.added.connect(self.prepend)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        entry = self.items[index.row()]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnail(entry)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry["time"].replace("T", " ")
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{entry['file']}\n{entry['width']} x {entry['height']}"
+        if role == Qt.ItemDataRole.UserRole:
+            return self.history.path(entry["file"])
+        return None
+
+    def thumbnail(self, entry):
+        key = entry["offset"]
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            return pixmap
+        pixmap = QPixmap.fromImage(self.history.thumbnail(entry))
+        self.cache[key] = pixmap
+        if len(self.cache) > THUMB_CACHE_LIMIT:
+            self.cache.popitem(last=False)
+        return pixmap
+
+    def prepend(self, entry):
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.items.insert(0, entry)
+        self.endInsertRows()
+
+class HistoryGallery(QDialog):
+    open_requested = pyqtSignal(str)
+    compare_requested = pyqtSignal(str, str)
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("SparkyShot History")
+        self.resize(900, 600)
+        self.setStyleSheet("""
+            QDialog { background-color: #171718; border: 1px solid #333; }
+            QLabel { color: #888; }
+            QListView { background-color: #171718; color: #E0E0E0; border: none; }
+            QListView::item:selected { background-color: #333333; border-radius: 6px; }
+            QPushButton { background-color: #333; color: #E0E0E0; border: none; border-radius: 6px; padding: 6px 12px; }
+            QPushButton:disabled { color: #666; }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+
+        self.model = HistoryModel(history, self)
+        self.view = QListView()
+        self.view.setViewMode(QListView.ViewMode.IconMode)
+        self.view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.view.setMovement(QListView.Movement.Static)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.view.setBatchSize(200)
+        self.view.setIconSize(THUMB_SIZE)
+        self.view.setGridSize(THUMB_SIZE + QSize(24, 40))
+        self.view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setModel(self.model)
+        self.view.activated.connect(self.open_index)
+        self.view.selectionModel().selectionChanged.connect(self.update_compare)
+        layout.addWidget(self.view)
+
+        footer = QHBoxLayout()
+        self.status = QLabel()
+        footer.addWidget(self.status, 1)
+        self.btn_compare = QPushButton("Compare")
+        self.btn_compare.setToolTip("Highlight what changed between two selected captures")
+        self.btn_compare.setEnabled(False)
+        self.btn_compare.clicked.connect(self.compare_selected)
+        footer.addWidget(self.btn_compare)
+        layout.addLayout(footer)
+        self.update_status()
+        self.model.rowsInserted.connect(self.update_status)
+
+    def update_status(self, *_):
+        count = self.model.rowCount()
+        self.status.setText("No captures yet" if count == 0 else f"{count} captures - double-click to open")
+
+    def update_compare(self, *_):
+        self.btn_compare.setEnabled(len(self.view.selectionModel().selectedIndexes()) == 2)
+
+    def compare_selected(self):
+        indexes = self.view.selectionModel().selectedIndexes()
+        if len(indexes) != 2: return
+        # Rows are newest first, so the lower row is the older "before" capture
+        after, before = sorted(indexes, key=lambda index: index.row())
+        self.compare_requested.emit(before.data(Qt.ItemDataRole.UserRole), after.data(Qt.ItemDataRole.UserRole))
+        self.close()
+
+    def open_index(self, index):
+        self.open_requested.emit(index.data(Qt.ItemDataRole.UserRole))
+        self.close()
+
+    def closeEvent(self, event):
+        self.model.cache.clear()
+        self.model.history.close_pack()
+        super().closeEvent(event)
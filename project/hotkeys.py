@@ -0,0 +1,155 @@
+import sys
+import ctypes
+from ctypes import c_int, c_uint, c_ulong, c_void_p, byref
+from PyQt6.QtCore import QObject, QSocketNotifier, QAbstractNativeEventFilter, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+from windows import load_xlib
+
+X11_MODIFIERS = {"shift": 1, "ctrl": 4, "control": 4, "alt": 8, "super": 64, "meta": 64}
+WIN32_MODIFIERS = {"alt": 1, "ctrl": 2, "control": 2, "shift": 4, "super": 8, "meta": 8}
+WIN32_KEYS = {"print": 0x2C, "space": 0x20, "escape": 0x1B, "pause": 0x13, "insert": 0x2D,
+              "delete": 0x2E, "home": 0x24, "end": 0x23}
+# CapsLock and NumLock change the modifier state, so the key is grabbed with each combination
+X11_LOCK_MASKS = (0, 2, 16, 18)
+X11_KEY_PRESS = 2
+WM_HOTKEY = 0x0312
+MOD_NOREPEAT = 0x4000
+HOTKEY_ID = 0x5350
+
+def parse_hotkey(text):
+    parts = [p.strip() for p in text.split("+") if p.strip()]
+    if not parts: raise ValueError("empty hotkey")
+    modifiers = [p.lower() for p in parts[:-1]]
+    unknown = [m for m in modifiers if m not in X11_MODIFIERS]
+    if unknown: raise ValueError(f"unknown modifier: {unknown[0]}")
+    return modifiers, parts[-1]
+
+def x11_keysym_name(key):
+    return key.lower() if len(key) == 1 else key[:1].upper() + key[1:]
+
+def win32_virtual_key(key):
+    lower = key.lower()
+    if lower in WIN32_KEYS: return WIN32_KEYS[lower]
+    if len(key) == 1 and key.isalnum(): return ord(key.upper())
+    if lower[:1] == "f" and lower[1:].isdigit() and 1 <= int(lower[1:]) <= 24:
+        return 0x70 + int(lower[1:]) - 1
+    raise ValueError(f"unsupported key: {key}")
+
+class XKeyEvent(ctypes.Structure):
+    # Only the leading fields of the XEvent union are read; the padding covers the rest
+    _fields_ = [("type", c_int), ("pad", c_ulong * 24)]
+
+class _X11Hotkey:
+    def __init__(self, modifiers, key, callback):
+        xlib = load_xlib()
+        if xlib is None: raise OSError("libX11 not found")
+        xlib.XStringToKeysym.restype = c_ulong
+        xlib.XStringToKeysym.argtypes = [ctypes.c_char_p]
+        xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+        xlib.XKeysymToKeycode.argtypes = [c_void_p, c_ulong]
+        xlib.XGrabKey.argtypes = [c_void_p, c_int, c_uint, c_ulong, c_int, c_int, c_int]
+        xlib.XUngrabKey.argtypes = [c_void_p, c_int, c_uint, c_ulong]
+        xlib.XConnectionNumber.argtypes = [c_void_p]
+        xlib.XPending.argtypes = [c_void_p]
+        xlib.XNextEvent.argtypes = [c_void_p, c_void_p]
+        xlib.XSync.argtypes = [c_void_p, c_int]
+        xlib.XSetErrorHandler.restype = c_void_p
+        xlib.XSetErrorHandler.argtypes = [c_void_p]
+        self.xlib = xlib
+        self.callback = callback
+        self.display = xlib.XOpenDisplay(None)
+        if not self.display: raise OSError("cannot open X display")
+        self.root = xlib.XDefaultRootWindow(self.display)
+        keysym = xlib.XStringToKeysym(x11_keysym_name(key).encode())
+        self.keycode = xlib.XKeysymToKeycode(self.display, keysym) if keysym else 0
+        if not self.keycode:
+            self.close()
+            raise ValueError(f"unsupported key: {key}")
+        self.mask = 0
+        for m in modifiers:
+            self.mask |= X11_MODIFIERS[m]
+
+        # Another client holding the same grab is reported asynchronously as BadAccess;
+        # catch it here instead of letting Xlib's default handler exit the process
+        errors = []
+        handler = ctypes.CFUNCTYPE(c_int, c_void_p, c_void_p)(lambda display, event: errors.append(1) or 0)
+        previous = xlib.XSetErrorHandler(ctypes.cast(handler, c_void_p))
+        for lock in X11_LOCK_MASKS:
+            xlib.XGrabKey(self.display, self.keycode, self.mask | lock, self.root, 1, 1, 1)
+        xlib.XSync(self.display, 0)
+        xlib.XSetErrorHandler(previous)
+        if errors:
+            self.close()
+            raise OSError("hotkey is already grabbed by another application")
+
+        self.notifier = QSocketNotifier(xlib.XConnectionNumber(self.display), QSocketNotifier.Type.Read)
+        self.notifier.activated.connect(self.read_events)
+
+    def read_events(self, *_):
+        event = XKeyEvent()
+        pressed = False
+        while self.xlib.XPending(self.display):
+            self.xlib.XNextEvent(self.display, byref(event))
+            pressed = pressed or event.type == X11_KEY_PRESS
+        if pressed:
+            self.callback()
+
+    def close(self):
+        if not self.display: return
+        if getattr(self, "notifier", None) is not None:
+            self.notifier.setEnabled(False)
+            self.notifier = None
+        if self.keycode:
+            for lock in X11_LOCK_MASKS:
+                self.xlib.XUngrabKey(self.display, self.keycode, self.mask | lock, self.root)
+        self.xlib.XCloseDisplay(self.display)
+        self.display = None
+
+class _Win32HotkeyFilter(QAbstractNativeEventFilter):
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def nativeEventFilter(self, event_type, message):
+        if event_type == b"windows_generic_MSG":
+            from ctypes import wintypes
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_HOTKEY and msg.wParam == HOTKEY_ID:
+                self.callback()
+                return True, 0
+        return False, 0
+
+class _Win32Hotkey:
+    def __init__(self, modifiers, key, callback):
+        self.user32 = ctypes.windll.user32
+        mask = MOD_NOREPEAT
+        for m in modifiers:
+            mask |= WIN32_MODIFIERS[m]
+        if not self.user32.RegisterHotKey(None, HOTKEY_ID, mask, win32_virtual_key(key)):
+            raise OSError("hotkey is already registered by another application")
+        self.filter = _Win32HotkeyFilter(callback)
+        QApplication.instance().installNativeEventFilter(self.filter)
+
+    def close(self):
+        if self.filter is None: return
+        QApplication.instance().removeNativeEventFilter(self.filter)
+        self.user32.UnregisterHotKey(None, HOTKEY_ID)
+        self.filter = None
+
+class GlobalHotkey(QObject):
+    # System-wide key combination such as "Ctrl+Shift+S" or "Print"
+    activated = pyqtSignal()
+
+    def __init__(self, sequence, parent=None):
+        super().__init__(parent)
+        modifiers, key = parse_hotkey(sequence)
+        if sys.platform == "win32":
+            self.backend = _Win32Hotkey(modifiers, key, self.activated.emit)
+        elif sys.platform.startswith("linux"):
+            self.backend = _X11Hotkey(modifiers, key, self.activated.emit)
+        else:
+            raise OSError(f"global hotkeys are not supported on {sys.platform}")
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,68 @@
+import threading
+from PyQt6.QtCore import Qt, QObject, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QImageIOHandler
+
+from settings import get_setting
+from utils import to_canvas_image
+from tracing import traced
+
+PREVIEW_SIZE = 2048
+IMAGE_PATTERNS = "*.png *.jpg *.jpeg *.bmp *.webp *.tif *.tiff"
+
+class ImageLoadSignals(QObject):
+    # preview(image, full size) comes first when the format can decode at reduced
+    # resolution; loaded(image) carries the full image in the canvas format
+    preview = pyqtSignal(QImage, QSize)
+    loaded = pyqtSignal(QImage)
+    failed = pyqtSignal(str)
+
+def open_reader(path):
+    # Qt refuses images above its allocation limit, 256 MB by default, which is
+    # less than one 10k-pixel-wide photo
+    QImageReader.setAllocationLimit(get_setting("open/allocation_limit_mb"))
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    return reader
+
+def full_size(reader):
+    size = reader.size()
+    if reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90:
+        size.transpose()
+    return size
+
+@traced
+def read_preview(path, max_size=PREVIEW_SIZE):
+    # Only formats whose decoder scales while decoding (JPEG) get a preview; for
+    # the others a reduced read costs a full decode, so the preview is skipped
+    reader = open_reader(path)
+    size = reader.size()
+    if not size.isValid() or max(size.width(), size.height()) <= max_size: return None
+    if not reader.supportsOption(QImageIOHandler.ImageOption.ScaledSize): return None
+    total = full_size(reader)
+    reader.setScaledSize(size.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull(): return None
+    return to_canvas_image(image), total
+
+@traced
+def read_image(path):
+    reader = open_reader(path)
+    image = reader.read()
+    if image.isNull():
+        raise OSError(f"cannot read {path}: {reader.errorString()}")
+    # Converted here so the GUI thread gets pixels it can paint on as they are
+    return to_canvas_image(image)
+
+def load_image_async(path, signals):
+    def work():
+        preview = read_preview(path)
+        if preview is not None:
+            signals.preview.emit(*preview)
+        try:
+            signals.loaded.emit(read_image(path))
+        except OSError as e:
+            signals.failed.emit(str(e))
+
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
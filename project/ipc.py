@@ -0,0 +1,92 @@
+import os
+import json
+import getpass
+import argparse
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# Only Qt core and network are imported here: a second launch that hands its command
+# to the running instance must not pay for the GUI, OpenCV or the capture modules.
+
+CONNECT_TIMEOUT_MS = 200
+REPLY_TIMEOUT_MS = 1000
+CAPTURE_MODES = ("region", "window", "fullscreen", "qr")
+
+def server_name():
+    return f"sparkyshot-{getpass.getuser()}"
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sparkyshot")
+    parser.add_argument("--tray", action="store_true", help="Run in the background with a tray icon and global hotkey")
+    group = parser.add_mutually_exclusive_group()
+    for mode in CAPTURE_MODES:
+        group.add_argument(f"--{mode}", dest="mode", action="store_const", const=mode,
+                           help=f"Start a {mode} capture, in the running instance if there is one")
+    group.add_argument("--open", metavar="PATH", help="Open an image or project in the editor")
+    return parser
+
+def command_from_args(args):
+    if args.open:
+        return {"command": "open", "path": os.path.abspath(args.open)}
+    if args.mode:
+        return {"command": "capture", "mode": args.mode}
+    return {"command": "show"}
+
+def send_command(command, name=None):
+    # Blocking calls work without an application object, which leaves the caller
+    # free to create its own QApplication afterwards
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    socket.write((json.dumps(command) + "\n").encode())
+    socket.flush()
+    ok = socket.waitForReadyRead(REPLY_TIMEOUT_MS) and bytes(socket.readLine()).strip() == b"ok"
+    socket.disconnectFromServer()
+    return ok
+
+class InstanceServer(QObject):
+    # Accepts commands from later launches, one JSON object per line
+    command_received = pyqtSignal(dict)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        if self.server.listen(self.name):
+            return True
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        if probe.waitForConnected(CONNECT_TIMEOUT_MS):
+            return False
+        # A socket left behind by a crashed instance blocks listen() on Unix
+        QLocalServer.removeServer(self.name)
+        return self.server.listen(self.name)
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda s=socket: self.read_command(s))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def read_command(self, socket):
+        while socket.canReadLine():
+            try:
+                command = json.loads(bytes(socket.readLine()).decode())
+            except (ValueError, UnicodeDecodeError):
+                socket.write(b"error\n")
+                continue
+            if not isinstance(command, dict) or command.get("command") not in ("capture", "show", "open") \
+                    or (command["command"] == "capture" and command.get("mode") not in CAPTURE_MODES) \
+                    or (command["command"] == "open" and not isinstance(command.get("path"), str)):
+                socket.write(b"error\n")
+                continue
+            socket.write(b"ok\n")
+            socket.flush()
+            self.command_received.emit(command)
+
+    def close(self):
+        self.server.close()
@@ -0,0 +1,110 @@
+import os
+import json
+import queue
+import shutil
+import datetime
+import threading
+from PyQt6.QtGui import QPixmap
+
+from utils import app_data_path
+from document import PNG_QUALITY, common_prefix, ops_payload
+
+BASE_NAME = "base.png"
+JOURNAL_NAME = "journal.jsonl"
+
+class EditJournal:
+    # Crash safety for an editor session: the original capture is copied once as a
+    # PNG, then every change to the annotation list is appended as one JSON line,
+    # {"keep": n, "ops": [...]} as in .sparky files. Disk work happens on a writer
+    # thread, and a session left behind after a crash is restored by replaying it.
+    def __init__(self, base_pixmap, root=None):
+        self.base_pixmap = base_pixmap
+        self.root = root
+        self.path = None
+        self.saved_ops = []
+        self.queue = queue.Queue()
+        self.worker = None
+
+    def record(self, ops):
+        keep = common_prefix(self.saved_ops, ops)
+        if keep == len(ops) == len(self.saved_ops): return
+        if self.worker is None:
+            if self.root is None:
+                self.root = app_data_path("sessions")
+            stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")
+            self.path = os.path.join(self.root, f"{stamp}_{os.getpid()}")
+            # QPixmap is GUI-thread only; the worker gets a QImage
+            self.queue.put(("base", self.base_pixmap.toImage()))
+            self.worker = threading.Thread(target=self.run, daemon=True)
+            self.worker.start()
+        self.queue.put(("ops", ops_payload(keep, ops[keep:]) + b"\n"))
+        self.saved_ops = list(ops)
+
+    def run(self):
+        os.makedirs(self.path, exist_ok=True)
+        journal = None
+        while True:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get())
+            try:
+                # One write and fsync for every line queued since the last round
+                lines = b"".join(item for kind, item in batch if kind == "ops")
+                for kind, item in batch:
+                    if kind == "base":
+                        tmp_path = os.path.join(self.path, BASE_NAME + ".tmp")
+                        item.save(tmp_path, "PNG", PNG_QUALITY)
+                        os.replace(tmp_path, os.path.join(self.path, BASE_NAME))
+                        journal = open(os.path.join(self.path, JOURNAL_NAME), "ab")
+                if lines:
+                    journal.write(lines)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                stop = [kind for kind, _ in batch if kind in ("close", "discard")]
+                if stop:
+                    journal.close()
+                    if stop[0] == "discard":
+                        shutil.rmtree(self.path, ignore_errors=True)
+                    return
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def wait(self):
+        self.queue.join()
+
+    def close(self, discard=False):
+        if self.worker is None: return
+        self.queue.put(("discard" if discard else "close", None))
+        self.worker.join()
+        self.worker = None
+
+def pending_sessions(root=None):
+    # Sessions still on disk were not closed by their editor
+    root = root or app_data_path("sessions")
+    sessions = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.exists(os.path.join(path, BASE_NAME)):
+            sessions.append(path)
+    return sessions
+
+def load_session(path):
+    base = QPixmap(os.path.join(path, BASE_NAME))
+    if base.isNull():
+        raise OSError(f"{path} has no readable base image")
+    ops = []
+    journal_path = os.path.join(path, JOURNAL_NAME)
+    if os.path.exists(journal_path):
+        with open(journal_path, "rb") as f:
+            for line in f:
+                try:
+                    update = json.loads(line)
+                except ValueError:
+                    # A line cut short by the crash
+                    break
+                ops = ops[:update["keep"]] + update["ops"]
+    return base, ops
+
+def remove_session(path):
+    shutil.rmtree(path, ignore_errors=True)
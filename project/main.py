@@ -1,25 +1,48 @@
 import sys
 import os
-from PyQt6.QtWidgets import QApplication, QWidget, QHBoxLayout, QPushButton, QLabel, QFrame
+from PyQt6.QtWidgets import (QApplication, QWidget, QHBoxLayout, QPushButton, QLabel, QFrame,
+                             QFileDialog, QMessageBox)
 from PyQt6.QtCore import Qt, QSize, QTimer
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtGui import QIcon, QPixmap, QShortcut, QKeySequence
 
 from snipper import Snipper
 from editor import EditorWindow
-from toolbar import AboutDialog
-from utils import resource_path, load_svg_icon
+from toolbar import AboutDialog, DebugPanel
+from utils import resource_path, load_svg_icon, to_canvas_image, array_from_image, pixmap_from_array
+from tracing import traced, init_from_settings
+from metrics import latency, FirstPaintWatcher
+from settings import get_setting
+from memory import enforce_ceiling
+from document import Document, DocumentError, EXTENSION
+from history import CaptureHistory, HistoryGallery
+from journal import pending_sessions, load_session, remove_session
+from diff import compare
+from imageload import ImageLoadSignals, load_image_async, IMAGE_PATTERNS
+from ipc import InstanceServer, build_parser, command_from_args, send_command
 
 class FloatingToolbar(QWidget):
-    def __init__(self):
+    def __init__(self, resident=False):
         super().__init__()
+        # In tray mode the toolbar is only shown on request and stays hidden after captures
+        self.resident = resident
         self.snipper = None
         self.editor = None
+        # Every open editor, so a new capture never drops the last reference to one
+        self.editors = set()
+        self.debug_panel = None
+        self.history = CaptureHistory()
+        self.history_gallery = None
+        # Pending image loads -> the preview editor each one opened, if any; forwarded
+        # --open commands can start a load while another is still decoding
+        self.image_loads = {}
         self.drag_pos = None
+        QApplication.instance().aboutToQuit.connect(self.discard_sessions)
         self.initUI()
 
     def initUI(self):
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        self.setAcceptDrops(True)
 
         container = QFrame(self)
         layout = QHBoxLayout(container)
@@ -64,13 +87,20 @@ class FloatingToolbar(QWidget):
                 background-color: white;
             }
         """)
-        self.btn_logo.setToolTip("About SparkyShot")
+        self.btn_logo.setToolTip("About SparkyShot (right-click for debug info)")
         self.btn_logo.clicked.connect(self.open_about)
+        self.btn_logo.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.btn_logo.customContextMenuRequested.connect(self.open_debug_panel)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.open_debug_panel)
+        QShortcut(QKeySequence("Ctrl+H"), self, self.open_history)
+        QShortcut(QKeySequence("Ctrl+O"), self, self.open_file_dialog)
+        QShortcut(QKeySequence("Ctrl+D"), self, self.open_compare_dialog)
         layout.addWidget(self.btn_logo)
 
         layout.addSpacing(5)
 
         self.create_btn(layout, "cap_region.svg", "Region Capture", lambda: self.prepare_capture("region"))
+        self.create_btn(layout, "cap_window.svg", "Window Capture", lambda: self.prepare_capture("window"))
         self.create_btn(layout, "cap_fullscreen.svg", "Fullscreen", lambda: self.prepare_capture("fullscreen"))
         self.create_btn(layout, "cap_qr.svg", "Scan QR", lambda: self.prepare_capture("qr"))
 
@@ -109,32 +139,215 @@ class FloatingToolbar(QWidget):
 
     def center_top(self):
         screen = QApplication.primaryScreen().geometry()
-        self.move((screen.width() - 380) // 2, 80)
+        self.move((screen.width() - 430) // 2, 80)
 
     def open_about(self):
         dlg = AboutDialog(self.icons_path)
         dlg.exec()
 
+    def open_debug_panel(self, *_):
+        if self.debug_panel is None:
+            self.debug_panel = DebugPanel()
+        self.debug_panel.show()
+        self.debug_panel.raise_()
+
+    def open_history(self):
+        if self.history_gallery is None:
+            self.history_gallery = HistoryGallery(self.history)
+            self.history_gallery.open_requested.connect(self.open_history_capture)
+            self.history_gallery.compare_requested.connect(self.compare_captures)
+        self.history_gallery.show()
+        self.history_gallery.raise_()
+
+    def open_history_capture(self, path):
+        pixmap = QPixmap.fromImage(self.history.load_image(path))
+        if not pixmap.isNull():
+            self.hide()
+            self.open_editor(pixmap, "history")
+
+    def open_file_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open", "",
+                                              f"Projects and Images (*{EXTENSION} {IMAGE_PATTERNS});;"
+                                              f"SparkyShot Project (*{EXTENSION});;Images ({IMAGE_PATTERNS})")
+        if path:
+            self.open_path(path)
+
+    def open_path(self, path):
+        if path.endswith(EXTENSION):
+            self.open_project(path)
+        else:
+            self.open_image(path)
+
+    def open_image(self, path):
+        # Decoded on a worker thread; large JPEGs show a reduced preview first
+        signals = ImageLoadSignals(self)
+        signals.preview.connect(lambda image, size: self.on_image_preview(signals, image, size))
+        signals.loaded.connect(lambda image: self.on_image_loaded(signals, image))
+        signals.failed.connect(lambda error: self.on_image_failed(signals, error))
+        self.image_loads[signals] = None
+        self.hide()
+        load_image_async(path, signals)
+
+    def on_image_preview(self, signals, image, size):
+        if signals not in self.image_loads: return
+        self.open_editor(QPixmap.fromImage(image), "file")
+        self.editor.show_preview(size)
+        self.image_loads[signals] = self.editor
+
+    def on_image_loaded(self, signals, image):
+        if signals not in self.image_loads: return
+        preview = self.image_loads.pop(signals)
+        if preview is not None:
+            preview.replace_image(image)
+        else:
+            self.open_editor(QPixmap.fromImage(image), "file")
+        signals.deleteLater()
+
+    def on_image_failed(self, signals, error):
+        if signals not in self.image_loads: return
+        preview = self.image_loads.pop(signals)
+        signals.deleteLater()
+        QMessageBox.warning(self, "Open Image", error)
+        if preview is not None:
+            preview.close()
+        elif not self.resident and not self.editors:
+            self.show()
+
+    def dragEnterEvent(self, event):
+        if any(url.isLocalFile() for url in event.mimeData().urls()):
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if paths:
+            event.acceptProposedAction()
+            self.open_path(paths[0])
+
+    def open_compare_dialog(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Compare Two Captures", "", "Images (*.png *.jpg *.jpeg *.bmp *.webp)")
+        if not paths: return
+        if len(paths) != 2:
+            QMessageBox.warning(self, "Compare", "Select exactly two captures: before and after.")
+            return
+        before, after = sorted(paths, key=os.path.getmtime)
+        self.compare_captures(before, after)
+
+    def compare_captures(self, before_path, after_path):
+        before, after = self.history.load_image(before_path), self.history.load_image(after_path)
+        if before.isNull() or after.isNull():
+            QMessageBox.warning(self, "Compare", "Could not read both captures.")
+            return
+        before, after = to_canvas_image(before), to_canvas_image(after)
+        try:
+            view, regions = compare(array_from_image(before), array_from_image(after))
+        except ValueError as e:
+            QMessageBox.warning(self, "Compare", str(e))
+            return
+        self.hide()
+        self.open_editor(pixmap_from_array(view), "compare")
+        self.editor.show_diff(regions)
+
+    def open_project(self, path):
+        try:
+            document, pixmap, annotations = Document.open(path)
+        except (OSError, DocumentError) as e:
+            QMessageBox.warning(self, "Open Project", str(e))
+            return
+        self.hide()
+        self.open_editor(pixmap, "project", document, annotations)
+
+    def recover_sessions(self):
+        for path in pending_sessions():
+            try:
+                pixmap, annotations = load_session(path)
+            except OSError:
+                annotations = None
+            if not annotations:
+                remove_session(path)
+                continue
+            reply = QMessageBox.question(self, "Recover Edits",
+                                         f"SparkyShot closed unexpectedly. Restore the capture with {len(annotations)} edit(s)?")
+            if reply == QMessageBox.StandardButton.Yes:
+                self.hide()
+                # The new editor journals the restored edits in a session of its own
+                self.open_editor(pixmap, "recovered", annotations=annotations)
+            remove_session(path)
+
+    def discard_sessions(self):
+        # Quitting (tray Quit, last window, session end) is not a crash: sessions of
+        # editors still open are removed so the next start offers nothing to recover
+        for editor in self.editors:
+            if editor.journal is not None:
+                editor.journal.close(discard=True)
+                editor.journal = None
+
+    @traced
     def prepare_capture(self, mode):
+        latency.start("fullscreen_click_to_editor" if mode == "fullscreen" else "click_to_overlay")
         self.hide()
         QApplication.processEvents()
         QTimer.singleShot(250, lambda: self.start_snip(mode))
 
+    # Used when the toolbar is already hidden, so there is nothing to wait for
+    def capture_now(self, mode):
+        latency.start("fullscreen_click_to_editor" if mode == "fullscreen" else "click_to_overlay")
+        self.start_snip(mode)
+
+    @traced
     def start_snip(self, mode):
         self.snipper = Snipper(self.icons_path, mode)
         self.snipper.captured_signal.connect(self.open_editor)
         self.snipper.closed_signal.connect(self.on_snipper_closed)
         if mode != "fullscreen":
+            FirstPaintWatcher(self.snipper.view.viewport(), "click_to_overlay")
             self.snipper.show()
 
     def on_snipper_closed(self):
-        if not self.editor or not self.editor.isVisible():
+        latency.cancel("click_to_overlay")
+        if self.snipper is not None:
+            self.snipper.deleteLater()
+            self.snipper = None
+        if self.resident: return
+        if not any(editor.isVisible() for editor in self.editors):
             self.show()
 
-    def open_editor(self, pixmap, mode):
-        self.editor = EditorWindow(pixmap, self.icons_path, mode)
-        self.editor.closed_signal.connect(self.show)
+    @traced
+    def open_editor(self, pixmap, mode, document=None, annotations=()):
+        editor = EditorWindow(pixmap, self.icons_path, mode, document, annotations)
+        editor.closed_signal.connect(lambda: self.on_editor_closed(editor))
+        self.editors.add(editor)
+        self.editor = editor
+        FirstPaintWatcher(self.editor.view.viewport(), "fullscreen_click_to_editor" if mode == "fullscreen" else "release_to_editor")
         self.editor.show()
+        if mode not in ("history", "project", "recovered", "compare", "file") and get_setting("history/enabled"):
+            self.history.add(pixmap)
+        enforce_ceiling()
+
+    def handle_command(self, command):
+        if command["command"] == "show":
+            self.show()
+            self.raise_()
+            self.activateWindow()
+            return
+        if command["command"] == "open":
+            self.open_path(command["path"])
+            return
+        if self.snipper is not None: return
+        if self.isVisible():
+            self.prepare_capture(command["mode"])
+        else:
+            self.capture_now(command["mode"])
+
+    def on_editor_closed(self, editor):
+        self.editors.discard(editor)
+        for signals, preview in list(self.image_loads.items()):
+            if preview is editor:
+                # Closed before the full image arrived; drop the pending load
+                del self.image_loads[signals]
+        if editor is self.editor:
+            self.editor = next(iter(self.editors), None)
+        if not self.resident and not self.editors:
+            self.show()
 
     def eventFilter(self, source, event):
         if source == self.btn_move:
@@ -146,9 +359,10 @@ class FloatingToolbar(QWidget):
                 return True
         return super().eventFilter(source, event)
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
+def run(args, qt_args=()):
+    app = QApplication(sys.argv[:1] + list(qt_args))
     app.setApplicationName("SparkShot")
+    init_from_settings()
 
     icon_path_svg = resource_path(os.path.join("icons", "logo_sparkyshot_svg.svg"))
     if os.path.exists(icon_path_svg):
@@ -165,6 +379,35 @@ if __name__ == '__main__':
         except:
             pass
 
-    window = FloatingToolbar()
-    window.show()
-    sys.exit(app.exec())
+    server = InstanceServer()
+    if not server.listen():
+        # Another instance started between our connect attempt and now
+        return 0 if args.tray else int(not send_command(command_from_args(args)))
+
+    window = FloatingToolbar(resident=args.tray)
+    server.command_received.connect(window.handle_command)
+    if args.tray:
+        from tray import TrayDaemon
+        app.setQuitOnLastWindowClosed(False)
+        daemon = TrayDaemon(window)
+        app.aboutToQuit.connect(daemon.close)
+    elif not args.mode and not args.open:
+        window.show()
+    if get_setting("recovery/enabled"):
+        QTimer.singleShot(0, window.recover_sessions)
+    if args.mode:
+        QTimer.singleShot(0, lambda: window.capture_now(args.mode))
+    elif args.open:
+        QTimer.singleShot(0, lambda: window.open_path(args.open))
+    exit_code = app.exec()
+    server.close()
+    window.history.close()
+    if get_setting("debug/record_latency"):
+        latency.dump()
+    return exit_code
+
+if __name__ == '__main__':
+    args, qt_args = build_parser().parse_known_args()
+    if not args.tray and send_command(command_from_args(args)):
+        sys.exit(0)
+    sys.exit(run(args, qt_args))
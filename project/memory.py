@@ -0,0 +1,63 @@
+import weakref
+import numpy as np
+
+from settings import get_setting
+
+MAX_POOLED_PER_SHAPE = 2
+CATEGORIES = ("snapshots", "undo_history", "scene", "clipboard", "pool")
+
+class BufferPool:
+    # Keeps released capture buffers so the next capture of the same desktop size
+    # writes into existing memory instead of allocating a new full-frame array.
+    def __init__(self):
+        self.buffers = {}
+
+    def acquire(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        free = self.buffers.get(key)
+        if free:
+            return free.pop()
+        return np.empty(shape, dtype)
+
+    def release(self, array):
+        if array is None or array.base is not None or not array.flags.c_contiguous: return
+        key = (array.shape, array.dtype.str)
+        free = self.buffers.setdefault(key, [])
+        if len(free) < MAX_POOLED_PER_SHAPE and not any(a is array for a in free):
+            free.append(array)
+
+    def clear(self):
+        self.buffers.clear()
+
+    def nbytes(self):
+        return sum(a.nbytes for free in self.buffers.values() for a in free)
+
+_owners = weakref.WeakSet()
+buffer_pool = BufferPool()
+
+def pixmap_bytes(pixmap):
+    if pixmap is None or pixmap.isNull(): return 0
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+def track_memory(owner):
+    _owners.add(owner)
+
+def memory_report():
+    report = dict.fromkeys(CATEGORIES, 0)
+    for owner in list(_owners):
+        for category, size in owner.memory_usage().items():
+            report[category] = report.get(category, 0) + size
+    report["pool"] += buffer_pool.nbytes()
+    report["total"] = sum(report[c] for c in CATEGORIES)
+    return report
+
+def memory_ceiling():
+    return get_setting("memory/ceiling_mb") * 1024 * 1024
+
+def enforce_ceiling():
+    ceiling = memory_ceiling()
+    if ceiling <= 0 or memory_report()["total"] <= ceiling: return
+    buffer_pool.clear()
+    for owner in list(_owners):
+        while memory_report()["total"] > ceiling and owner.trim_memory():
+            pass
@@ -0,0 +1,78 @@
+import os
+import json
+import time
+import platform
+import datetime
+from collections import deque
+import numpy as np
+from PyQt6.QtCore import QObject, QEvent
+
+from utils import APP_VERSION, app_data_path
+
+WINDOW_SIZE = 500
+METRICS = {
+    "click_to_overlay": "Click to overlay",
+    "release_to_editor": "Release to editor",
+    "fullscreen_click_to_editor": "Fullscreen click to editor",
+}
+
+class LatencyTracker:
+    def __init__(self, window_size=WINDOW_SIZE):
+        self.window_size = window_size
+        self.samples = {name: deque(maxlen=window_size) for name in METRICS}
+        self.pending = {}
+
+    def start(self, name):
+        self.pending[name] = time.perf_counter()
+
+    def cancel(self, name):
+        self.pending.pop(name, None)
+
+    def stop(self, name):
+        start = self.pending.pop(name, None)
+        if start is None: return None
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self.samples.setdefault(name, deque(maxlen=self.window_size)).append(elapsed)
+        return elapsed
+
+    def summary(self, name):
+        values = self.samples.get(name)
+        if not values:
+            return {"count": 0, "p50": None, "p95": None, "p99": None, "last": None}
+        p50, p95, p99 = np.percentile(np.fromiter(values, float), [50, 95, 99])
+        return {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99), "last": values[-1]}
+
+    def report(self):
+        return {name: self.summary(name) for name in self.samples}
+
+    def dump(self, path=None):
+        if path is None:
+            stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            path = os.path.join(app_data_path("metrics"), f"latency_{stamp}.json")
+        data = {
+            "version": APP_VERSION,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "platform": {"system": platform.system(), "release": platform.release(),
+                         "machine": platform.machine(), "python": platform.python_version()},
+            "summary": self.report(),
+            "samples": {name: list(values) for name, values in self.samples.items()},
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+class FirstPaintWatcher(QObject):
+    # Stops a latency metric when the watched widget paints for the first time
+    def __init__(self, widget, name):
+        super().__init__(widget)
+        self.name = name
+        widget.installEventFilter(self)
+
+    def eventFilter(self, source, event):
+        if event.type() == QEvent.Type.Paint:
+            source.removeEventFilter(self)
+            latency.stop(self.name)
+            self.deleteLater()
+        return False
+
+latency = LatencyTracker()
@@ -0,0 +1,154 @@
+import os
+import zlib
+import struct
+import threading
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from utils import to_canvas_image, array_from_image
+from tracing import traced
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+MAX_PALETTE = 256
+# Colors sampled before the full palette pass; more than MAX_PALETTE in the
+# sample ends the check without looking at the rest of the image
+SAMPLE_PIXELS = 65536
+# Bands of rows trial-compressed when picking a filter for truecolor images
+FILTER_BANDS = 4
+FILTER_BAND_ROWS = 16
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_PAETH = 0, 1, 2, 4
+
+def png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+def packed_colors(bgrx):
+    # One uint32 per pixel with the padding byte masked off, for cheap comparisons
+    return np.ascontiguousarray(bgrx).view(np.uint32)[..., 0] & 0x00FFFFFF
+
+def build_palette(colors):
+    # (palette, indices) when the image has at most MAX_PALETTE colors, else None.
+    # A sample gives the candidate palette; one searchsorted pass over all pixels
+    # then both verifies it and produces the index image.
+    flat = colors.reshape(-1)
+    step = max(1, flat.size // SAMPLE_PIXELS)
+    palette = np.unique(flat[::step])
+    for _ in range(2):
+        if palette.size > MAX_PALETTE: return None
+        indices = np.searchsorted(palette, flat)
+        np.minimum(indices, palette.size - 1, out=indices)
+        missing = palette[indices] != flat
+        if not missing.any():
+            return palette, indices.astype(np.uint8).reshape(colors.shape)
+        extra = flat[missing]
+        if extra.size > SAMPLE_PIXELS and np.unique(extra[:SAMPLE_PIXELS]).size + palette.size > MAX_PALETTE:
+            return None
+        palette = np.union1d(palette, extra)
+    return None
+
+def pack_indices(indices, bits):
+    if bits == 8: return indices
+    per_byte = 8 // bits
+    h, w = indices.shape
+    padded = np.zeros((h, -(-w // per_byte) * per_byte), np.uint8)
+    padded[:, :w] = indices
+    groups = padded.reshape(h, -1, per_byte)
+    packed = np.zeros(groups.shape[:2], np.uint8)
+    for i in range(per_byte):
+        packed |= groups[:, :, i] << (8 - bits * (i + 1))
+    return packed
+
+def filter_rows(rows, kind, bpp):
+    # PNG filters applied to every row at once; rows is (h, stride) uint8
+    if kind == FILTER_NONE: return rows
+    left = np.zeros_like(rows)
+    left[:, bpp:] = rows[:, :-bpp]
+    up = np.zeros_like(rows)
+    up[1:] = rows[:-1]
+    if kind == FILTER_SUB: return rows - left
+    if kind == FILTER_UP: return rows - up
+    upper_left = np.zeros_like(rows)
+    upper_left[1:, bpp:] = rows[:-1, :-bpp]
+    a, b, c = left.astype(np.int16), up.astype(np.int16), upper_left.astype(np.int16)
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    predictor = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upper_left))
+    return rows - predictor
+
+def choose_filter(rows, bpp):
+    # Trial-compress a few bands of rows with each filter and keep the smallest.
+    # Screenshots often do best unfiltered, which the usual sum-of-differences
+    # heuristic misses, and one filter per image keeps the full pass vectorized.
+    h = rows.shape[0]
+    starts = np.unique(np.linspace(0, max(h - FILTER_BAND_ROWS, 0), FILTER_BANDS).astype(int))
+    sizes = {}
+    for kind in (FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_PAETH):
+        sizes[kind] = sum(len(zlib.compress(filter_rows(rows[y:y + FILTER_BAND_ROWS], kind, bpp).tobytes(), 1))
+                          for y in starts)
+    return min(sizes, key=sizes.get)
+
+@traced
+def encode_png(bgrx):
+    # Lossless PNG for an opaque BGRX frame: palette PNG at 1-8 bits when there are
+    # at most 256 colors, otherwise 8-bit RGB with one filter chosen for the image
+    h, w = bgrx.shape[:2]
+    result = build_palette(packed_colors(bgrx))
+    if result is not None:
+        palette, indices = result
+        bits = next(b for b in (1, 2, 4, 8) if palette.size <= 1 << b)
+        rows = pack_indices(indices, bits)
+        kind = FILTER_NONE
+        # Index data is small and repetitive, so the slowest level is still quick
+        level, strategy = 9, zlib.Z_DEFAULT_STRATEGY
+        rgb = np.stack([(palette >> 16) & 255, (palette >> 8) & 255, palette & 255], axis=1).astype(np.uint8)
+        header = struct.pack(">IIBBBBB", w, h, bits, 3, 0, 0, 0)
+        extra = png_chunk(b"PLTE", rgb.tobytes())
+    else:
+        rows = np.ascontiguousarray(bgrx[..., 2::-1]).reshape(h, w * 3)
+        kind = choose_filter(rows, 3)
+        level = 6
+        strategy = zlib.Z_DEFAULT_STRATEGY if kind == FILTER_NONE else zlib.Z_FILTERED
+        header = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+        extra = b""
+    filtered = filter_rows(rows, kind, 3 if result is None else 1)
+    raw = np.empty((h, filtered.shape[1] + 1), np.uint8)
+    raw[:, 0] = kind
+    raw[:, 1:] = filtered
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+    data = compressor.compress(raw.data) + compressor.flush()
+    return PNG_SIGNATURE + png_chunk(b"IHDR", header) + extra + png_chunk(b"IDAT", data) + png_chunk(b"IEND", b"")
+
+def write_png(image, path):
+    # Images with real transparency keep Qt's RGBA writer
+    if image.hasAlphaChannel():
+        if not image.save(path, "PNG"):
+            raise OSError(f"could not write {path}")
+        return path
+    image = to_canvas_image(image)
+    data = encode_png(array_from_image(image))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+class SaveSignals(QObject):
+    finished = pyqtSignal(str, str)
+
+def save_png_async(image, path, signals=None):
+    # The encode runs on its own thread from a private copy, so the caller can keep
+    # painting; finished(path, error) arrives on the GUI thread, error empty on success.
+    # The thread is not a daemon, so quitting waits for the file to be complete.
+    image = image.copy()
+
+    def work():
+        try:
+            write_png(image, path)
+            error = ""
+        except OSError as e:
+            error = str(e)
+        if signals is not None:
+            signals.finished.emit(path, error)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    return thread
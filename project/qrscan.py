@@ -0,0 +1,75 @@
+import threading
+import cv2
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from tracing import traced
+
+# Half the side of the window searched around the cursor; a second pass looks at
+# twice that area downscaled to the same size, for codes larger than the window
+SEARCH_RADIUS = 240
+WIDE_SCALE = 2
+SCAN_STOP_TIMEOUT = 0.5
+
+class QRScanSignals(QObject):
+    # content ("" when nothing was found), corner points in frame pixels, scanned position
+    found = pyqtSignal(str, object, object)
+
+class QRScanner:
+    # Looks for QR codes around the cursor on a worker thread. Only the newest
+    # position is kept, so moves that arrive while a scan runs collapse into one
+    # scan of where the cursor ended up and hovering never queues work.
+    def __init__(self, image):
+        self.image = image
+        self.signals = QRScanSignals()
+        self.condition = threading.Condition()
+        self.pending = None
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, x, y):
+        with self.condition:
+            self.pending = (int(x), int(y))
+            self.condition.notify()
+
+    def run(self):
+        detector = cv2.QRCodeDetector()
+        while True:
+            with self.condition:
+                while self.pending is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped: return
+                pos, self.pending = self.pending, None
+            content, points = self.scan(detector, *pos)
+            with self.condition:
+                if self.stopped: return
+            self.signals.found.emit(content, points, pos)
+
+    @traced
+    def scan(self, detector, x, y):
+        h, w = self.image.shape[:2]
+        for scale in (1, WIDE_SCALE):
+            radius = SEARCH_RADIUS * scale
+            x0, y0 = max(0, x - radius), max(0, y - radius)
+            x1, y1 = min(w, x + radius), min(h, y + radius)
+            if x1 - x0 < 21 or y1 - y0 < 21: continue
+            gray = cv2.cvtColor(self.image[y0:y1, x0:x1], cv2.COLOR_BGRA2GRAY)
+            if scale > 1:
+                gray = cv2.resize(gray, ((x1 - x0) // scale, (y1 - y0) // scale), interpolation=cv2.INTER_AREA)
+            try:
+                content, corners, _ = detector.detectAndDecode(gray)
+            except cv2.error:
+                continue
+            if content and corners is not None:
+                corners = corners.reshape(-1, 2) * scale + (x0, y0)
+                return content, [(float(px), float(py)) for px, py in corners]
+            if x1 - x0 == w and y1 - y0 == h: break
+        return "", []
+
+    def close(self, timeout=SCAN_STOP_TIMEOUT):
+        # True once the worker has stopped reading the frame
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import cv2
+
+from utils import apply_blur, apply_pixelate
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+BATCH_SIZE = 8
+# Batches queued per worker; with workers reading and writing their own files this
+# bounds memory to a few images per process however large the directory is
+BATCHES_PER_WORKER = 2
+DEFAULT_BLUR = 51
+DEFAULT_PIXELATE = 10
+
+def parse_rect(text):
+    try:
+        x, y, w, h = (int(v) for v in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected x,y,w,h, got {text!r}")
+    return [x, y, w, h]
+
+def load_template(path):
+    # Regions use the editor's annotation format: {"tool", "rect", "value"}. A .sparky
+    # project works as a template too; its blur and pixelate annotations are used.
+    from document import Document, EXTENSION
+    if path.endswith(EXTENSION):
+        _, _, ops = Document.open(path)
+    else:
+        with open(path) as f:
+            ops = json.load(f)["regions"]
+    return [op for op in ops if op["tool"] in ("blur", "pixelate")]
+
+def save_template(path, regions):
+    with open(path, "w") as f:
+        json.dump({"regions": regions}, f, indent=2)
+
+def redact(image, regions):
+    for region in regions:
+        x, y, w, h = (int(v) for v in region["rect"])
+        if region["tool"] == "blur":
+            apply_blur(image, x, y, w, h, region.get("value", DEFAULT_BLUR))
+        else:
+            apply_pixelate(image, x, y, w, h, region.get("value", DEFAULT_PIXELATE))
+    return image
+
+def redact_file(source, target, regions):
+    image = cv2.imread(source, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise OSError(f"cannot read {source}")
+    redact(image, regions)
+    ok, data = cv2.imencode(os.path.splitext(target)[1], image)
+    if not ok:
+        raise OSError(f"cannot encode {target}")
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    # Written beside the target and moved over it, so a failure never leaves a
+    # truncated file in place of the original screenshot
+    tmp_path = target + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data.tobytes())
+        os.replace(tmp_path, target)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def redact_batch(jobs, regions):
+    # Runs in a worker process; returns (source, error) for the files that failed
+    failed = []
+    for source, target in jobs:
+        try:
+            redact_file(source, target, regions)
+        except Exception as e:
+            failed.append((source, str(e)))
+    return len(jobs), failed
+
+def find_images(directory, recursive=False):
+    # Yields paths lazily so huge directories never sit in memory as one list
+    for entry in os.scandir(directory):
+        if entry.is_dir():
+            if recursive:
+                yield from find_images(entry.path, True)
+        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            yield entry.path
+
+def batches(items, size):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+def run_batch(jobs, regions, workers=None, batch_size=BATCH_SIZE, progress=None):
+    # Redacts (source, target) pairs on a process pool and returns (done, failed).
+    # Only paths cross process boundaries; each worker decodes, redacts and encodes
+    # its own files, and at most BATCHES_PER_WORKER batches per worker are queued.
+    workers = workers or os.cpu_count() or 1
+    done, failed = 0, []
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in batches(jobs, batch_size):
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    count, errors = future.result()
+                    done += count
+                    failed += errors
+                    if progress: progress(done)
+            pending.add(pool.submit(redact_batch, batch, regions))
+        for future in pending:
+            count, errors = future.result()
+            done += count
+            failed += errors
+            if progress: progress(done)
+    return done, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blur or pixelate fixed regions in a directory of screenshots")
+    parser.add_argument("input", help="Directory of images")
+    parser.add_argument("--output", "-o", help="Directory for redacted copies (default: overwrite in place)")
+    parser.add_argument("--blur", type=parse_rect, action="append", default=[], metavar="X,Y,W,H")
+    parser.add_argument("--pixelate", type=parse_rect, action="append", default=[], metavar="X,Y,W,H")
+    parser.add_argument("--blur-size", type=int, default=DEFAULT_BLUR)
+    parser.add_argument("--pixel-size", type=int, default=DEFAULT_PIXELATE)
+    parser.add_argument("--template", help="JSON template or .sparky project with blur/pixelate regions")
+    parser.add_argument("--save-template", help="Write the regions to this template file")
+    parser.add_argument("--recursive", "-r", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    regions = load_template(args.template) if args.template else []
+    regions += [{"tool": "blur", "rect": rect, "value": args.blur_size} for rect in args.blur]
+    regions += [{"tool": "pixelate", "rect": rect, "value": args.pixel_size} for rect in args.pixelate]
+    if not regions:
+        parser.error("no regions given; use --blur, --pixelate or --template")
+    if args.save_template:
+        save_template(args.save_template, regions)
+    if not os.path.isdir(args.input):
+        parser.error(f"{args.input} is not a directory")
+    output = args.output or args.input
+
+    def target(source):
+        return os.path.join(output, os.path.relpath(source, args.input))
+
+    jobs = ((source, target(source)) for source in find_images(args.input, args.recursive))
+    start = time.perf_counter()
+
+    def progress(done):
+        elapsed = time.perf_counter() - start
+        print(f"\r{done} images, {done / max(elapsed, 1e-9):.1f} images/s", end="", file=sys.stderr, flush=True)
+
+    done, failed = run_batch(jobs, regions, args.workers, args.batch_size, progress if sys.stderr.isatty() else None)
+    elapsed = time.perf_counter() - start
+    if done and sys.stderr.isatty():
+        print(file=sys.stderr)
+    for source, error in failed:
+        print(f"{source}: {error}", file=sys.stderr)
+    print(f"Redacted {done - len(failed)} of {done} images in {elapsed:.2f} s ({done / max(elapsed, 1e-9):.1f} images/s)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import numpy as np
+from PyQt6.QtCore import Qt, QPointF, QRectF
+from PyQt6.QtGui import QPainter, QPen, QColor, QImage, QFont, QFontMetricsF, QPainterPath, QBrush
+
+from tracing import traced
+from utils import apply_blur, apply_pixelate, calculate_ngon_points, array_from_image, to_canvas_image
+
+# Values for fields an annotation leaves out; the same as a fresh editor's tool settings
+DEFAULT_STYLE = {"color": "#ffff0000", "size": 5, "sides": 6, "font_size": 24, "blur": 15, "pixelate": 10}
+
+def annotation_pen(color, size):
+    return QPen(color, size, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
+
+def draw_shape(canvas, tool, rect, color, size, sides=DEFAULT_STYLE["sides"]):
+    painter = QPainter(canvas)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(annotation_pen(color, size))
+
+    if tool == "rect":
+        painter.drawRect(rect)
+    elif tool == "circle":
+        painter.drawEllipse(rect)
+    elif tool == "polygon":
+        cx, cy = rect.center().x(), rect.center().y()
+        rx, ry = rect.width()/2, rect.height()/2
+        radius = min(rx, ry)
+        points = calculate_ngon_points(cx, cy, radius, sides)
+        if points:
+            qpoints = [QPointF(x, y) for x, y in points]
+            painter.drawPolygon(*qpoints)
+
+    painter.end()
+
+def draw_filter(canvas, tool, rect, value):
+    if rect.isEmpty(): return
+    # OpenCV works directly on a view of the canvas pixels
+    view = array_from_image(canvas)
+    x, y, w, h = int(rect.x()), int(rect.y()), int(rect.width()), int(rect.height())
+    if tool == "blur":
+        apply_blur(view, x, y, w, h, value)
+    else:
+        apply_pixelate(view, x, y, w, h, value)
+
+def draw_arrow(canvas, p1, p2, color, size):
+    painter = QPainter(canvas)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    pen = annotation_pen(color, size)
+    painter.setPen(pen)
+
+    line = QPointF(p2.x() - p1.x(), p2.y() - p1.y())
+    length = (line.x()**2 + line.y()**2)**0.5
+
+    if length > 0:
+        angle = np.arctan2(line.y(), line.x())
+        arrow_size = size * 3
+
+        p_arrow1 = QPointF(p2.x() - arrow_size * np.cos(angle - np.pi/6),
+                           p2.y() - arrow_size * np.sin(angle - np.pi/6))
+        p_arrow2 = QPointF(p2.x() - arrow_size * np.cos(angle + np.pi/6),
+                           p2.y() - arrow_size * np.sin(angle + np.pi/6))
+
+        path = QPainterPath()
+        path.moveTo(p2)
+        path.lineTo(p_arrow1)
+        path.lineTo(p_arrow2)
+        path.closeSubpath()
+
+        painter.setBrush(QBrush(color))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.drawPath(path)
+
+        offset = arrow_size * 0.5
+        p2_adjusted = QPointF(p2.x() - offset * np.cos(angle),
+                              p2.y() - offset * np.sin(angle))
+
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.drawLine(p1, p2_adjusted)
+    painter.end()
+
+def draw_line(canvas, p1, p2, color, size):
+    painter = QPainter(canvas)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setPen(annotation_pen(color, size))
+    painter.drawLine(p1, p2)
+    painter.end()
+
+def draw_text(canvas, pos, text, color, font_size):
+    # Returns the text's bounding rect, for refreshing only that part of the view
+    painter = QPainter(canvas)
+    painter.setPen(QColor(color))
+    font = QFont("Arial", font_size)
+    font.setBold(True)
+    painter.setFont(font)
+    painter.drawText(pos, text)
+    painter.end()
+    return QFontMetricsF(font).boundingRect(text).translated(pos)
+
+def draw_annotation(canvas, op, style=DEFAULT_STYLE):
+    # Paints one editor annotation ({"tool": ..., fields}) onto a canvas-format QImage
+    tool = op["tool"]
+    color = QColor(op.get("color", style["color"]))
+    size = op.get("size", style["size"])
+    if tool in ("rect", "circle", "polygon"):
+        draw_shape(canvas, tool, QRectF(*op["rect"]), color, size, op.get("sides", style["sides"]))
+    elif tool in ("blur", "pixelate"):
+        draw_filter(canvas, tool, QRectF(*op["rect"]), op.get("value", style[tool]))
+    elif tool == "arrow":
+        draw_arrow(canvas, QPointF(*op["p1"]), QPointF(*op["p2"]), color, size)
+    elif tool == "pen":
+        points = [QPointF(*p) for p in op["points"]]
+        for p1, p2 in zip(points, points[1:]):
+            draw_line(canvas, p1, p2, color, size)
+    elif tool == "text":
+        draw_text(canvas, QPointF(*op["pos"]), op["text"], color, op.get("font_size", style["font_size"]))
+
+@traced
+def render_annotations(image, annotations):
+    # Headless replay of a project: no window, undo history or recovery journal
+    # A new handle on shared pixels: painting detaches it and leaves image untouched
+    canvas = QImage(to_canvas_image(image))
+    for op in annotations:
+        draw_annotation(canvas, op)
+    return canvas
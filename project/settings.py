@@ -0,0 +1,33 @@
+from PyQt6.QtCore import QSettings
+
+DEFAULTS = {
+    "capture/regrab_on_release": False,
+    "capture/backend": "auto",
+    "capture/benchmark": "",
+    "debug/trace_path": "",
+    "debug/record_latency": False,
+    "memory/ceiling_mb": 0,
+    "history/enabled": True,
+    "history/dedup": False,
+    "history/max_entries": 200,
+    "recovery/enabled": True,
+    "export/profiles": "",
+    "open/allocation_limit_mb": 4096,
+    "tray/hotkey": "Print",
+    "tray/hotkey_mode": "region",
+}
+
+def get_settings():
+    return QSettings("SparkyShot", "SparkyShot")
+
+def get_setting(key):
+    default = DEFAULTS.get(key)
+    settings = get_settings()
+    if default is None:
+        return settings.value(key)
+    return settings.value(key, default, type=type(default))
+
+def set_setting(key, value):
+    settings = get_settings()
+    settings.setValue(key, value)
+    settings.sync()
@@ -1,13 +1,23 @@
 from PyQt6.QtWidgets import (QWidget, QApplication, QGraphicsView, QGraphicsScene,
                              QMessageBox, QDialog, QVBoxLayout, QLabel, QHBoxLayout,
-                             QPushButton, QGraphicsPathItem)
+                             QPushButton, QGraphicsPathItem, QGraphicsPolygonItem, QGraphicsItem)
 from PyQt6.QtCore import Qt, QRectF, pyqtSignal, QTimer, QUrl, QSize, QPointF
-from PyQt6.QtGui import QPen, QColor, QBrush, QPixmap, QDesktopServices, QIcon, QPainterPath, QPainter
-import mss
-import numpy as np
+from PyQt6.QtGui import QPen, QColor, QBrush, QPixmap, QDesktopServices, QIcon, QPainterPath, QPainter, QPolygonF
 import cv2
 import os
-from utils import convert_opencv_to_qpixmap, convert_qpixmap_to_opencv, detect_qr_content, load_svg_icon
+from utils import pixmap_from_array, detect_qr_content, load_svg_icon, frame_conversions
+from edges import EdgeIndex
+from windows import list_windows, window_at, compositing_active
+from settings import get_setting
+from tracing import traced
+from metrics import latency
+from memory import buffer_pool, track_memory, pixmap_bytes, enforce_ceiling
+from capture import capture_backend, MonitorLayout
+from qrscan import QRScanner
+
+EDGE_INDEX_RELEASE_TIMEOUT = 0.5
+
+REGRAB_DELAY_MS = 50
 
 class QRDialog(QDialog):
     def __init__(self, content, icons_path):
@@ -92,6 +102,27 @@ class QRDialog(QDialog):
     def on_close_app(self):
         self.done(999)
 
+class CaptureItem(QGraphicsItem):
+    # The frozen capture, drawn monitor by monitor from capture pixels into the
+    # logical scene. On a screen with that monitor's scale factor every capture
+    # pixel lands on one device pixel, so repaints never rescale the frame.
+    def __init__(self, pixmap, monitor_layout):
+        super().__init__()
+        self.pixmap = pixmap
+        self.monitor_layout = monitor_layout
+
+    def boundingRect(self):
+        return self.monitor_layout.scene_bounds()
+
+    def setPixmap(self, pixmap):
+        self.pixmap = pixmap
+        self.update()
+
+    def paint(self, painter, option, widget=None):
+        if self.pixmap is None or self.pixmap.isNull(): return
+        for target, source in self.monitor_layout.tiles():
+            painter.drawPixmap(target, self.pixmap, source)
+
 class SnipperView(QGraphicsView):
     def __init__(self, scene, parent_snipper):
         super().__init__(scene)
@@ -120,18 +151,41 @@ class Snipper(QWidget):
     captured_signal = pyqtSignal(QPixmap, str)
     closed_signal = pyqtSignal()
 
-    def __init__(self, icons_path, mode="region"):
+    @traced
+    def __init__(self, icons_path, mode="region", frame=None, monitor_layout=None):
         super().__init__()
         self.icons_path = icons_path
         self.mode = mode
+        # Scene coordinates are logical desktop pixels; the layout maps them to the frame
+        self.monitor_layout = monitor_layout
 
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint)
         self.setWindowState(Qt.WindowState.WindowFullScreen)
 
-        self.original_pixmap = self.take_screenshot()
+        self.edge_index = None
+        self.qr_scanner = None
+        self.qr_content = None
+        self.capture_array = None
+        self.capture_origin = (0, 0)
+        self.window_rects = []
+        self.hovered_window = None
+        self.original_pixmap = None
+        track_memory(self)
 
         self.scene = QGraphicsScene(self)
-        self.scene.setSceneRect(QRectF(self.original_pixmap.rect()))
+        if self.mode == "window" and compositing_active():
+            # Only the chosen window is grabbed, so the overlay is drawn over the live desktop
+            self.scene.setSceneRect(self.load_windows())
+            self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        elif self.mode == "window":
+            # Without a compositor a translucent window paints opaque, so freeze the desktop
+            # like region mode does and crop the chosen window out of that frame
+            self.original_pixmap = self.take_screenshot() if frame is None else self.load_capture(frame, (0, 0))
+            self.load_windows()
+            self.scene.setSceneRect(self.monitor_layout.scene_bounds())
+        else:
+            self.original_pixmap = self.take_screenshot() if frame is None else self.load_capture(frame, (0, 0))
+            self.scene.setSceneRect(self.monitor_layout.scene_bounds())
 
         self.view = SnipperView(self.scene, self)
 
@@ -139,8 +193,12 @@ class Snipper(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.view)
 
-        self.bg_item = self.scene.addPixmap(self.original_pixmap)
-        self.bg_item.setZValue(0)
+        if self.original_pixmap is not None:
+            self.bg_item = CaptureItem(self.original_pixmap, self.monitor_layout)
+            self.bg_item.setZValue(0)
+            self.scene.addItem(self.bg_item)
+        else:
+            self.view.setStyleSheet("background: transparent;")
 
         self.dim_path_item = QGraphicsPathItem()
         self.dim_path_item.setBrush(QBrush(QColor(0, 0, 0, 100)))
@@ -155,47 +213,168 @@ class Snipper(QWidget):
         self.selection_rect_item.setZValue(20)
         self.selection_rect_item.hide()
 
+        self.qr_item = QGraphicsPolygonItem()
+        self.qr_item.setPen(QPen(QColor(0, 200, 90), 3))
+        self.qr_item.setBrush(QBrush(QColor(0, 200, 90, 50)))
+        self.qr_item.setZValue(20)
+        self.qr_item.hide()
+        self.scene.addItem(self.qr_item)
+        if self.qr_scanner is not None:
+            self.qr_scanner.signals.found.connect(self.on_qr_found)
+
         self.start_point = None
         self.is_selecting = False
 
         if self.mode == "fullscreen":
             QTimer.singleShot(50, lambda: self.finalize_capture(self.original_pixmap))
 
+    @traced
     def take_screenshot(self):
-        with mss.mss() as sct:
-            monitor = sct.monitors[0]
-            sct_img = sct.grab(monitor)
-            img = np.array(sct_img)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            return convert_opencv_to_qpixmap(img)
+        backend = capture_backend()
+        left, top, width, height = backend.bounds()
+        self.monitor_layout = backend.layout()
+        # Backends hand out BGRA, the canonical layout, straight into a pooled buffer
+        img = backend.grab(left, top, width, height, buffer_pool.acquire((height, width, 4)))
+        pixmap = self.load_capture(img, (left, top))
+        enforce_ceiling()
+        return pixmap
+
+    def load_capture(self, img, origin):
+        if img.shape[2] == 3:
+            frame_conversions["load_capture"] += 1
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        self.capture_array = img
+        self.capture_origin = origin
+        if self.monitor_layout is None:
+            self.monitor_layout = MonitorLayout.single(origin[0], origin[1], img.shape[1], img.shape[0])
+        if self.mode not in ("fullscreen", "window"):
+            self.edge_index = EdgeIndex(img)
+        if self.mode == "qr":
+            self.qr_scanner = QRScanner(img)
+        return pixmap_from_array(img)
+
+    def load_windows(self):
+        backend = capture_backend()
+        left, top, width, height = backend.bounds()
+        self.capture_origin = (left, top)
+        if self.monitor_layout is None:
+            self.monitor_layout = backend.layout()
+        # Window rects stay in frame pixels, like the capture they are cropped from
+        self.window_rects = [r.translated(-left, -top) for r in list_windows()]
+        return self.monitor_layout.scene_bounds()
+
+    def capture_rect(self, rect_f):
+        return self.monitor_layout.to_capture_rect(rect_f).intersected(self.monitor_layout.frame_bounds())
+
+    def crop_capture(self, rect):
+        return self.capture_array[rect.y():rect.y() + rect.height(), rect.x():rect.x() + rect.width()]
+
+    @traced
+    def grab_region(self, rect):
+        img = capture_backend().grab(self.capture_origin[0] + rect.x(), self.capture_origin[1] + rect.y(),
+                                     rect.width(), rect.height())
+        enforce_ceiling()
+        return img
+
+    def should_regrab(self):
+        if QApplication.keyboardModifiers() & Qt.KeyboardModifier.ControlModifier:
+            return True
+        return get_setting("capture/regrab_on_release")
+
+    def snap_point(self, pos):
+        if self.edge_index is None: return pos
+        if QApplication.keyboardModifiers() & Qt.KeyboardModifier.AltModifier: return pos
+        # Edges are found in frame pixels
+        point = self.monitor_layout.to_capture(pos)
+        x = self.edge_index.snap_x(point.x(), point.y())
+        y = self.edge_index.snap_y(point.x(), point.y())
+        if x is None and y is None: return pos
+        return self.monitor_layout.to_scene(QPointF(point.x() if x is None else x, point.y() if y is None else y))
+
+    def hover_window(self, pos):
+        rect = window_at(self.window_rects, self.monitor_layout.to_capture(pos).toPoint())
+        if rect == self.hovered_window: return
+        self.hovered_window = rect
+        if rect is None:
+            self.selection_rect_item.hide()
+            self.update_dimmer(QRectF())
+        else:
+            scene_rect = self.monitor_layout.to_scene_rect(rect)
+            self.selection_rect_item.setRect(scene_rect)
+            self.selection_rect_item.show()
+            self.update_dimmer(scene_rect)
+
+    def capture_window(self, pos):
+        rect = window_at(self.window_rects, self.monitor_layout.to_capture(pos).toPoint())
+        if rect is None: return
+        rect = rect.intersected(self.monitor_layout.frame_bounds())
+        if rect.width() <= 0 or rect.height() <= 0: return
+        latency.start("release_to_editor")
+        if self.capture_array is not None:
+            self.finalize_capture(pixmap_from_array(self.crop_capture(rect)))
+            return
+        self.hide()
+        QApplication.processEvents()
+        QTimer.singleShot(REGRAB_DELAY_MS, lambda: self.finalize_capture(pixmap_from_array(self.grab_region(rect))))
 
     def start_selection(self, pos):
+        if self.mode == "window": return
+        pos = self.snap_point(pos)
         self.start_point = pos
         self.is_selecting = True
         self.selection_rect_item.setRect(QRectF(pos, pos))
         self.selection_rect_item.show()
 
     def update_selection(self, pos):
+        if self.mode == "window":
+            self.hover_window(pos)
+            return
+        if self.mode == "qr" and not self.is_selecting:
+            self.hover_qr(pos)
+            return
         if not self.is_selecting: return
+        pos = self.snap_point(pos)
         rect = QRectF(self.start_point, pos).normalized()
         self.selection_rect_item.setRect(rect)
         self.update_dimmer(rect)
 
+    def hover_qr(self, pos):
+        if self.qr_scanner is None: return
+        # Still over the highlighted code; nothing new to look for
+        if self.qr_content and self.qr_item.polygon().containsPoint(pos, Qt.FillRule.OddEvenFill): return
+        point = self.monitor_layout.to_capture(pos)
+        self.qr_scanner.request(point.x(), point.y())
+
+    def on_qr_found(self, content, points, pos):
+        self.qr_content = content or None
+        if not content:
+            self.qr_item.hide()
+            return
+        self.qr_item.setPolygon(QPolygonF([self.monitor_layout.to_scene(QPointF(x, y)) for x, y in points]))
+        self.qr_item.show()
+
     def update_dimmer(self, selection_rect):
         path = QPainterPath()
         path.setFillRule(Qt.FillRule.OddEvenFill)
-        path.addRect(QRectF(self.original_pixmap.rect()))
+        path.addRect(self.scene.sceneRect())
         if not selection_rect.isEmpty():
             path.addRect(selection_rect)
         self.dim_path_item.setPath(path)
 
     def finish_selection(self, pos):
+        if self.mode == "window":
+            self.capture_window(pos)
+            return
         if not self.is_selecting: return
         self.is_selecting = False
         self.selection_rect_item.hide()
+        pos = self.snap_point(pos)
         rect = QRectF(self.start_point, pos).normalized()
         if rect.width() < 5 or rect.height() < 5:
             self.update_dimmer(QRectF())
+            if self.mode == "qr" and self.qr_content:
+                # A click accepts the code highlighted while hovering
+                self.show_qr_result(self.qr_content)
             return
         if self.mode == "qr":
             self.handle_qr_selection(rect)
@@ -203,21 +382,11 @@ class Snipper(QWidget):
             self.process_rect_capture(rect)
 
     def handle_qr_selection(self, rect_f):
-        rect = rect_f.toRect()
-        img_rect = self.original_pixmap.rect()
-        safe_rect = rect.intersected(img_rect)
+        safe_rect = self.capture_rect(rect_f)
         if safe_rect.width() > 0 and safe_rect.height() > 0:
-            cropped = self.original_pixmap.copy(safe_rect)
-            cv_raw = convert_qpixmap_to_opencv(cropped)
-            content = detect_qr_content(cv_raw)
+            content = detect_qr_content(self.crop_capture(safe_rect))
             if content:
-                # Si encontramos contenido, abrimos el diálogo (que tiene su propio manejo)
-                dialog = QRDialog(content, self.icons_path)
-                res = dialog.exec()
-                if res == 999:
-                    QApplication.quit()
-                else:
-                    self.close()
+                self.show_qr_result(content)
             else:
                 # CORRECCIÓN: Salir primero, luego mostrar mensaje
                 self.close()
@@ -226,11 +395,25 @@ class Snipper(QWidget):
         else:
             self.close()
 
+    def show_qr_result(self, content):
+        # Si encontramos contenido, abrimos el diálogo (que tiene su propio manejo)
+        dialog = QRDialog(content, self.icons_path)
+        res = dialog.exec()
+        if res == 999:
+            QApplication.quit()
+        else:
+            self.close()
+
     def process_rect_capture(self, rect_f):
-        rect = rect_f.toRect()
+        rect = self.capture_rect(rect_f)
         if rect.width() > 0 and rect.height() > 0:
-            cropped = self.original_pixmap.copy(rect)
-            self.finalize_capture(cropped)
+            latency.start("release_to_editor")
+            if self.should_regrab():
+                self.hide()
+                QApplication.processEvents()
+                QTimer.singleShot(REGRAB_DELAY_MS, lambda: self.finalize_capture(pixmap_from_array(self.grab_region(rect))))
+            else:
+                self.finalize_capture(pixmap_from_array(self.crop_capture(rect)))
         else:
             self.close()
 
@@ -246,6 +429,31 @@ class Snipper(QWidget):
         msg.setStyleSheet("QMessageBox { background-color: #171718; color: white; } QLabel { color: white; } QPushButton { background-color: #333; color: white; }")
         msg.exec()
 
+    def memory_usage(self):
+        size = pixmap_bytes(self.original_pixmap)
+        if self.capture_array is not None:
+            size += self.capture_array.nbytes
+        return {"snapshots": size}
+
+    def trim_memory(self):
+        return False
+
+    def release_capture(self):
+        if self.original_pixmap is not None:
+            self.bg_item.setPixmap(QPixmap())
+            self.original_pixmap = None
+        # The edge index builder and the QR scanner may still be reading the frame;
+        # only pool it once both are done
+        reusable = self.edge_index is None or self.edge_index.ready.wait(EDGE_INDEX_RELEASE_TIMEOUT)
+        if self.qr_scanner is not None:
+            reusable = self.qr_scanner.close() and reusable
+        if reusable:
+            buffer_pool.release(self.capture_array)
+        self.capture_array = None
+        self.edge_index = None
+        self.qr_scanner = None
+
     def closeEvent(self, event):
+        self.release_capture()
         self.closed_signal.emit()
         super().closeEvent(event)
@@ -0,0 +1,11 @@
+import sys
+from ipc import build_parser, command_from_args, send_command
+
+# Entry point for keyboard shortcuts and scripts: when SparkyShot is already running
+# the command is handed over and this process exits before importing the GUI stack
+if __name__ == '__main__':
+    args, qt_args = build_parser().parse_known_args()
+    if not args.tray and send_command(command_from_args(args)):
+        sys.exit(0)
+    import main
+    sys.exit(main.run(args, qt_args))
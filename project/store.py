@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import mmap
+import zlib
+import hashlib
+import argparse
+import threading
+import cv2
+import numpy as np
+
+from utils import app_data_path
+
+TILE_SIZE = 128
+TILE_LEVEL = 1
+DIGEST_SIZE = 16
+# dHash bits that may differ for two captures to count as near duplicates
+NEAR_DISTANCE = 6
+PACK_NAME = "tiles.pack"
+TILE_INDEX_NAME = "tiles.jsonl"
+CAPTURES_NAME = "captures.jsonl"
+
+def tile_hash(tile):
+    # The shape is part of the key so edge tiles never collide with full ones
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(np.array(tile.shape, np.uint32).tobytes())
+    digest.update(np.ascontiguousarray(tile).data)
+    return digest.hexdigest()
+
+def dhash(array):
+    # 64-bit difference hash: 9x8 gray thumbnail, one bit per horizontal gradient
+    gray = array if array.ndim == 2 else cv2.cvtColor(array, cv2.COLOR_BGRA2GRAY if array.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+class TileStore:
+    # Captures are cut into TILE_SIZE tiles and each distinct tile is stored once,
+    # zlib compressed, in an append-only pack. A capture is a manifest of tile hashes
+    # plus a dHash, so captures of a mostly unchanged screen add only the tiles that
+    # changed, and duplicates are found by comparing 64-bit hashes.
+    def __init__(self, root=None):
+        self.root = root or app_data_path("store")
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.tiles = {}
+        self.captures = {}
+        self.pack = None
+        self.pack_file = None
+        self.load()
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def read_lines(self, name):
+        path = self.path(name)
+        if not os.path.exists(path): return []
+        records = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash while it was being written
+                    continue
+        return records
+
+    def load(self):
+        pack_path = self.path(PACK_NAME)
+        pack_size = os.path.getsize(pack_path) if os.path.exists(pack_path) else 0
+        for record in self.read_lines(TILE_INDEX_NAME):
+            if record["offset"] + record["length"] <= pack_size:
+                self.tiles[record["hash"]] = (record["offset"], record["length"])
+        for record in self.read_lines(CAPTURES_NAME):
+            if all(h in self.tiles for h in record["tiles"]):
+                self.captures[record["name"]] = record
+
+    def put(self, name, array):
+        height, width = array.shape[:2]
+        hashes = []
+        new_tiles = []
+        pending = set()
+        for y in range(0, height, TILE_SIZE):
+            for x in range(0, width, TILE_SIZE):
+                tile = array[y:y + TILE_SIZE, x:x + TILE_SIZE]
+                key = tile_hash(tile)
+                hashes.append(key)
+                if key not in self.tiles and key not in pending:
+                    pending.add(key)
+                    new_tiles.append((key, zlib.compress(np.ascontiguousarray(tile).data, TILE_LEVEL)))
+        record = {"name": name, "width": width, "height": height, "channels": array.shape[2],
+                  "tile": TILE_SIZE, "dhash": f"{dhash(array):016x}", "tiles": hashes}
+        with self.lock:
+            # Pack first, index second, manifest last: every line points at bytes already on disk
+            with open(self.path(PACK_NAME), "ab") as pack, open(self.path(TILE_INDEX_NAME), "a") as index:
+                offset = pack.tell()
+                for key, data in new_tiles:
+                    pack.write(data)
+                    self.tiles[key] = (offset, len(data))
+                    index.write(json.dumps({"hash": key, "offset": offset, "length": len(data)}) + "\n")
+                    offset += len(data)
+            with open(self.path(CAPTURES_NAME), "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self.captures[name] = record
+        return record
+
+    def remove(self, names):
+        # Drops capture manifests. Tiles are shared between captures and the pack is
+        # append-only, so their bytes stay and are reused if the same tiles come back.
+        names = set(names)
+        with self.lock:
+            for name in names:
+                self.captures.pop(name, None)
+            tmp_path = self.path(CAPTURES_NAME + ".tmp")
+            with open(tmp_path, "w") as f:
+                for record in self.captures.values():
+                    f.write(json.dumps(record) + "\n")
+            os.replace(tmp_path, self.path(CAPTURES_NAME))
+
+    def read_tile(self, key):
+        offset, length = self.tiles[key]
+        if self.pack is None or offset + length > len(self.pack):
+            # Tiles were appended since the pack was mapped
+            self.close()
+            self.pack_file = open(self.path(PACK_NAME), "rb")
+            self.pack = mmap.mmap(self.pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return zlib.decompress(self.pack[offset:offset + length])
+
+    def get(self, name):
+        record = self.captures.get(name)
+        if record is None: return None
+        width, height, channels, size = record["width"], record["height"], record["channels"], record["tile"]
+        array = np.empty((height, width, channels), np.uint8)
+        keys = iter(record["tiles"])
+        with self.lock:
+            for y in range(0, height, size):
+                for x in range(0, width, size):
+                    view = array[y:y + size, x:x + size]
+                    view[...] = np.frombuffer(self.read_tile(next(keys)), np.uint8).reshape(view.shape)
+        return array
+
+    def find_similar(self, array, max_distance=NEAR_DISTANCE):
+        # (distance, name) of stored captures whose dHash is within max_distance, closest first
+        target = dhash(array)
+        with self.lock:
+            # The history worker adds captures while the GUI thread looks them up
+            captures = list(self.captures.items())
+        matches = []
+        for name, record in captures:
+            distance = hamming(target, int(record["dhash"], 16))
+            if distance <= max_distance:
+                matches.append((distance, name))
+        return sorted(matches)
+
+    def stats(self):
+        with self.lock:
+            records = list(self.captures.values())
+            tiles = list(self.tiles.values())
+        logical = sum(r["width"] * r["height"] * r["channels"] for r in records)
+        stored = sum(length for _, length in tiles)
+        return {"captures": len(records), "tiles": len(tiles), "logical_bytes": logical, "stored_bytes": stored}
+
+    def close(self):
+        if self.pack is not None:
+            self.pack.close()
+            self.pack = None
+        if self.pack_file is not None:
+            self.pack_file.close()
+            self.pack_file = None
+
+def main(argv=None):
+    from PyQt6.QtGui import QImage
+    from utils import to_canvas_image, array_from_image, image_from_array
+    parser = argparse.ArgumentParser(description="SparkyShot deduplicating capture store")
+    parser.add_argument("--root", help="Store directory (default: the app data store)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Add image files to the store")
+    add.add_argument("images", nargs="+")
+    get = commands.add_parser("get", help="Write a stored capture to an image file")
+    get.add_argument("name")
+    get.add_argument("output")
+    find = commands.add_parser("find", help="List stored captures similar to an image")
+    find.add_argument("image")
+    find.add_argument("--distance", type=int, default=NEAR_DISTANCE)
+    commands.add_parser("stats", help="Show deduplication statistics")
+    args = parser.parse_args(argv)
+
+    store = TileStore(args.root)
+
+    def read(path):
+        image = QImage(path)
+        if image.isNull():
+            parser.error(f"cannot read {path}")
+        image = to_canvas_image(image)
+        return array_from_image(image).copy()
+
+    if args.command == "add":
+        for path in args.images:
+            name = os.path.basename(path)
+            array = read(path)
+            for distance, match in store.find_similar(array, 0):
+                print(f"{name}: looks identical to {match}")
+            store.put(name, array)
+    elif args.command == "get":
+        array = store.get(args.name)
+        if array is None:
+            print(f"{args.name} is not in the store", file=sys.stderr)
+            return 1
+        image_from_array(array).save(args.output)
+    elif args.command == "find":
+        for distance, name in store.find_similar(read(args.image), args.distance):
+            print(f"{distance:3d}  {name}")
+    else:
+        stats = store.stats()
+        ratio = stats["logical_bytes"] / max(stats["stored_bytes"], 1)
+        print(f"{stats['captures']} captures, {stats['tiles']} unique tiles, "
+              f"{stats['stored_bytes'] / 1e6:.1f} MB stored for {stats['logical_bytes'] / 1e6:.1f} MB of pixels ({ratio:.1f}x)")
+    store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,13 @@
 from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QPushButton, QSlider, QColorDialog,
-                             QDialog, QFrame, QLabel, QSpinBox, QVBoxLayout, QInputDialog)
+                             QDialog, QFrame, QLabel, QSpinBox, QVBoxLayout, QInputDialog,
+                             QGridLayout, QFileDialog, QMessageBox)
 from PyQt6.QtGui import QIcon, QColor, QPen, QCursor, QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer
 import os
-from utils import load_svg_icon
+from utils import load_svg_icon, APP_VERSION
+from metrics import latency, METRICS
+from memory import memory_report, memory_ceiling, CATEGORIES
+from capture import benchmark_report, select_backend
 
 class AboutDialog(QDialog):
     def __init__(self, icons_path):
@@ -47,7 +51,7 @@ class AboutDialog(QDialog):
 
         lbl_title = QLabel("SparkyShot")
         lbl_title.setStyleSheet("font-size: 22px; font-weight: bold; color: white;")
-        lbl_ver = QLabel("Version 1.0")
+        lbl_ver = QLabel(f"Version {APP_VERSION}")
         lbl_ver.setStyleSheet("font-size: 14px; color: #888; margin-bottom: 10px;")
         lbl_credits = QLabel("Created by: SrWyatt\n2026")
         lbl_credits.setStyleSheet("font-size: 14px; color: #ccc;")
@@ -65,6 +69,113 @@ class AboutDialog(QDialog):
         layout.addWidget(lbl_img)
         layout.addLayout(text_layout)
 
+class DebugPanel(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("SparkyShot Debug")
+        self.setStyleSheet("""
+            QDialog { background-color: #171718; border: 1px solid #333; }
+            QLabel { color: #E0E0E0; font-family: monospace; font-size: 12px; }
+            QLabel#Header { color: #888; font-weight: bold; }
+            QPushButton {
+                background-color: #333333;
+                color: white;
+                border: 1px solid #444;
+                border-radius: 5px;
+                padding: 6px 20px;
+            }
+            QPushButton:hover { background-color: #444444; border-color: #555; }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 15, 15, 15)
+
+        self.grid = QGridLayout()
+        self.grid.setHorizontalSpacing(18)
+        for col, title in enumerate(["Latency (ms)", "n", "p50", "p95", "p99", "last"]):
+            lbl = QLabel(title)
+            lbl.setObjectName("Header")
+            self.grid.addWidget(lbl, 0, col)
+
+        self.cells = {}
+        for row, (name, label) in enumerate(METRICS.items(), start=1):
+            self.grid.addWidget(QLabel(label), row, 0)
+            self.cells[name] = []
+            for col in range(1, 6):
+                cell = QLabel("-")
+                cell.setAlignment(Qt.AlignmentFlag.AlignRight)
+                self.grid.addWidget(cell, row, col)
+                self.cells[name].append(cell)
+        layout.addLayout(self.grid)
+
+        mem_grid = QGridLayout()
+        mem_grid.setHorizontalSpacing(18)
+        header = QLabel("Memory (MB)")
+        header.setObjectName("Header")
+        mem_grid.addWidget(header, 0, 0)
+        self.mem_cells = {}
+        for row, name in enumerate(CATEGORIES + ("total", "ceiling"), start=1):
+            mem_grid.addWidget(QLabel(name.replace("_", " ")), row, 0)
+            cell = QLabel("-")
+            cell.setAlignment(Qt.AlignmentFlag.AlignRight)
+            mem_grid.addWidget(cell, row, 1)
+            self.mem_cells[name] = cell
+        layout.addLayout(mem_grid)
+
+        self.lbl_capture = QLabel()
+        layout.addWidget(self.lbl_capture)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        btn_bench = QPushButton("Benchmark Capture")
+        btn_bench.setToolTip("Time every capture backend on this display and switch to the fastest")
+        btn_bench.clicked.connect(self.benchmark_capture)
+        btn_row.addWidget(btn_bench)
+        btn_dump = QPushButton("Dump...")
+        btn_dump.clicked.connect(self.dump)
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.close)
+        btn_row.addWidget(btn_dump)
+        btn_row.addWidget(btn_close)
+        layout.addLayout(btn_row)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        for name, stats in latency.report().items():
+            if name not in self.cells: continue
+            values = [stats["count"], stats["p50"], stats["p95"], stats["p99"], stats["last"]]
+            for cell, value in zip(self.cells[name], values):
+                if value is None: cell.setText("-")
+                elif isinstance(value, int): cell.setText(str(value))
+                else: cell.setText(f"{value:.1f}")
+
+        report = memory_report()
+        report["ceiling"] = memory_ceiling()
+        for name, cell in self.mem_cells.items():
+            value = report.get(name, 0)
+            if name == "ceiling" and value <= 0: cell.setText("none")
+            else: cell.setText(f"{value / (1024 * 1024):.1f}")
+
+        record = benchmark_report()
+        timings = ", ".join(f"{name} {ms:.1f} ms" for name, ms in record.get("timings", {}).items())
+        self.lbl_capture.setText(f"Capture backend: {record['chosen']} ({timings})" if record else "Capture backend: not measured yet")
+
+    def benchmark_capture(self):
+        try:
+            select_backend(True)
+        except RuntimeError as e:
+            QMessageBox.warning(self, "Capture", str(e))
+        self.refresh()
+
+    def dump(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Dump Metrics", "sparkyshot_latency.json", "JSON Files (*.json)")
+        if path:
+            latency.dump(path)
+
 class SliderDialog(QDialog):
     def __init__(self, title, current_val, min_val, max_val, parent=None):
         super().__init__(parent)
@@ -336,7 +447,13 @@ class EditorToolbar(QWidget):
                 self.btn_copy.setIcon(load_svg_icon(copy_path))
             self.btn_copy.setToolTip(original_tooltip)
 
-        QTimer.singleShot(1500, restore)
+        # A child timer dies with the toolbar, so closing the editor right after a
+        # copy cannot run restore() on deleted buttons
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(restore)
+        timer.timeout.connect(timer.deleteLater)
+        timer.start(1500)
 
     def on_tool_clicked(self, mode):
         self.tool_selected.emit(mode)
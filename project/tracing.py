@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from settings import get_setting
+
+MAX_EVENTS = 200000
+
+_trace_path = os.environ.get("SPARKYSHOT_TRACE") or None
+_events = []
+_lock = threading.Lock()
+_pid = os.getpid()
+
+class _NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+def enable(path):
+    global _trace_path
+    _trace_path = path
+
+def init_from_settings():
+    if _trace_path is None:
+        path = get_setting("debug/trace_path")
+        if path: enable(path)
+
+def is_enabled():
+    return _trace_path is not None
+
+def record(name, start_ns, end_ns, args=None):
+    event = {"name": name, "cat": "sparkyshot", "ph": "X", "pid": _pid, "tid": threading.get_ident(),
+             "ts": start_ns / 1000.0, "dur": (end_ns - start_ns) / 1000.0}
+    if args: event["args"] = args
+    with _lock:
+        if len(_events) < MAX_EVENTS:
+            _events.append(event)
+
+def span(name, **args):
+    if _trace_path is None: return _NULL_SPAN
+    return _Span(name, args)
+
+def traced(func):
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _trace_path is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, start, time.perf_counter_ns())
+    return wrapper
+
+# Chrome trace-event JSON, loadable in chrome://tracing or Perfetto
+def write_trace(path=None):
+    path = path or _trace_path
+    if not path: return
+    with _lock:
+        events = list(_events)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+atexit.register(write_trace)
@@ -0,0 +1,79 @@
+import os
+import sys
+import numpy as np
+from PyQt6.QtWidgets import QSystemTrayIcon, QMenu, QApplication
+from PyQt6.QtCore import QObject
+
+from snipper import Snipper
+from capture import capture_backend
+from hotkeys import GlobalHotkey
+from settings import get_setting
+from utils import load_svg_icon
+
+class TrayDaemon(QObject):
+    # Resident mode: the toolbar stays hidden and captures start from the tray icon or a
+    # global hotkey, with the screen grabber, icons and overlay code already warm.
+    def __init__(self, toolbar):
+        super().__init__()
+        self.toolbar = toolbar
+        self.tray = None
+        self.hotkey = None
+
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray = QSystemTrayIcon(load_svg_icon(os.path.join(toolbar.icons_path, "logo_sparkyshot_svg.svg")), self)
+            self.tray.setToolTip("SparkyShot")
+            self.tray.setContextMenu(self.build_menu())
+            self.tray.activated.connect(self.on_tray_activated)
+            self.tray.show()
+
+        sequence = get_setting("tray/hotkey")
+        if sequence:
+            try:
+                self.hotkey = GlobalHotkey(sequence, self)
+                self.hotkey.activated.connect(lambda: self.capture(get_setting("tray/hotkey_mode")))
+            except (OSError, ValueError) as e:
+                print(f"SparkyShot: global hotkey {sequence} unavailable: {e}", file=sys.stderr)
+
+        self.warm_up()
+
+    def build_menu(self):
+        menu = QMenu()
+        menu.addAction("Region Capture", lambda: self.capture("region"))
+        menu.addAction("Window Capture", lambda: self.capture("window"))
+        menu.addAction("Fullscreen", lambda: self.capture("fullscreen"))
+        menu.addAction("Scan QR", lambda: self.capture("qr"))
+        menu.addSeparator()
+        menu.addAction("Capture History", self.toolbar.open_history)
+        menu.addAction("Show Toolbar", self.toolbar.show)
+        menu.addAction("Quit", QApplication.quit)
+        self.menu = menu
+        return menu
+
+    def on_tray_activated(self, reason):
+        if reason == QSystemTrayIcon.ActivationReason.Trigger:
+            self.capture("region")
+
+    def capture(self, mode):
+        # A second press while an overlay is open would stack overlays
+        if self.toolbar.snipper is not None: return
+        self.toolbar.capture_now(mode)
+
+    def warm_up(self):
+        try:
+            capture_backend()
+        except Exception as e:
+            print(f"SparkyShot: capture backend unavailable: {e}", file=sys.stderr)
+        for name in os.listdir(self.toolbar.icons_path):
+            if name.endswith(".svg"):
+                load_svg_icon(os.path.join(self.toolbar.icons_path, name))
+        # The first overlay pays for widget, scene and style setup; do that now, off screen
+        overlay = Snipper(self.toolbar.icons_path, "region", frame=np.zeros((64, 64, 3), np.uint8))
+        overlay.release_capture()
+        overlay.deleteLater()
+
+    def close(self):
+        if self.hotkey is not None:
+            self.hotkey.close()
+            self.hotkey = None
+        if self.tray is not None:
+            self.tray.hide()
@@ -3,9 +3,21 @@ import os
 import cv2
 import numpy as np
 import math
+import functools
+from collections import Counter
 from PyQt6.QtGui import QImage, QPixmap, QIcon, QPainter, QColor
 from PyQt6.QtSvg import QSvgRenderer
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QStandardPaths
+from tracing import traced
+
+APP_VERSION = "1.0"
+
+# Canonical in-memory pixel format: 32-bit B,G,R,X bytes, which is both what mss
+# returns and Qt's native Format_RGB32 on little-endian machines
+CANVAS_FORMAT = QImage.Format.Format_RGB32
+# Full-frame pixel format conversions by function name, so tests and the debug
+# tooling can check the capture and edit paths stay conversion free
+frame_conversions = Counter()
 
 def resource_path(relative_path):
     try:
@@ -15,6 +27,13 @@ def resource_path(relative_path):
         base_path = os.path.join(base_path, '..')
     return os.path.join(base_path, relative_path)
 
+def app_data_path(*parts):
+    base = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation)
+    path = os.path.join(base, "SparkyShot", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+@functools.lru_cache(maxsize=256)
 def load_svg_icon(icon_path, size=64):
     if not os.path.exists(icon_path):
         return QIcon()
@@ -26,7 +45,9 @@ def load_svg_icon(icon_path, size=64):
     painter.end()
     return QIcon(pixmap)
 
+@traced
 def convert_qpixmap_to_opencv(qpixmap):
+    frame_conversions["convert_qpixmap_to_opencv"] += 1
     qimage = qpixmap.toImage()
     qimage = qimage.convertToFormat(QImage.Format.Format_RGBA8888)
     width = qimage.width()
@@ -36,7 +57,9 @@ def convert_qpixmap_to_opencv(qpixmap):
     arr = np.frombuffer(ptr, np.uint8).reshape((height, width, 4))
     return cv2.cvtColor(arr, cv2.COLOR_RGBA2BGR)
 
+@traced
 def convert_opencv_to_qpixmap(cv_img):
+    frame_conversions["convert_opencv_to_qpixmap"] += 1
     if cv_img.shape[2] == 3:
         cv_img = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
     elif cv_img.shape[2] == 4:
@@ -47,7 +70,35 @@ def convert_opencv_to_qpixmap(cv_img):
     qimage = QImage(cv_img.data, width, height, bytes_per_line, fmt)
     return QPixmap.fromImage(qimage.copy())
 
+def image_from_array(array):
+    # No copy: the QImage reads the array's memory, so the array must outlive it
+    height, width = array.shape[:2]
+    return QImage(array.data, width, height, array.strides[0], CANVAS_FORMAT)
+
+def array_from_image(image, writable=True):
+    # BGRX view of a 32-bit QImage; bits() detaches it first if it is shared, while
+    # a read-only view leaves shared pixels in place
+    ptr = image.bits() if writable else image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    rows = np.frombuffer(ptr, np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+def to_canvas_image(image):
+    if image.format() == CANVAS_FORMAT:
+        return image
+    frame_conversions["to_canvas_image"] += 1
+    return image.convertToFormat(CANVAS_FORMAT)
+
+def pixmap_from_array(array):
+    if array.ndim != 3 or array.shape[2] != 4:
+        return convert_opencv_to_qpixmap(array)
+    # One plain copy so the pixmap owns its pixels; capture arrays come from a
+    # buffer pool and are reused after release
+    return QPixmap.fromImage(image_from_array(np.ascontiguousarray(array)).copy())
+
+@traced
 def apply_pixelate(image, x, y, w, h, block_size=10):
+    # Modifies image in place (and returns it); pass a copy to keep the original
     if w < 1 or h < 1 or x < 0 or y < 0: return image
 
     img_h, img_w = image.shape[:2]
@@ -62,13 +113,14 @@ def apply_pixelate(image, x, y, w, h, block_size=10):
 
     small_w = max(1, w // block_size)
     small_h = max(1, h // block_size)
+    # Works in place on the ROI, so views into a canvas are updated directly
     small = cv2.resize(roi, (small_w, small_h), interpolation=cv2.INTER_LINEAR)
-    pixelated = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
-    result = image.copy()
-    result[y:y+h, x:x+w] = pixelated
-    return result
+    roi[:] = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+    return image
 
+@traced
 def apply_blur(image, x, y, w, h, kernel_size=51):
+    # Modifies image in place (and returns it); pass a copy to keep the original
     if w < 1 or h < 1 or x < 0 or y < 0: return image
 
     img_h, img_w = image.shape[:2]
@@ -77,14 +129,12 @@ def apply_blur(image, x, y, w, h, kernel_size=51):
     if w <= 0 or h <= 0: return image
 
     if kernel_size % 2 == 0: kernel_size += 1
-    result = image.copy()
-    roi = result[y:y+h, x:x+w]
+    roi = image[y:y+h, x:x+w]
 
     if roi.size == 0: return image
 
-    blurred = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 0)
-    result[y:y+h, x:x+w] = blurred
-    return result
+    roi[:] = cv2.GaussianBlur(roi, (kernel_size, kernel_size), 0)
+    return image
 
 def calculate_ngon_points(cx, cy, radius, sides):
     points = []
@@ -97,8 +147,11 @@ def calculate_ngon_points(cx, cy, radius, sides):
         points.append((px, py))
     return points
 
+@traced
 def detect_qr_content(image):
     try:
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
         detector = cv2.QRCodeDetector()
         data, bbox, _ = detector.detectAndDecode(image)
         if data: return data
@@ -0,0 +1,128 @@
+import os
+import sys
+import ctypes
+import ctypes.util
+from ctypes import c_int, c_uint, c_long, c_ulong, c_void_p, byref, POINTER
+from PyQt6.QtCore import QRect
+
+IS_VIEWABLE = 2
+
+class XWindowAttributes(ctypes.Structure):
+    _fields_ = [("x", c_int), ("y", c_int), ("width", c_int), ("height", c_int),
+                ("border_width", c_int), ("depth", c_int), ("visual", c_void_p),
+                ("root", c_ulong), ("c_class", c_int), ("bit_gravity", c_int),
+                ("win_gravity", c_int), ("backing_store", c_int), ("backing_planes", c_ulong),
+                ("backing_pixel", c_ulong), ("save_under", c_int), ("colormap", c_ulong),
+                ("map_installed", c_int), ("map_state", c_int), ("all_event_masks", c_long),
+                ("your_event_mask", c_long), ("do_not_propagate_mask", c_long),
+                ("override_redirect", c_int), ("screen", c_void_p)]
+
+def load_xlib():
+    path = ctypes.util.find_library("X11")
+    if not path: return None
+    xlib = ctypes.cdll.LoadLibrary(path)
+    xlib.XOpenDisplay.restype = c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XDefaultRootWindow.restype = c_ulong
+    xlib.XDefaultRootWindow.argtypes = [c_void_p]
+    xlib.XQueryTree.argtypes = [c_void_p, c_ulong, POINTER(c_ulong), POINTER(c_ulong),
+                                POINTER(POINTER(c_ulong)), POINTER(c_uint)]
+    xlib.XGetWindowAttributes.argtypes = [c_void_p, c_ulong, POINTER(XWindowAttributes)]
+    xlib.XFree.argtypes = [c_void_p]
+    xlib.XCloseDisplay.argtypes = [c_void_p]
+    xlib.XDefaultScreen.argtypes = [c_void_p]
+    xlib.XInternAtom.restype = c_ulong
+    xlib.XInternAtom.argtypes = [c_void_p, ctypes.c_char_p, c_int]
+    xlib.XGetSelectionOwner.restype = c_ulong
+    xlib.XGetSelectionOwner.argtypes = [c_void_p, c_ulong]
+    return xlib
+
+def _list_windows_x11():
+    xlib = load_xlib()
+    if xlib is None: return []
+    display = xlib.XOpenDisplay(None)
+    if not display: return []
+    rects = []
+    try:
+        root = xlib.XDefaultRootWindow(display)
+        root_ret, parent_ret = c_ulong(), c_ulong()
+        children, count = POINTER(c_ulong)(), c_uint()
+        if not xlib.XQueryTree(display, root, byref(root_ret), byref(parent_ret), byref(children), byref(count)):
+            return []
+        attrs = XWindowAttributes()
+        # XQueryTree lists children bottom to top
+        for i in reversed(range(count.value)):
+            if not xlib.XGetWindowAttributes(display, children[i], byref(attrs)): continue
+            if attrs.map_state != IS_VIEWABLE or attrs.override_redirect: continue
+            if attrs.width <= 1 or attrs.height <= 1: continue
+            border = attrs.border_width
+            rects.append(QRect(attrs.x, attrs.y, attrs.width + 2 * border, attrs.height + 2 * border))
+        if count.value:
+            xlib.XFree(children)
+    finally:
+        xlib.XCloseDisplay(display)
+    return rects
+
+def _compositing_x11():
+    xlib = load_xlib()
+    if xlib is None: return True
+    display = xlib.XOpenDisplay(None)
+    if not display: return True
+    try:
+        # A running compositing manager owns the _NET_WM_CM_S<screen> selection
+        atom = xlib.XInternAtom(display, b"_NET_WM_CM_S%d" % xlib.XDefaultScreen(display), 0)
+        return xlib.XGetSelectionOwner(display, atom) != 0
+    finally:
+        xlib.XCloseDisplay(display)
+
+def _list_windows_win32():
+    from ctypes import wintypes
+    user32 = ctypes.windll.user32
+    dwmapi = ctypes.windll.dwmapi
+    DWMWA_EXTENDED_FRAME_BOUNDS = 9
+    DWMWA_CLOAKED = 14
+    rects = []
+
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def callback(hwnd, _):
+        if not user32.IsWindowVisible(hwnd) or user32.IsIconic(hwnd): return True
+        cloaked = c_int(0)
+        dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, byref(cloaked), ctypes.sizeof(cloaked))
+        if cloaked.value: return True
+        rect = wintypes.RECT()
+        if dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_EXTENDED_FRAME_BOUNDS, byref(rect), ctypes.sizeof(rect)) != 0:
+            user32.GetWindowRect(hwnd, byref(rect))
+        w, h = rect.right - rect.left, rect.bottom - rect.top
+        if w > 1 and h > 1:
+            rects.append(QRect(rect.left, rect.top, w, h))
+        return True
+
+    # EnumWindows already walks top-level windows from top to bottom
+    user32.EnumWindows(callback, 0)
+    return rects
+
+# Top-level window bounds in global screen pixels, topmost first
+def list_windows():
+    try:
+        if sys.platform == "win32":
+            return _list_windows_win32()
+        if sys.platform.startswith("linux"):
+            return _list_windows_x11()
+    except (OSError, AttributeError):
+        pass
+    return []
+
+# Whether a translucent overlay will show the desktop underneath it
+def compositing_active():
+    if not sys.platform.startswith("linux") or os.environ.get("WAYLAND_DISPLAY"):
+        return True
+    try:
+        return _compositing_x11()
+    except (OSError, AttributeError):
+        return True
+
+def window_at(rects, point):
+    for rect in rects:
+        if rect.contains(point):
+            return rect
+    return None
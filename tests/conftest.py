@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import shutil
+import subprocess
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "project"))
+
+import numpy as np
+import pytest
+from PyQt6.QtCore import Qt, QCoreApplication, QSettings, QEventLoop, QTimer, QEvent, QPointF
+from PyQt6.QtGui import QMouseEvent, QPixmap, QColor
+from PyQt6.QtWidgets import QApplication
+
+ICONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "icons")
+
+@pytest.fixture(scope="session")
+def qapp():
+    app = QApplication.instance() or QApplication([])
+    yield app
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    QSettings.setPath(QSettings.Format.NativeFormat, QSettings.Scope.UserScope, str(tmp_path / "settings"))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+def spin(ms):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+def ui_frame(width=640, height=480):
+    # Canonical BGRA, as mss returns it
+    img = np.full((height, width, 4), 40, np.uint8)
+    img[..., 3] = 255
+    img[100:300, 120:400, :3] = 220
+    return img
+
+# Editor helpers: a plain capture and mouse drags fed to the editor's event filter
+def mouse(kind, pos):
+    buttons = Qt.MouseButton.NoButton if kind == QEvent.Type.MouseButtonRelease else Qt.MouseButton.LeftButton
+    return QMouseEvent(kind, QPointF(*pos), QPointF(*pos), Qt.MouseButton.LeftButton, buttons, Qt.KeyboardModifier.NoModifier)
+
+def drag(editor, tool, *points):
+    editor.set_tool(tool)
+    viewport = editor.view.viewport()
+    editor.eventFilter(viewport, mouse(QEvent.Type.MouseButtonPress, points[0]))
+    for p in points[1:]:
+        editor.eventFilter(viewport, mouse(QEvent.Type.MouseMove, p))
+    editor.eventFilter(viewport, mouse(QEvent.Type.MouseButtonRelease, points[-1]))
+
+def capture():
+    pixmap = QPixmap(640, 400)
+    pixmap.fill(QColor("#303030"))
+    return pixmap
+
+def annotate(editor):
+    drag(editor, "rect", (20, 20), (120, 90))
+    editor.set_color(QColor("#00ff00"))
+    editor.set_size(9)
+    drag(editor, "arrow", (200, 50), (300, 150))
+    drag(editor, "pen", (50, 200), (60, 210), (90, 205), (120, 240))
+    editor.set_poly_sides(5)
+    drag(editor, "polygon", (300, 200), (400, 300))
+    editor.set_blur(21)
+    drag(editor, "blur", (10, 10), (200, 120))
+    editor.push_undo(editor.annotation("text", pos=[420, 60], text="Hi"))
+    editor.refresh_canvas(editor.paint_text(QPointF(420, 60), "Hi"))
+
+@pytest.fixture
+def xvfb_display(monkeypatch):
+    from windows import load_xlib
+    if shutil.which("Xvfb") is None or load_xlib() is None:
+        pytest.skip("Xvfb and libX11 are required")
+    number = 90 + os.getpid() % 100
+    server = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{number}"
+    deadline = time.time() + 5
+    while not os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.05)
+    monkeypatch.setenv("DISPLAY", f":{number}")
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    yield
+    server.terminate()
+    server.wait()
@@ -0,0 +1,53 @@
+import json
+import numpy as np
+import benchmark
+
+RESULTS = {"apply_blur[1080p]": {"median_ms": 13.0}, "editor_paint_rect[1080p]": {"median_ms": 5.0}}
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    baseline = {"results": {"apply_blur[1080p]": {"median_ms": 10.0}, "editor_paint_rect[1080p]": {"median_ms": 4.5}}}
+    assert benchmark.compare(RESULTS, baseline, 0.25) == ["apply_blur[1080p]"]
+
+def test_benchmarks_missing_from_the_baseline_are_reported(qapp, tmp_path, monkeypatch, capsys):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps({"results": {"apply_blur[1080p]": {"median_ms": 13.0}}}))
+    assert benchmark.missing_entries(RESULTS, json.loads(path.read_text())) == ["editor_paint_rect[1080p]"]
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda sizes, repeat: RESULTS)
+    assert benchmark.main(["--sizes", "1080p", "--baseline", str(path)]) == 2
+    out, err = capsys.readouterr()
+    assert "editor_paint_rect[1080p]" in out and "MISSING" in out
+    assert "no baseline entry" in err
+
+def test_committed_baseline_covers_every_benchmark():
+    recorded = json.load(open(benchmark.DEFAULT_BASELINE))["results"]
+    for name in ("editor_refresh_dirty[1080p]", "diff_changed[1080p]", "detect_qr_content"):
+        assert name in recorded
+
+def test_missing_baseline_fails_unless_disabled(qapp, tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda sizes, repeat: RESULTS)
+    missing = str(tmp_path / "missing.json")
+    assert benchmark.main(["--sizes", "1080p", "--baseline", missing]) == 2
+    assert benchmark.main(["--sizes", "1080p", "--baseline", missing, "--no-compare"]) == 0
+    assert benchmark.main(["--sizes", "1080p", "--baseline", missing, "--save-baseline"]) == 0
+    assert json.load(open(missing))["results"] == RESULTS
+    assert benchmark.main(["--sizes", "1080p", "--baseline", missing]) == 0
+
+def test_editor_paint_bench_includes_canvas_update(qapp, monkeypatch):
+    from editor import EditorWindow
+    calls = []
+    monkeypatch.setattr(EditorWindow, "refresh_canvas", lambda self, dirty=None: calls.append(dirty))
+    pixmap = benchmark.convert_opencv_to_qpixmap(benchmark.synthetic_frame(1280, 720))
+    results = benchmark.bench_editor(pixmap, 1)
+    assert "editor_paint_rect" in results
+    assert len(calls) == 12
+
+def test_filter_benchmarks_time_an_untouched_frame(monkeypatch):
+    frame = benchmark.synthetic_frame(640, 560)
+    original = frame.copy()
+    seen = []
+    monkeypatch.setattr(benchmark, "apply_blur", 
+                        lambda image, *a: seen.append(np.array_equal(image, original)) or image.fill(0))
+    monkeypatch.setattr(benchmark, "apply_pixelate", lambda image, *a: seen.append(image is not frame))
+    benchmark.bench_utils(frame, benchmark.pixmap_from_array(frame), 2)
+    assert seen == [True] * 6
+    assert np.array_equal(frame, original)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from PyQt6.QtCore import QRect, QRectF
+from PyQt6.QtGui import QImage, QPainter, QColor, QPixmap
+from conftest import spin
+from canvas import TiledImageItem, TILE_SIZE, canvas_image, build_levels
+from utils import array_from_image
+
+def random_image(width, height, seed=1):
+    data = np.random.default_rng(seed).integers(0, 255, (height, width, 4), np.uint8)
+    data[..., 3] = 255
+    return QImage(data.data, width, height, width * 4, QImage.Format.Format_RGB32).copy()
+
+def wait_for_pyramid(item):
+    for _ in range(200):
+        if item.levels is not None: return
+        spin(10)
+    raise AssertionError("pyramid was not built")
+
+def test_level_selection_follows_zoom(qapp):
+    item = TiledImageItem(random_image(4000, 1000))
+    assert item.level_count() == 4
+    assert item.level_for_scale(1.0) == 0
+    assert item.level_for_scale(2.0) == 0
+    assert item.level_for_scale(0.6) == 0
+    assert item.level_for_scale(0.5) == 1
+    assert item.level_for_scale(0.3) == 1
+    assert item.level_for_scale(0.1) == 3
+    assert item.tile_rect(2, 1, 0) == QRect(TILE_SIZE * 4, 0, TILE_SIZE * 4, TILE_SIZE * 4)
+
+def test_pyramid_is_built_off_thread_with_expected_sizes(qapp):
+    item = TiledImageItem(random_image(2001, 1101))
+    wait_for_pyramid(item)
+    assert [lvl.shape[:2] for lvl in item.levels] == [(551, 1001), (276, 501)]
+
+def test_dirty_update_matches_full_rebuild(qapp):
+    image = random_image(3001, 1777)
+    item = TiledImageItem(image)
+    wait_for_pyramid(item)
+    painter = QPainter(image)
+    painter.fillRect(QRect(777, 333, 411, 299), QColor(10, 200, 30))
+    painter.end()
+    item.set_source(image, QRect(777, 333, 411, 299))
+    expected = build_levels(array_from_image(image, writable=False))
+    for got, want in zip(item.levels, expected):
+        assert np.array_equal(got, want)
+
+def test_level_zero_keeps_no_tile_copies(qapp):
+    from PyQt6.QtWidgets import QGraphicsScene, QGraphicsView
+    item = TiledImageItem(QPixmap.fromImage(random_image(3000, 2000)))
+    scene = QGraphicsScene()
+    scene.addItem(item)
+    view = QGraphicsView(scene)
+    view.resize(800, 600)
+    view.show()
+    wait_for_pyramid(item)
+    view.grab()
+    assert not item.tiles
+    view.scale(0.25, 0.25)
+    view.grab()
+    assert item.tiles and all(key[0] == 2 for key in item.tiles)
+
+def test_editor_undo_updates_pyramid_incrementally(qapp, monkeypatch):
+    from editor import EditorWindow
+    editor = EditorWindow(QPixmap.fromImage(random_image(2400, 1600)), "icons")
+    item = editor.image_item
+    wait_for_pyramid(item)
+    monkeypatch.setattr(item, "start_pyramid", lambda: pytest.fail("undo rebuilt the whole pyramid"))
+    editor.push_undo()
+    editor.paint_shape("rect", QRectF(300, 200, 500, 400))
+    editor.refresh_canvas(QRectF(300, 200, 500, 400))
+    editor.undo_action()
+    image = editor.canvas
+    expected = build_levels(array_from_image(image, writable=False))
+    assert all(np.array_equal(got, want) for got, want in zip(item.levels, expected))
+    editor.redo_action()
+    image = editor.canvas
+    expected = build_levels(array_from_image(image, writable=False))
+    assert all(np.array_equal(got, want) for got, want in zip(item.levels, expected))
+    editor.release_buffers()
+
+def test_editor_uploads_only_dirty_rects(qapp, monkeypatch):
+    from editor import EditorWindow
+    import canvas
+    editor = EditorWindow(QPixmap.fromImage(random_image(1200, 800)), "icons")
+    item = editor.image_item
+    monkeypatch.setattr(canvas.QPixmap, "fromImage", lambda *a: pytest.fail("display pixmap rebuilt"))
+    rect = QRectF(100, 100, 300, 200)
+    editor.push_undo()
+    editor.paint_shape("blur", rect)
+    editor.refresh_canvas(rect)
+    assert item.display.toImage().convertToFormat(editor.canvas.format()) == editor.canvas
+    editor.undo_action()
+    assert item.display.toImage().convertToFormat(editor.canvas.format()) == editor.undo_stack[-1]
+    editor.release_buffers()
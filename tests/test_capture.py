@@ -0,0 +1,78 @@
+import json
+import time
+import numpy as np
+import pytest
+from PyQt6.QtCore import QRect
+import capture
+from capture import CaptureBackend, QtBackend, select_backend, capture_backend
+from settings import get_setting, set_setting
+from conftest import ICONS_PATH, ui_frame
+
+class FakeBackend(CaptureBackend):
+    delay = 0
+    created = 0
+
+    def __init__(self):
+        type(self).created += 1
+
+    def bounds(self):
+        return 10, 20, 640, 480
+
+    def grab(self, left, top, width, height, out=None):
+        time.sleep(self.delay)
+        frame = ui_frame(640, 480)[top - 20:top - 20 + height, left - 10:left - 10 + width]
+        if out is None: return frame.copy()
+        out[:] = frame
+        return out
+
+class SlowBackend(FakeBackend):
+    name = "slow"
+    delay = 0.02
+
+class FastBackend(FakeBackend):
+    name = "fast"
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    monkeypatch.setattr(capture, "BACKENDS", {"slow": SlowBackend, "fast": FastBackend})
+    monkeypatch.setattr(capture, "_backend", None)
+
+def test_qt_backend_grabs_the_desktop(qapp):
+    backend = QtBackend()
+    left, top, width, height = backend.bounds()
+    frame = backend.grab(left, top, width, height)
+    assert frame.shape == (height, width, 4) and frame.dtype == np.uint8
+    part = backend.grab(left + 5, top + 5, 30, 20, np.empty((20, 30, 4), np.uint8))
+    assert part.shape == (20, 30, 4)
+
+def test_fastest_backend_is_chosen_and_recorded(qapp, fake_backends, monkeypatch):
+    assert capture_backend().name == "fast"
+    record = json.loads(get_setting("capture/benchmark"))
+    assert record["chosen"] == "fast" and record["timings"]["slow"] > record["timings"]["fast"]
+    # Later runs on the same display reuse the recorded choice without measuring
+    monkeypatch.setattr(capture, "benchmark_backends", lambda: pytest.fail("benchmarked again"))
+    monkeypatch.setattr(capture, "_backend", None)
+    assert capture_backend().name == "fast"
+
+def test_display_change_or_request_reruns_benchmark(qapp, fake_backends, monkeypatch):
+    capture_backend()
+    runs = []
+    benchmark = capture.benchmark_backends
+    monkeypatch.setattr(capture, "benchmark_backends", lambda: runs.append(1) or benchmark())
+    select_backend(True)
+    monkeypatch.setattr(capture, "display_signature", lambda: "another layout")
+    select_backend()
+    assert len(runs) == 2
+
+def test_pinned_backend_skips_benchmark(qapp, fake_backends, monkeypatch):
+    set_setting("capture/backend", "slow")
+    monkeypatch.setattr(capture, "benchmark_backends", lambda: pytest.fail("benchmarked a pinned backend"))
+    assert capture_backend().name == "slow"
+
+def test_snipper_captures_through_backend(qapp, fake_backends):
+    import snipper
+    overlay = snipper.Snipper(ICONS_PATH, "region")
+    assert overlay.capture_origin == (10, 20)
+    assert np.array_equal(overlay.capture_array, ui_frame(640, 480))
+    assert np.array_equal(overlay.grab_region(QRect(100, 100, 50, 40)), ui_frame(640, 480)[100:140, 100:150])
+    overlay.release_capture()
@@ -0,0 +1,40 @@
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import QApplication
+from conftest import ICONS_PATH, drag
+from benchmark import synthetic_frame
+from utils import image_from_array, CANVAS_FORMAT
+from memory import memory_report
+from clipboard import ImageMimeData
+from editor import EditorWindow
+
+def test_copy_encodes_formats_only_on_request(qapp, monkeypatch):
+    frame = synthetic_frame(900, 600)
+    editor = EditorWindow(QPixmap.fromImage(image_from_array(frame)), ICONS_PATH)
+    encoded = []
+    encode = ImageMimeData.encode
+    monkeypatch.setattr(ImageMimeData, "encode", lambda self, mime: encoded.append(mime) or encode(self, mime))
+    editor.copy_image()
+    mime = QApplication.clipboard().mimeData()
+    assert isinstance(mime, ImageMimeData) and "image/bmp" in mime.formats()
+    assert encoded == [] and int(mime.image.constBits()) == int(editor.canvas.constBits())
+    png = mime.data("image/png")
+    mime.data("image/png")
+    assert encoded == ["image/png"]
+    assert QImage.fromData(png).convertToFormat(CANVAS_FORMAT) == image_from_array(frame)
+    assert QImage.fromData(mime.data("image/bmp")).size() == editor.canvas.size()
+    assert encoded == ["image/png", "image/bmp"]
+    assert memory_report()["clipboard"] >= editor.canvas.sizeInBytes() + png.size()
+    assert mime.trim_memory() and not mime.trim_memory()
+    editor.release_buffers()
+
+def test_clipboard_keeps_the_copied_pixels_after_edits_and_close(qapp):
+    frame = synthetic_frame(700, 560)
+    editor = EditorWindow(QPixmap.fromImage(image_from_array(frame)), ICONS_PATH)
+    editor.resize(800, 600)
+    editor.copy_image()
+    # The editor is never shown, so the view centers the image on the widget origin
+    drag(editor, "rect", (350, 260), (450, 330))
+    assert editor.canvas != image_from_array(frame)
+    editor.journal.close(discard=True)
+    editor.release_buffers()
+    assert QApplication.clipboard().image() == image_from_array(frame)
@@ -0,0 +1,68 @@
+import numpy as np
+from PyQt6.QtCore import QItemSelectionModel
+from PyQt6.QtGui import QPixmap
+from conftest import ICONS_PATH
+from benchmark import synthetic_frame
+from utils import image_from_array
+import diff
+from diff import block_mask, compare, estimate_shift, images_differ, BLOCK_SIZE
+
+def test_changed_blocks_become_regions():
+    before = synthetic_frame(1280, 720)
+    after = before.copy()
+    after[100:130, 200:300] = 0
+    after[600:610, 1270:1280] = 255
+    view, regions = compare(before, after, shift=(0, 0))
+    assert view.shape == after.shape
+    assert sorted(regions) == [(192, 96, 128, 64), (1248, 576, 32, 64)]
+    assert compare(before, before.copy(), shift=(0, 0))[1] == []
+
+def test_noise_below_threshold_is_ignored():
+    before = synthetic_frame(640, 480)
+    after = before.copy()
+    after[..., :3] = np.clip(after[..., :3].astype(int) + 3, 0, 255)
+    assert not images_differ(before, after)
+    assert images_differ(before, after, threshold=0)
+
+def test_shifted_captures_are_aligned():
+    frame = synthetic_frame(1400, 900)
+    before, after = frame[20:820, 30:1230], frame[9:809, 47:1247]
+    assert estimate_shift(before, after) == (-17, 11)
+    view, regions = compare(before, after)
+    assert regions == [] and view.shape[:2] == (789, 1183)
+
+def test_early_exit_stops_scanning(monkeypatch):
+    before = synthetic_frame(640, 640)
+    after = before.copy()
+    after[0:5, 0:5] = 0
+    after[600:605, 600:605] = 0
+    bands = []
+    norm = diff.cv2.norm
+    monkeypatch.setattr(diff.cv2, "norm", lambda *a: bands.append(1) or norm(*a))
+    mask = block_mask(before, after, limit=1)
+    assert len(bands) == 1 and mask.sum() == 1
+    assert block_mask(before, after).sum() == 2
+
+def test_compare_from_history_highlights_in_editor(qapp, tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr(main.FloatingToolbar, "recover_sessions", lambda self: None)
+    toolbar = main.FloatingToolbar()
+    toolbar.history.root = str(tmp_path)
+    before = synthetic_frame(800, 500)
+    after = before.copy()
+    after[200:260, 300:420] = (0, 0, 255, 255)
+    for frame in (before, after):
+        toolbar.history.add(QPixmap.fromImage(image_from_array(frame)))
+    toolbar.history.wait()
+    toolbar.open_history()
+    gallery = toolbar.history_gallery
+    selection = gallery.view.selectionModel()
+    for row in (0, 1):
+        selection.select(gallery.model.index(row), QItemSelectionModel.SelectionFlag.Select)
+    assert gallery.btn_compare.isEnabled()
+    gallery.compare_selected()
+    editor = toolbar.editor
+    assert editor.capture_mode == "compare"
+    assert [item.rect().getRect() for item in editor.diff_items] == [(288, 192, 160, 96)]
+    editor.release_buffers()
+    toolbar.history.close()
@@ -0,0 +1,68 @@
+import os
+import pytest
+from conftest import ICONS_PATH, capture, drag, annotate
+import document
+from document import Document, DocumentError
+from editor import EditorWindow
+
+@pytest.fixture
+def editor(qapp):
+    editor = EditorWindow(capture(), ICONS_PATH)
+    editor.resize(800, 600)
+    yield editor
+    editor.release_buffers()
+
+def test_reopened_project_renders_identically(editor, tmp_path):
+    annotate(editor)
+    path = str(tmp_path / "shot.sparky")
+    editor.save_project(path)
+    doc, base, ops = Document.open(path)
+    assert [op["tool"] for op in ops] == ["rect", "arrow", "pen", "polygon", "blur", "text"]
+    assert len(ops[2]["points"]) == 4 and ops[3]["sides"] == 5 and ops[4]["value"] == 21
+    reopened = EditorWindow(base, ICONS_PATH, "project", doc, ops)
+    assert reopened.canvas == editor.canvas
+    reopened.undo_action()
+    assert len(reopened.annotations) == 5
+    reopened.release_buffers()
+
+def test_resave_appends_only_changed_annotations(editor, tmp_path, monkeypatch):
+    path = str(tmp_path / "shot.sparky")
+    annotate(editor)
+    editor.save_project(path)
+    size = os.path.getsize(path)
+    monkeypatch.setattr(document, "encode_pixmap", lambda pixmap: pytest.fail("base image re-encoded"))
+    editor.save_project(path)
+    assert os.path.getsize(path) == size
+    editor.undo_action()
+    drag(editor, "circle", (500, 300), (600, 380))
+    editor.save_project(path)
+    assert 0 < os.path.getsize(path) - size < 400
+    _, _, ops = Document.open(path)
+    assert [op["tool"] for op in ops] == ["rect", "arrow", "pen", "polygon", "blur", "circle"]
+
+def test_compaction_rewrites_without_reencoding(editor, tmp_path, monkeypatch):
+    path = str(tmp_path / "shot.sparky")
+    editor.save_project(path)
+    monkeypatch.setattr(document, "encode_pixmap", lambda pixmap: pytest.fail("base image re-encoded"))
+    monkeypatch.setattr(document, "COMPACT_MIN_BYTES", 0)
+    for i in range(6):
+        drag(editor, "rect", (10 + i, 10), (50 + i, 40))
+        editor.save_project(path)
+    doc, _, ops = Document.open(path)
+    assert len(ops) == 6
+    assert doc.ops_bytes <= document.COMPACT_FACTOR * len(document.ops_payload(0, ops))
+
+def test_torn_append_is_ignored(editor, tmp_path):
+    path = str(tmp_path / "shot.sparky")
+    drag(editor, "rect", (20, 20), (120, 90))
+    editor.save_project(path)
+    with open(path, "ab") as f:
+        f.write(document.encode_chunk(b"OPS ", b'{"keep": 0, "ops": []}')[:-3])
+    _, _, ops = Document.open(path)
+    assert len(ops) == 1
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "image.sparky"
+    path.write_bytes(b"\x89PNG\r\n")
+    with pytest.raises(DocumentError):
+        Document.open(str(path))
@@ -0,0 +1,44 @@
+import threading
+import numpy as np
+from edges import EdgeIndex
+
+def panel_image():
+    # A light panel from (100, 60) to (300, 220) on a dark background
+    img = np.full((400, 500, 3), 30, np.uint8)
+    img[60:220, 100:300] = 220
+    return img
+
+def built(image):
+    index = EdgeIndex(image)
+    assert index.ready.wait(5)
+    return index
+
+def test_snaps_to_panel_borders():
+    index = built(panel_image())
+    assert index.snap_x(104, 150) == 100
+    assert index.snap_x(295, 150) == 300
+    assert index.snap_y(200, 57) == 60
+    assert index.snap_y(200, 224) == 220
+
+def test_snaps_near_band_boundary():
+    # The corner sits inside the band below the cursor's band
+    index = built(panel_image())
+    assert index.snap_x(103, 58) == 100
+
+def test_ignores_distant_and_short_edges():
+    img = panel_image()
+    img[330:334, 400:404] = 255
+    index = built(img)
+    assert index.snap_x(120, 150) is None
+    assert index.snap_x(401, 330) is None
+    assert index.snap_y(200, 300) is None
+
+def test_not_ready_returns_none():
+    index = EdgeIndex.__new__(EdgeIndex)
+    index.ready = threading.Event()
+    assert index.snap_x(100, 100) is None
+    assert index.snap_y(100, 100) is None
+
+def test_accepts_bgra_frames():
+    img = np.dstack([panel_image(), np.full((400, 500), 255, np.uint8)])
+    assert built(img).snap_x(97, 150) == 100
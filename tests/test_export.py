@@ -0,0 +1,48 @@
+import json
+import threading
+import pytest
+from PyQt6.QtGui import QImage, QColor
+from conftest import ICONS_PATH, capture, drag
+import editor as editor_module
+import export
+import journal
+from export import export_image, DEFAULT_PROFILES
+from settings import set_setting
+from editor import EditorWindow
+
+def test_profiles_fan_out_from_one_image(qapp, tmp_path, monkeypatch):
+    image = QImage(2400, 1200, QImage.Format.Format_RGB32)
+    image.fill(QColor("#3366cc"))
+    threads = set()
+    render = export.render_profile
+    monkeypatch.setattr(export, "render_profile", lambda *a: threads.add(threading.get_ident()) or render(*a))
+    paths = export_image(image, list(DEFAULT_PROFILES), str(tmp_path), "shot")
+    assert [p.rsplit("/", 1)[1] for p in paths] == ["shot.png", "shot_chat.webp", "shot_thumb.jpg"]
+    sizes = [QImage(p).size() for p in paths]
+    assert [(s.width(), s.height()) for s in sizes] == [(2400, 1200), (1920, 960), (320, 160)]
+    assert threading.get_ident() not in threads
+
+def test_custom_profiles_from_settings(qapp, tmp_path):
+    set_setting("export/profiles", json.dumps({"tiny": {"format": "png", "max_size": 16, "quality": -1, "suffix": "_tiny"}}))
+    profiles = export.load_profiles()
+    assert set(DEFAULT_PROFILES) < set(profiles)
+    image = QImage(64, 32, QImage.Format.Format_RGB32)
+    (path,) = export_image(image, ["tiny"], str(tmp_path), "a", profiles)
+    assert QImage(path).width() == 16
+    with pytest.raises(ValueError):
+        export_image(image, ["missing"], str(tmp_path), "a", profiles)
+
+def test_cli_renders_projects_with_annotations(qapp, tmp_path, monkeypatch):
+    editor = EditorWindow(capture(), ICONS_PATH)
+    editor.resize(800, 600)
+    drag(editor, "rect", (20, 20), (120, 90))
+    project = str(tmp_path / "shot.sparky")
+    editor.save_project(project)
+    editor.journal.close(discard=True)
+    # Headless: exporting must not start a recovery session
+    monkeypatch.setattr(editor_module, "EditJournal", lambda *a: pytest.fail("export opened a journal"))
+    out = tmp_path / "out"
+    assert export.main([project, "--profile", "archive", "-o", str(out)]) == 0
+    assert QImage(str(out / "shot.png")).convertToFormat(editor.canvas.format()) == editor.canvas
+    assert journal.pending_sessions() == []
+    editor.release_buffers()
@@ -0,0 +1,57 @@
+import numpy as np
+from PyQt6.QtCore import QPointF, QRectF
+from conftest import ICONS_PATH, ui_frame, spin
+import utils
+from utils import CANVAS_FORMAT, image_from_array, array_from_image, pixmap_from_array, apply_blur, apply_pixelate
+import snipper
+from editor import EditorWindow
+
+def test_bgra_arrays_map_to_rgb32_without_copies(qapp):
+    frame = ui_frame()
+    frame[5, 7] = (10, 20, 30, 255)
+    image = image_from_array(frame)
+    assert image.format() == CANVAS_FORMAT
+    color = image.pixelColor(7, 5)
+    assert (color.red(), color.green(), color.blue()) == (30, 20, 10)
+    view = array_from_image(image)
+    assert np.array_equal(view, frame)
+    pixmap = pixmap_from_array(frame)
+    assert pixmap.toImage().format() == CANVAS_FORMAT
+    frame[:] = 0
+    assert pixmap.toImage().pixelColor(7, 5).red() == 30
+
+def test_filters_work_in_place_on_views():
+    frame = np.zeros((100, 100, 4), np.uint8)
+    frame[40:60, 40:60] = 255
+    view = frame[10:90, 10:90]
+    assert apply_blur(view, 20, 20, 40, 40, 15) is view
+    assert 0 < frame[39, 50, 0] < 255
+    apply_pixelate(frame, 0, 0, 100, 100, 10)
+    assert len(np.unique(frame[0:10, 0:10, 0])) == 1
+
+def test_edit_session_has_no_frame_conversions(qapp, monkeypatch):
+    monkeypatch.setattr(snipper.Snipper, "snap_point", lambda self, pos: pos)
+    utils.frame_conversions.clear()
+    overlay = snipper.Snipper(ICONS_PATH, frame=ui_frame(1280, 800))
+    captured = []
+    overlay.captured_signal.connect(lambda pixmap, mode: captured.append(pixmap))
+    overlay.start_selection(QPointF(100, 100))
+    overlay.update_selection(QPointF(1100, 700))
+    overlay.finish_selection(QPointF(1100, 700))
+    editor = EditorWindow(captured[0], ICONS_PATH)
+    rect = QRectF(50, 50, 300, 200)
+    for tool in ("rect", "blur", "pixelate", "circle"):
+        editor.push_undo(editor.annotation(tool, rect=[rect.x(), rect.y(), rect.width(), rect.height()]))
+        editor.paint_shape(tool, rect)
+        editor.refresh_canvas(rect)
+    editor.paint_arrow(QPointF(10, 10), QPointF(200, 300))
+    editor.paint_on_pixmap("pen", QPointF(10, 10), QPointF(20, 40))
+    editor.undo_action()
+    editor.redo_action()
+    for _ in range(100):
+        if editor.image_item.levels is not None: break
+        spin(10)
+    editor.view.grab()
+    assert not utils.frame_conversions
+    editor.release_buffers()
+    overlay.release_capture()
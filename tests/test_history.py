@@ -0,0 +1,92 @@
+import json
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap, QColor, QImage
+from conftest import spin
+from settings import set_setting
+from history import CaptureHistory, HistoryModel, HistoryGallery, THUMB_SIZE, INDEX_NAME, PACK_NAME
+
+def solid_pixmap(width, height, color):
+    pixmap = QPixmap(width, height)
+    pixmap.fill(QColor(color))
+    return pixmap
+
+def test_captures_are_stored_with_packed_thumbnails(qapp, tmp_path):
+    history = CaptureHistory(str(tmp_path))
+    added = []
+    history.signals.added.connect(added.append)
+    history.add(solid_pixmap(1600, 900, "red"))
+    history.add(solid_pixmap(300, 800, "blue"))
+    history.wait()
+    spin(10)
+    entries = history.entries()
+    assert [(e["width"], e["height"]) for e in entries] == [(1600, 900), (300, 800)]
+    assert added == entries
+    assert QImage(history.path(entries[0]["file"])).size().width() == 1600
+    thumb = history.thumbnail(entries[1])
+    assert thumb.height() == THUMB_SIZE.height() and thumb.width() < THUMB_SIZE.width()
+    assert thumb.pixelColor(thumb.width() // 2, thumb.height() // 2).blue() > 200
+    history.close()
+
+def test_torn_writes_are_skipped(qapp, tmp_path):
+    history = CaptureHistory(str(tmp_path))
+    history.add(solid_pixmap(64, 64, "green"))
+    history.wait()
+    entry = history.entries()[0]
+    with open(tmp_path / INDEX_NAME, "a") as f:
+        f.write(json.dumps(dict(entry, offset=entry["offset"] + entry["length"])) + "\n")
+        f.write('{"file": "capture_')
+    assert history.entries() == [entry]
+    history.close()
+
+def test_closing_prunes_beyond_the_retention_limit(qapp, tmp_path):
+    set_setting("history/max_entries", 2)
+    history = CaptureHistory(str(tmp_path))
+    for color in ("red", "green", "blue", "yellow"):
+        history.add(solid_pixmap(120, 80, color))
+    history.wait()
+    files = [e["file"] for e in history.entries()]
+    history.close()
+    entries = history.entries()
+    assert [e["file"] for e in entries] == files[2:]
+    assert sorted(p.name for p in tmp_path.glob("capture_*.png")) == files[2:]
+    blue, yellow = (history.thumbnail(e).pixelColor(10, 10) for e in entries)
+    assert blue.blue() > 200 and blue.red() < 50
+    assert yellow.red() > 200 and yellow.green() > 200 and yellow.blue() < 50
+    assert (tmp_path / PACK_NAME).stat().st_size == sum(e["length"] for e in entries)
+    history.close_pack()
+
+def write_fake_history(root, count):
+    history = CaptureHistory(str(root))
+    history.add(solid_pixmap(64, 40, "white"))
+    history.wait()
+    entry = history.entries()[0]
+    data = (root / PACK_NAME).read_bytes()
+    with open(root / PACK_NAME, "ab") as pack, open(root / INDEX_NAME, "a") as index:
+        for i in range(1, count):
+            index.write(json.dumps(dict(entry, offset=i * len(data), time=f"2024-01-01T00:00:{i % 60:02d}")) + "\n")
+            pack.write(data)
+    return history
+
+def test_gallery_decodes_only_visible_thumbnails(qapp, tmp_path):
+    history = write_fake_history(tmp_path, 2000)
+    decoded = []
+    original = history.thumbnail
+    history.thumbnail = lambda entry: decoded.append(entry) or original(entry)
+    gallery = HistoryGallery(history)
+    gallery.show()
+    gallery.view.grab()
+    assert gallery.model.rowCount() == 2000
+    assert 0 < len(decoded) < 100
+    gallery.close()
+    history.close()
+
+def test_new_captures_appear_first(qapp, tmp_path):
+    history = write_fake_history(tmp_path, 3)
+    model = HistoryModel(history)
+    history.add(solid_pixmap(100, 50, "black"))
+    history.wait()
+    spin(10)
+    assert model.rowCount() == 4
+    assert model.index(0).data(Qt.ItemDataRole.ToolTipRole).endswith("100 x 50")
+    assert model.index(0).data(Qt.ItemDataRole.UserRole).startswith(str(tmp_path))
+    history.close()
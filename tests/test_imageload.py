@@ -0,0 +1,62 @@
+import os
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage, QColor
+from PyQt6.QtWidgets import QMessageBox
+from conftest import spin
+from benchmark import synthetic_frame
+from utils import image_from_array, CANVAS_FORMAT
+import ipc
+import main
+from editor import EditorWindow
+
+def wait_for(condition, ms=5000):
+    for _ in range(ms // 10):
+        if condition(): return True
+        spin(10)
+    return condition()
+
+def test_large_jpeg_shows_preview_then_full_image(qapp, tmp_path, monkeypatch):
+    image = QImage(6000, 3000, QImage.Format.Format_RGB32)
+    image.fill(QColor("#3366cc"))
+    path = str(tmp_path / "photo.jpg")
+    image.save(path)
+    previews = []
+    show_preview = EditorWindow.show_preview
+    monkeypatch.setattr(EditorWindow, "show_preview",
+                        lambda self, size: previews.append((self.canvas.size(), size)) or show_preview(self, size))
+    toolbar = main.FloatingToolbar()
+    toolbar.open_path(path)
+    assert wait_for(lambda: not toolbar.image_loads)
+    editor = toolbar.editor
+    assert previews == [(QSize(2048, 1024), image.size())]
+    assert editor.canvas.size() == image.size() and editor.canvas.format() == CANVAS_FORMAT
+    assert editor.isEnabled() and editor.image_item.scale() == 1
+    assert editor.undo_stack[0].size() == image.size()
+    assert toolbar.history.worker is None
+    editor.release_buffers()
+
+def test_png_opens_without_preview_and_keeps_pixels(qapp, tmp_path, monkeypatch):
+    frame = synthetic_frame(900, 600)
+    path = str(tmp_path / "shot.png")
+    image_from_array(frame).save(path)
+    monkeypatch.setattr(EditorWindow, "show_preview", lambda self, size: (_ for _ in ()).throw(AssertionError))
+    toolbar = main.FloatingToolbar()
+    toolbar.handle_command({"command": "open", "path": path})
+    assert wait_for(lambda: not toolbar.image_loads)
+    assert toolbar.editor.canvas == image_from_array(frame)
+    assert toolbar.editor.capture_mode == "file"
+    toolbar.editor.release_buffers()
+
+def test_unreadable_file_warns(qapp, tmp_path, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(QMessageBox, "warning", lambda *a: warnings.append(a[2]))
+    toolbar = main.FloatingToolbar()
+    toolbar.open_path(str(tmp_path / "missing.png"))
+    assert wait_for(lambda: not toolbar.image_loads)
+    assert "missing.png" in warnings[0]
+    assert toolbar.editor is None and toolbar.isVisible()
+    toolbar.hide()
+
+def test_open_flag_becomes_an_open_command():
+    args = ipc.build_parser().parse_args(["--open", "shot.png"])
+    assert ipc.command_from_args(args) == {"command": "open", "path": os.path.abspath("shot.png")}
@@ -0,0 +1,91 @@
+import os
+import sys
+import subprocess
+import pytest
+from conftest import spin, ui_frame
+import ipc
+
+PROJECT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "project")
+
+@pytest.fixture
+def server_name():
+    return f"sparkyshot-test-{os.getpid()}"
+
+def run_client(name, args):
+    code = ("import sys, json, ipc\n"
+            f"args = ipc.build_parser().parse_args({args!r})\n"
+            f"ok = ipc.send_command(ipc.command_from_args(args), {name!r})\n"
+            "print(json.dumps([ok, 'cv2' in sys.modules, 'PyQt6.QtWidgets' in sys.modules]))\n")
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=PROJECT, stdout=subprocess.PIPE, text=True)
+    while process.poll() is None:
+        spin(10)
+    return process.stdout.read()
+
+def test_parser_maps_flags_to_commands():
+    parser = ipc.build_parser()
+    assert ipc.command_from_args(parser.parse_args(["--qr"])) == {"command": "capture", "mode": "qr"}
+    assert ipc.command_from_args(parser.parse_args([])) == {"command": "show"}
+    with pytest.raises(SystemExit):
+        parser.parse_args(["--region", "--window"])
+
+def test_second_launch_hands_command_to_running_instance(qapp, server_name):
+    server = ipc.InstanceServer(server_name)
+    assert server.listen()
+    received = []
+    server.command_received.connect(received.append)
+    try:
+        assert run_client(server_name, ["--fullscreen"]).strip() == "[true, false, false]"
+        spin(20)
+        assert received == [{"command": "capture", "mode": "fullscreen"}]
+    finally:
+        server.close()
+
+def test_client_without_instance_returns_false(server_name):
+    assert not ipc.send_command({"command": "show"}, server_name)
+
+def test_only_one_instance_listens(qapp, server_name):
+    first = ipc.InstanceServer(server_name)
+    assert first.listen()
+    second = ipc.InstanceServer(server_name)
+    assert not second.listen()
+    first.close()
+    assert second.listen()
+    second.close()
+
+def test_toolbar_runs_commands(qapp, monkeypatch):
+    import main
+    toolbar = main.FloatingToolbar()
+    started = []
+    monkeypatch.setattr(toolbar, "capture_now", started.append)
+    toolbar.handle_command({"command": "capture", "mode": "qr"})
+    assert started == ["qr"]
+    toolbar.handle_command({"command": "show"})
+    assert toolbar.isVisible()
+    toolbar.hide()
+
+def test_forwarded_commands_keep_unsaved_editors(qapp, tmp_path, monkeypatch):
+    import main
+    import snipper
+    from utils import image_from_array
+    monkeypatch.setattr(main, "Snipper", lambda icons_path, mode: snipper.Snipper(icons_path, mode, frame=ui_frame()))
+    paths = []
+    for name in ("a.png", "b.png"):
+        paths.append(str(tmp_path / name))
+        image_from_array(ui_frame()).save(paths[-1])
+    toolbar = main.FloatingToolbar()
+    for path in paths:
+        toolbar.handle_command({"command": "open", "path": path})
+    for _ in range(500):
+        if not toolbar.image_loads: break
+        spin(10)
+    toolbar.handle_command({"command": "capture", "mode": "fullscreen"})
+    spin(150)
+    assert len(toolbar.editors) == 3
+    assert sorted(editor.capture_mode for editor in toolbar.editors) == ["file", "file", "fullscreen"]
+    for editor in list(toolbar.editors):
+        editor.journal.close(discard=True)
+        editor.journal = None
+        editor.hide()
+        editor.closed_signal.emit()
+    assert toolbar.editor is None and toolbar.isVisible()
+    toolbar.hide()
@@ -0,0 +1,92 @@
+import os
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication, QMessageBox
+from conftest import ICONS_PATH, capture, drag, annotate
+import journal
+from journal import EditJournal, pending_sessions, load_session, JOURNAL_NAME, BASE_NAME
+from editor import EditorWindow
+
+def session_editor(tmp_path):
+    editor = EditorWindow(capture(), ICONS_PATH)
+    editor.resize(800, 600)
+    editor.journal.root = str(tmp_path)
+    return editor
+
+def test_crashed_session_replays_to_the_same_canvas(qapp, tmp_path):
+    editor = session_editor(tmp_path)
+    annotate(editor)
+    editor.record_edit()
+    editor.undo_action()
+    editor.journal.wait()
+    (path,) = pending_sessions(str(tmp_path))
+    assert sorted(os.listdir(path)) == [BASE_NAME, JOURNAL_NAME]
+    # Only annotation data is appended per step, never an image
+    assert os.path.getsize(os.path.join(path, JOURNAL_NAME)) < 2048
+    base, ops = load_session(path)
+    assert ops == editor.annotations
+    restored = EditorWindow(base, ICONS_PATH, "recovered", annotations=ops)
+    assert restored.canvas == editor.canvas
+    restored.release_buffers()
+    editor.release_buffers()
+
+def test_torn_journal_line_is_ignored(qapp, tmp_path):
+    editor = session_editor(tmp_path)
+    drag(editor, "rect", (20, 20), (120, 90))
+    drag(editor, "circle", (200, 50), (300, 150))
+    editor.journal.wait()
+    (path,) = pending_sessions(str(tmp_path))
+    with open(os.path.join(path, JOURNAL_NAME), "ab") as f:
+        f.write(b'{"keep": 0, "ops": [{"tool"')
+    _, ops = load_session(path)
+    assert [op["tool"] for op in ops] == ["rect", "circle"]
+    editor.release_buffers()
+
+def test_discarding_the_editor_removes_its_session(qapp, tmp_path, monkeypatch):
+    editor = session_editor(tmp_path)
+    drag(editor, "rect", (20, 20), (120, 90))
+    editor.journal.wait()
+    assert len(pending_sessions(str(tmp_path))) == 1
+    monkeypatch.setattr(QMessageBox, "question", lambda *a: QMessageBox.StandardButton.Yes)
+    editor.close()
+    assert pending_sessions(str(tmp_path)) == []
+
+def test_quitting_removes_sessions_of_open_editors(qapp, tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr(journal, "app_data_path", lambda *parts: str(tmp_path))
+    toolbar = main.FloatingToolbar(resident=True)
+    toolbar.open_editor(capture(), "region")
+    editor = toolbar.editor
+    drag(editor, "rect", (20, 20), (120, 90))
+    editor.journal.wait()
+    assert len(pending_sessions(str(tmp_path))) == 1
+    # The editor may decline to close, as when its discard prompt is answered No;
+    # exit() still ends the loop, and the session must not outlive the app
+    monkeypatch.setattr(QMessageBox, "question", lambda *a: QMessageBox.StandardButton.No)
+    QTimer.singleShot(0, lambda: QApplication.exit(0))
+    qapp.exec()
+    assert pending_sessions(str(tmp_path)) == []
+    assert editor.journal is None
+    editor.hide()
+    editor.release_buffers()
+    toolbar.history.close()
+
+def test_no_files_until_the_first_edit(qapp, tmp_path):
+    editor = session_editor(tmp_path)
+    editor.journal.record([])
+    assert editor.journal.worker is None and os.listdir(tmp_path) == []
+    editor.release_buffers()
+
+def test_toolbar_offers_recovery(qapp, tmp_path, monkeypatch):
+    import main
+    writer = EditJournal(capture(), str(tmp_path))
+    writer.record([{"tool": "rect", "rect": [10, 10, 50, 50], "color": "#ffff0000", "size": 3}])
+    writer.close()
+    monkeypatch.setattr(journal, "app_data_path", lambda *parts: str(tmp_path))
+    monkeypatch.setattr(QMessageBox, "question", lambda *a: QMessageBox.StandardButton.Yes)
+    opened = []
+    monkeypatch.setattr(main.FloatingToolbar, "open_editor", lambda self, *a, **kw: opened.append((a, kw)))
+    toolbar = main.FloatingToolbar()
+    toolbar.recover_sessions()
+    assert opened[0][0][1] == "recovered" and len(opened[0][1]["annotations"]) == 1
+    assert pending_sessions(str(tmp_path)) == []
+    toolbar.history.close()
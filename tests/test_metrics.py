@@ -0,0 +1,38 @@
+import json
+from PyQt6.QtCore import QPoint
+from conftest import ICONS_PATH
+from metrics import LatencyTracker
+
+def test_percentiles_over_rolling_window():
+    tracker = LatencyTracker(window_size=100)
+    for value in range(1, 201):
+        tracker.samples["click_to_overlay"].append(float(value))
+    summary = tracker.summary("click_to_overlay")
+    assert summary["count"] == 100
+    assert summary["p50"] == 150.5
+    assert 195 < summary["p95"] < 196
+    assert summary["last"] == 200.0
+
+def test_stop_without_start_is_ignored():
+    tracker = LatencyTracker()
+    assert tracker.stop("release_to_editor") is None
+    tracker.start("release_to_editor")
+    tracker.cancel("release_to_editor")
+    assert tracker.stop("release_to_editor") is None
+    assert tracker.summary("release_to_editor")["count"] == 0
+
+def test_dump_writes_summary(tmp_path):
+    tracker = LatencyTracker()
+    tracker.start("click_to_overlay")
+    tracker.stop("click_to_overlay")
+    path = tracker.dump(str(tmp_path / "latency.json"))
+    data = json.load(open(path))
+    assert data["summary"]["click_to_overlay"]["count"] == 1
+    assert "version" in data and "platform" in data
+
+def test_logo_context_menu_opens_debug_panel(qapp):
+    import main
+    window = main.FloatingToolbar()
+    window.btn_logo.customContextMenuRequested.emit(QPoint(1, 1))
+    assert window.debug_panel is not None
+    window.debug_panel.close()
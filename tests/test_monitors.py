@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from PyQt6.QtCore import QPointF, QRect, QRectF
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtWidgets import QLayout
+from conftest import ICONS_PATH
+from capture import Monitor, MonitorLayout
+from utils import CANVAS_FORMAT, image_from_array
+import snipper
+
+class FakeScreen:
+    def __init__(self, geometry, ratio):
+        self._geometry = geometry
+        self.ratio = ratio
+
+    def geometry(self):
+        return self._geometry
+
+    def devicePixelRatio(self):
+        return self.ratio
+
+def mixed_layout():
+    # A 200% screen at the origin and a 100% screen to its right; as Qt reports it,
+    # the second screen keeps its native x, leaving a logical gap between them
+    return MonitorLayout.from_screens([FakeScreen(QRect(0, 0, 400, 300), 2.0), FakeScreen(QRect(800, 0, 400, 300), 1.0)])
+
+def noise_frame(width, height):
+    frame = np.random.default_rng(5).integers(0, 256, (height, width, 4), dtype=np.uint8)
+    frame[..., 3] = 255
+    return frame
+
+@pytest.fixture
+def mixed_snipper(qapp, monkeypatch):
+    monkeypatch.setattr(snipper.Snipper, "snap_point", lambda self, pos: pos)
+    overlay = snipper.Snipper(ICONS_PATH, frame=noise_frame(1200, 600), monitor_layout=mixed_layout())
+    yield overlay
+    overlay.release_capture()
+
+def test_layout_maps_each_monitor_with_its_own_scale():
+    layout = mixed_layout()
+    assert layout.bounds == QRect(0, 0, 1200, 600) and layout.scene_bounds() == QRectF(0, 0, 1200, 300)
+    assert layout.to_capture(QPointF(100, 50)) == QPointF(200, 100)
+    assert layout.to_capture(QPointF(900, 50)) == QPointF(900, 50)
+    assert layout.to_scene(QPointF(200, 100)) == QPointF(100, 50)
+    assert layout.to_scene(QPointF(900, 50)) == QPointF(900, 50)
+    # A point in the gap belongs to the nearest monitor
+    assert layout.to_capture(QPointF(450, 10)) == QPointF(900, 20)
+    assert layout.to_capture_rect(QRectF(10, 20, 100, 50)) == QRect(20, 40, 200, 100)
+
+def test_layouts_left_of_the_origin_start_the_scene_at_zero():
+    layout = MonitorLayout([Monitor(QRect(-400, 0, 400, 300), 1.0, QRect(-400, 0, 400, 300)),
+                            Monitor(QRect(0, 0, 400, 300), 2.0, QRect(0, 0, 800, 600))])
+    assert layout.frame_bounds() == QRect(0, 0, 1200, 600)
+    assert layout.to_capture(QPointF(10, 10)) == QPointF(10, 10)
+    assert layout.to_capture(QPointF(410, 10)) == QPointF(420, 20)
+    assert [(t.getRect(), s.getRect()) for t, s in layout.tiles()] == [
+        ((0, 0, 400, 300), (0, 0, 400, 300)), ((400, 0, 400, 300), (400, 0, 800, 600))]
+
+def test_selection_on_a_scaled_monitor_crops_physical_pixels(qapp, monkeypatch):
+    monkeypatch.setattr(snipper.Snipper, "snap_point", lambda self, pos: pos)
+    frame = noise_frame(1200, 600)
+    for (start, end), (y0, y1, x0, x1) in ((((50, 40), (150, 100)), (80, 200, 100, 300)),
+                                            (((850, 10), (950, 60)), (10, 60, 850, 950))):
+        # Each capture closes its overlay, so every selection gets a fresh one
+        overlay = snipper.Snipper(ICONS_PATH, frame=frame, monitor_layout=mixed_layout())
+        captured = []
+        overlay.captured_signal.connect(lambda pixmap, mode: captured.append(pixmap))
+        overlay.start_selection(QPointF(*start))
+        overlay.update_selection(QPointF(*end))
+        overlay.finish_selection(QPointF(*end))
+        assert captured[0].toImage().convertToFormat(CANVAS_FORMAT) == image_from_array(frame[y0:y1, x0:x1].copy())
+
+def test_overlay_draws_capture_pixels_one_to_one(mixed_snipper):
+    frame = mixed_snipper.capture_array
+    assert mixed_snipper.scene.sceneRect() == QRectF(0, 0, 1200, 300)
+    # The monitor layout must not shadow QWidget.layout()
+    assert isinstance(mixed_snipper.layout(), QLayout)
+    for (x, y, w, h), ratio, pixels in (((0, 0, 400, 300), 2.0, frame[0:600, 0:800]), ((800, 0, 400, 300), 1.0, frame[0:300, 800:1200])):
+        # What a screen with this scale factor gets for the monitor's part of the scene
+        image = QImage(round(w * ratio), round(h * ratio), CANVAS_FORMAT)
+        image.setDevicePixelRatio(ratio)
+        painter = QPainter(image)
+        painter.translate(-x, -y)
+        mixed_snipper.bg_item.paint(painter, None)
+        painter.end()
+        image.setDevicePixelRatio(1.0)
+        assert image == image_from_array(pixels.copy())
+
+def test_window_and_snap_lookups_use_frame_pixels(qapp, monkeypatch):
+    frame = noise_frame(1200, 600)
+    frame[:, 300, :3] = 0
+    frame[:, 301:, :3] = 255
+    monkeypatch.setattr(snipper, "compositing_active", lambda: False)
+    monkeypatch.setattr(snipper.Snipper, "load_windows",
+                        lambda self: setattr(self, "window_rects", [QRect(100, 100, 400, 200)]))
+    overlay = snipper.Snipper(ICONS_PATH, mode="window", frame=frame, monitor_layout=mixed_layout())
+    overlay.update_selection(QPointF(100, 100))
+    assert overlay.selection_rect_item.rect() == QRectF(50, 50, 200, 100)
+    captured = []
+    overlay.captured_signal.connect(lambda pixmap, mode: captured.append(pixmap))
+    overlay.finish_selection(QPointF(100, 100))
+    assert (captured[0].width(), captured[0].height()) == (400, 200)
+    overlay.release_capture()
+    region = snipper.Snipper(ICONS_PATH, frame=frame.copy(), monitor_layout=mixed_layout())
+    region.edge_index.ready.wait(5)
+    snapped = region.snap_point(QPointF(152, 100))
+    # The edge between frame columns 300 and 301 is half a logical pixel in at 200%
+    assert snapped == QPointF(150.5, 100)
+    region.release_capture()
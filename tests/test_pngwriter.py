@@ -0,0 +1,73 @@
+import struct
+import cv2
+import numpy as np
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtWidgets import QFileDialog
+from conftest import ICONS_PATH, spin, capture
+from benchmark import synthetic_frame
+from utils import image_from_array
+from pngwriter import encode_png, write_png, save_png_async, SaveSignals
+from editor import EditorWindow
+
+def header(data):
+    width, height, bits, color_type = struct.unpack(">IIBB", data[16:26])
+    return width, height, bits, color_type
+
+def decode(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+def palette_frame(colors, width=333, height=121):
+    rng = np.random.default_rng(colors)
+    table = rng.integers(0, 256, (colors, 4), dtype=np.uint8)
+    table[:, 3] = 255
+    index = (np.arange(height)[:, None] // 7 + np.arange(width)[None, :] // 5) % colors
+    return table[index]
+
+def qt_png_size(frame):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image_from_array(frame).save(buffer, "PNG")
+    return data.size()
+
+def test_few_colors_become_palette_pngs():
+    for colors, bits in ((2, 1), (3, 2), (11, 4), (200, 8)):
+        frame = palette_frame(colors)
+        data = encode_png(frame)
+        assert header(data) == (333, 121, bits, 3)
+        assert np.array_equal(decode(data), frame[..., :3])
+        assert len(data) < qt_png_size(frame)
+
+def test_truecolor_screenshots_round_trip_smaller_than_qt():
+    frame = synthetic_frame(1280, 720)
+    data = encode_png(frame)
+    assert header(data)[2:] == (8, 2)
+    assert np.array_equal(decode(data), frame[..., :3])
+    assert len(data) < qt_png_size(frame)
+    noise = np.random.default_rng(1).integers(0, 256, (50, 77, 4), dtype=np.uint8)
+    assert np.array_equal(decode(encode_png(noise)), noise[..., :3])
+
+def test_async_save_reports_on_the_gui_thread(qapp, tmp_path):
+    signals = SaveSignals()
+    done = []
+    signals.finished.connect(lambda path, error: done.append((path, error)))
+    image = image_from_array(palette_frame(5))
+    path = str(tmp_path / "shot.png")
+    save_png_async(image, path, signals).join()
+    spin(10)
+    assert done == [(path, "")]
+    save_png_async(image, str(tmp_path / "missing" / "shot.png"), signals).join()
+    spin(10)
+    assert done[1][1]
+
+def test_editor_saves_png_through_writer(qapp, tmp_path, monkeypatch):
+    editor = EditorWindow(capture(), ICONS_PATH)
+    path = str(tmp_path / "out.png")
+    monkeypatch.setattr(QFileDialog, "getSaveFileName", lambda *a: (path, ""))
+    editor.save_image()
+    for _ in range(100):
+        if (tmp_path / "out.png").exists(): break
+        spin(10)
+    data = (tmp_path / "out.png").read_bytes()
+    assert header(data) == (640, 400, 1, 3)
+    editor.release_buffers()
@@ -0,0 +1,90 @@
+import os
+import json
+import cv2
+import pytest
+import numpy as np
+from conftest import ICONS_PATH, capture, drag
+from benchmark import synthetic_frame
+from utils import apply_blur, apply_pixelate
+import redact
+from editor import EditorWindow
+
+def write_frames(directory, count):
+    directory.mkdir(parents=True, exist_ok=True)
+    frames = {}
+    for i in range(count):
+        frame = synthetic_frame(600, 560, seed=i)[..., :3].copy()
+        cv2.imwrite(str(directory / f"shot{i}.png"), frame)
+        frames[f"shot{i}.png"] = frame
+    return frames
+
+def test_cli_redacts_a_directory_into_output(tmp_path, capsys):
+    frames = write_frames(tmp_path / "in" / "nested", 5)
+    (tmp_path / "in" / "notes.txt").write_text("not an image")
+    template = tmp_path / "header.json"
+    status = redact.main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "-r", "--workers", "2", "--batch-size", "2",
+                          "--blur", "0,0,600,40", "--pixelate", "10,100,50,50", "--save-template", str(template)])
+    assert status == 0
+    assert "Redacted 5 of 5 images" in capsys.readouterr().out
+    for name, frame in frames.items():
+        expected = apply_pixelate(apply_blur(frame.copy(), 0, 0, 600, 40, 51), 10, 100, 50, 50, 10)
+        assert np.array_equal(cv2.imread(str(tmp_path / "out" / "nested" / name)), expected)
+    assert [r["tool"] for r in json.loads(template.read_text())["regions"]] == ["blur", "pixelate"]
+
+def test_template_from_project_and_failures(qapp, tmp_path, capsys):
+    editor = EditorWindow(capture(), ICONS_PATH)
+    editor.resize(800, 600)
+    drag(editor, "rect", (20, 20), (120, 90))
+    drag(editor, "pixelate", (30, 30), (90, 80))
+    project = str(tmp_path / "template.sparky")
+    editor.save_project(project)
+    editor.release_buffers()
+    regions = redact.load_template(project)
+    assert [r["tool"] for r in regions] == ["pixelate"]
+    frames = write_frames(tmp_path / "in", 3)
+    (tmp_path / "in" / "broken.png").write_bytes(b"not a png")
+    status = redact.main([str(tmp_path / "in"), "--template", project, "--workers", "1"])
+    assert status == 1
+    captured = capsys.readouterr()
+    assert "broken.png" in captured.err and "Redacted 3 of 4 images" in captured.out
+    x, y, w, h = (int(v) for v in regions[0]["rect"])
+    frame = frames["shot0.png"]
+    expected = apply_pixelate(frame.copy(), x, y, w, h, regions[0]["value"])
+    assert np.array_equal(cv2.imread(str(tmp_path / "in" / "shot0.png")), expected)
+
+def test_failed_write_keeps_the_original(tmp_path, monkeypatch):
+    frames = write_frames(tmp_path, 1)
+    path = str(tmp_path / "shot0.png")
+    original = open(path, "rb").read()
+    regions = [{"tool": "blur", "rect": [0, 0, 600, 40], "value": 51}]
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(redact.os, "replace", fail)
+        with pytest.raises(OSError, match="disk full"):
+            redact.redact_file(path, path, regions)
+    assert open(path, "rb").read() == original
+    assert not os.path.exists(path + ".tmp")
+    monkeypatch.setattr(redact.cv2, "imencode", lambda ext, image: (False, None))
+    assert redact.redact_batch([(path, path)], regions) == (1, [(path, f"cannot encode {path}")])
+    assert np.array_equal(cv2.imread(path), frames["shot0.png"])
+
+def test_jobs_are_sent_in_batches(tmp_path, monkeypatch):
+    jobs = ((str(i), str(i)) for i in range(100))
+    submitted = []
+    class Pool:
+        def __init__(self, max_workers): pass
+        def __enter__(self): return self
+        def __exit__(self, *a): pass
+        def submit(self, func, batch, regions):
+            from concurrent.futures import Future
+            future = Future()
+            future.set_result((len(batch), []))
+            submitted.append(batch)
+            return future
+    monkeypatch.setattr(redact, "ProcessPoolExecutor", Pool)
+    done, failed = redact.run_batch(jobs, [], workers=2, batch_size=8)
+    assert done == 100 and failed == []
+    assert len(submitted) == 13 and max(len(b) for b in submitted) == 8
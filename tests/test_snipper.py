@@ -0,0 +1,130 @@
+import cv2
+import numpy as np
+import pytest
+from PyQt6.QtCore import QPointF
+from conftest import ICONS_PATH, ui_frame, spin
+import snipper
+
+@pytest.fixture
+def make_snipper(qapp):
+    created = []
+
+    def make(frame, mode="region"):
+        overlay = snipper.Snipper(ICONS_PATH, mode=mode, frame=frame)
+        created.append(overlay)
+        return overlay
+    yield make
+    for overlay in created:
+        overlay.release_capture()
+
+def select(overlay, p1, p2):
+    captured = []
+    overlay.captured_signal.connect(lambda pixmap, mode: captured.append(pixmap))
+    overlay.start_selection(QPointF(*p1))
+    overlay.update_selection(QPointF(*p2))
+    overlay.finish_selection(QPointF(*p2))
+    return captured
+
+def test_region_is_cropped_from_capture_array(make_snipper, monkeypatch):
+    monkeypatch.setattr(snipper.Snipper, "snap_point", lambda self, pos: pos)
+    frame = ui_frame()
+    frame[150, 200] = (0, 0, 255, 255)
+    overlay = make_snipper(frame)
+    assert overlay.capture_array is frame
+    captured = select(overlay, (150, 120), (350, 280))
+    assert captured[0].width() == 200 and captured[0].height() == 160
+    color = captured[0].toImage().pixelColor(50, 30)
+    assert (color.red(), color.green(), color.blue()) == (255, 0, 0)
+
+def test_regrab_reads_only_the_selection(make_snipper, monkeypatch):
+    monkeypatch.setattr(snipper.Snipper, "snap_point", lambda self, pos: pos)
+    monkeypatch.setattr(snipper.Snipper, "should_regrab", lambda self: True)
+    grabbed = []
+
+    def fake_grab(self, rect):
+        grabbed.append(rect)
+        return np.zeros((rect.height(), rect.width(), 4), np.uint8)
+    monkeypatch.setattr(snipper.Snipper, "grab_region", fake_grab)
+    overlay = make_snipper(ui_frame())
+    captured = select(overlay, (10, 20), (110, 90))
+    spin(snipper.REGRAB_DELAY_MS + 50)
+    assert [(r.x(), r.y(), r.width(), r.height()) for r in grabbed] == [(10, 20, 100, 70)]
+    assert captured[0].width() == 100 and captured[0].height() == 70
+
+def test_qr_selection_decodes_from_capture_array(make_snipper, monkeypatch):
+    qr = cv2.QRCodeEncoder.create().encode("https://example.com/sparkyshot")
+    qr = cv2.resize(qr, (240, 240), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 30, 30, 30, 30, cv2.BORDER_CONSTANT, value=255)
+    frame = ui_frame()
+    frame[40:340, 40:340, :3] = qr[:, :, None]
+    contents = []
+
+    class FakeDialog:
+        def __init__(self, content, icons_path):
+            contents.append(content)
+
+        def exec(self):
+            return 0
+    monkeypatch.setattr(snipper, "QRDialog", FakeDialog)
+    overlay = make_snipper(frame, mode="qr")
+    select(overlay, (30, 30), (360, 360))
+    assert contents == ["https://example.com/sparkyshot"]
+
+def qr_frame():
+    qr = cv2.QRCodeEncoder.create().encode("https://example.com/sparkyshot")
+    qr = cv2.resize(qr, (240, 240), interpolation=cv2.INTER_NEAREST)
+    qr = cv2.copyMakeBorder(qr, 30, 30, 30, 30, cv2.BORDER_CONSTANT, value=255)
+    frame = ui_frame()
+    frame[40:340, 40:340, :3] = qr[:, :, None]
+    return frame
+
+def test_hovering_highlights_qr_and_click_accepts(make_snipper, monkeypatch):
+    contents = []
+
+    class FakeDialog:
+        def __init__(self, content, icons_path):
+            contents.append(content)
+
+        def exec(self):
+            return 0
+    monkeypatch.setattr(snipper, "QRDialog", FakeDialog)
+    overlay = make_snipper(qr_frame(), mode="qr")
+    overlay.update_selection(QPointF(700, 500))
+    overlay.update_selection(QPointF(190, 190))
+    for _ in range(100):
+        if overlay.qr_item.isVisible(): break
+        spin(10)
+    assert overlay.qr_content == "https://example.com/sparkyshot"
+    bounds = overlay.qr_item.polygon().boundingRect()
+    assert 40 <= bounds.x() < 190 < bounds.right() <= 340
+    overlay.start_selection(QPointF(190, 190))
+    overlay.finish_selection(QPointF(190, 190))
+    assert contents == ["https://example.com/sparkyshot"]
+
+def test_hover_requests_coalesce_while_scanning(qapp):
+    import threading
+    from qrscan import QRScanner
+    gate = threading.Event()
+    scanned = []
+
+    class SlowScanner(QRScanner):
+        def scan(self, detector, x, y):
+            scanned.append((x, y))
+            gate.wait(2)
+            return "", []
+    scanner = SlowScanner(qr_frame())
+    results = []
+    scanner.signals.found.connect(lambda content, points, pos: results.append(pos))
+    scanner.request(1, 1)
+    for _ in range(100):
+        if scanned: break
+        spin(5)
+    for x in range(2, 50):
+        scanner.request(x, x)
+    gate.set()
+    for _ in range(100):
+        if len(results) == 2: break
+        spin(10)
+    assert scanned == [(1, 1), (49, 49)]
+    assert results == [(1, 1), (49, 49)]
+    assert scanner.close()
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+from PyQt6.QtGui import QPixmap
+from benchmark import synthetic_frame
+from store import TileStore, dhash, hamming, CAPTURES_NAME
+from settings import set_setting
+from utils import image_from_array
+from history import CaptureHistory
+
+def test_near_identical_captures_share_tiles(tmp_path):
+    store = TileStore(str(tmp_path))
+    before = synthetic_frame(1000, 700)
+    after = before.copy()
+    after[300:340, 500:620] = (0, 0, 255, 255)
+    store.put("before", before)
+    stored = store.stats()["stored_bytes"]
+    store.put("after", after)
+    added = store.stats()["stored_bytes"] - stored
+    assert 0 < added < stored / 10
+    assert np.array_equal(store.get("before"), before)
+    assert np.array_equal(store.get("after"), after)
+    store.close()
+
+def test_store_survives_reopen_and_torn_manifest(tmp_path):
+    store = TileStore(str(tmp_path))
+    frame = synthetic_frame(600, 560, seed=3)
+    store.put("one", frame)
+    store.close()
+    with open(tmp_path / CAPTURES_NAME, "a") as f:
+        f.write('{"name": "two", "tiles": ["')
+    reopened = TileStore(str(tmp_path))
+    assert list(reopened.captures) == ["one"]
+    assert np.array_equal(reopened.get("one"), frame)
+    assert reopened.get("two") is None
+    reopened.close()
+
+def test_perceptual_hash_finds_near_duplicates(tmp_path):
+    store = TileStore(str(tmp_path))
+    frame = synthetic_frame(800, 600)
+    store.put("original", frame)
+    store.put("other", synthetic_frame(800, 600, seed=9))
+    tweaked = frame.copy()
+    tweaked[590:600, 0:20] = 255
+    assert hamming(dhash(frame), dhash(tweaked)) <= 2
+    assert store.find_similar(tweaked)[0] == (hamming(dhash(frame), dhash(tweaked)), "original")
+    assert [name for _, name in store.find_similar(tweaked)] == ["original"]
+    store.close()
+
+def test_lookups_wait_for_a_put_in_progress(tmp_path):
+    store = TileStore(str(tmp_path))
+    frame = synthetic_frame(600, 560)
+    store.put("one", frame)
+    results = []
+    with store.lock:
+        # Stands in for the history worker in the middle of put()
+        thread = threading.Thread(target=lambda: results.append((store.find_similar(frame), store.stats())))
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+    thread.join()
+    assert results[0][0] == [(0, "one")] and results[0][1]["captures"] == 1
+    store.close()
+
+def test_history_can_deduplicate_into_the_store(qapp, tmp_path):
+    set_setting("history/dedup", True)
+    history = CaptureHistory(str(tmp_path))
+    frame = synthetic_frame(640, 560)
+    history.add(QPixmap.fromImage(image_from_array(frame)))
+    history.add(QPixmap.fromImage(image_from_array(frame)))
+    history.wait()
+    entries = history.entries()
+    assert len(entries) == 2 and not (tmp_path / entries[0]["file"]).exists()
+    image = history.load_image(history.path(entries[1]["file"]))
+    assert image.size().width() == 640
+    assert image == image_from_array(frame)
+    assert len(history.find_duplicates(image)) == 2
+    assert history.thumbnail(entries[0]).width() > 0
+    history.close()
+
+def test_pruned_history_drops_deduplicated_captures(qapp, tmp_path):
+    set_setting("history/dedup", True)
+    set_setting("history/max_entries", 1)
+    history = CaptureHistory(str(tmp_path))
+    frames = [synthetic_frame(640, 560, seed=seed) for seed in (1, 2)]
+    for frame in frames:
+        history.add(QPixmap.fromImage(image_from_array(frame)))
+    history.wait()
+    first, second = (e["file"] for e in history.entries())
+    history.close()
+    assert [e["file"] for e in history.entries()] == [second]
+    reopened = TileStore(str(tmp_path / "store"))
+    assert list(reopened.captures) == [second]
+    assert np.array_equal(reopened.get(second), frames[1])
+    reopened.close()
@@ -0,0 +1,39 @@
+import json
+import pytest
+import tracing
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracing.enable(path)
+    tracing._events.clear()
+    yield path
+    tracing.enable(None)
+    tracing._events.clear()
+
+def test_disabled_span_is_shared_noop():
+    tracing.enable(None)
+    assert tracing.span("a") is tracing.span("b")
+
+def test_spans_are_written_as_chrome_trace_events(trace_file):
+    @tracing.traced
+    def work(x):
+        return x * 2
+
+    assert work(3) == 6
+    with tracing.span("block", size=4):
+        pass
+    tracing.write_trace()
+    events = json.load(open(trace_file))["traceEvents"]
+    names = [e["name"] for e in events]
+    assert "test_spans_are_written_as_chrome_trace_events.<locals>.work" in names
+    block = events[names.index("block")]
+    assert block["ph"] == "X" and block["args"] == {"size": 4}
+    assert block["dur"] >= 0
+
+def test_prepare_capture_is_traced(trace_file, qapp, monkeypatch):
+    import main
+    window = main.FloatingToolbar()
+    monkeypatch.setattr(main.QTimer, "singleShot", lambda *args: None)
+    window.prepare_capture("region")
+    assert any(e["name"] == "FloatingToolbar.prepare_capture" for e in tracing._events)
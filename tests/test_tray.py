@@ -0,0 +1,114 @@
+import ctypes
+import ctypes.util
+from ctypes import c_int, c_uint, c_ulong, c_void_p
+import pytest
+from PyQt6.QtCore import QObject, pyqtSignal
+from conftest import ICONS_PATH, ui_frame, spin
+import hotkeys
+import main
+import snipper
+import tray
+from settings import set_setting
+
+def test_parse_hotkey():
+    assert hotkeys.parse_hotkey("Ctrl+Shift+S") == (["ctrl", "shift"], "S")
+    assert hotkeys.parse_hotkey("Print") == ([], "Print")
+    with pytest.raises(ValueError):
+        hotkeys.parse_hotkey("Hyper+S")
+    with pytest.raises(ValueError):
+        hotkeys.parse_hotkey("")
+
+def test_key_names_per_platform():
+    assert hotkeys.x11_keysym_name("S") == "s"
+    assert hotkeys.x11_keysym_name("print") == "Print"
+    assert hotkeys.win32_virtual_key("Print") == 0x2C
+    assert hotkeys.win32_virtual_key("s") == ord("S")
+    assert hotkeys.win32_virtual_key("F5") == 0x74
+
+class FakeHotkey(QObject):
+    activated = pyqtSignal()
+
+    def __init__(self, sequence, parent=None):
+        super().__init__(parent)
+        self.sequence = sequence
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def daemon(qapp, monkeypatch):
+    monkeypatch.setattr(tray, "GlobalHotkey", FakeHotkey)
+    monkeypatch.setattr(main, "Snipper", lambda icons_path, mode: snipper.Snipper(icons_path, mode, frame=ui_frame()))
+    toolbar = main.FloatingToolbar(resident=True)
+    daemon = tray.TrayDaemon(toolbar)
+    yield daemon
+    if toolbar.snipper is not None:
+        toolbar.snipper.close()
+    daemon.close()
+
+def test_hotkey_opens_overlay_without_toolbar(daemon):
+    toolbar = daemon.toolbar
+    assert daemon.hotkey.sequence == "Print"
+    daemon.hotkey.activated.emit()
+    assert toolbar.snipper is not None and toolbar.snipper.isVisible()
+    first = toolbar.snipper
+    daemon.hotkey.activated.emit()
+    assert toolbar.snipper is first
+    first.close()
+    spin(10)
+    assert toolbar.snipper is None
+    assert not toolbar.isVisible()
+
+def test_second_capture_keeps_the_open_editor(daemon):
+    toolbar = daemon.toolbar
+    set_setting("tray/hotkey_mode", "fullscreen")
+    editors = []
+    for _ in range(2):
+        daemon.hotkey.activated.emit()
+        spin(150)
+        assert toolbar.snipper is None
+        editors.append(toolbar.editor)
+    first, second = editors
+    assert first is not second
+    assert toolbar.editors == {first, second}
+    assert first.isVisible() and second.isVisible()
+    for editor in editors:
+        editor.journal.close(discard=True)
+        editor.journal = None
+        editor.hide()
+        editor.closed_signal.emit()
+    assert toolbar.editors == set() and toolbar.editor is None
+    assert not toolbar.isVisible()
+
+def test_icons_are_cached(daemon):
+    path = ICONS_PATH + "/cap_region.svg"
+    assert main.load_svg_icon(path) is main.load_svg_icon(path)
+
+def test_global_hotkey_fires_on_x11_key_press(qapp, xvfb_display):
+    xtst_path = ctypes.util.find_library("Xtst")
+    if not xtst_path:
+        pytest.skip("libXtst is required")
+    xtst = ctypes.cdll.LoadLibrary(xtst_path)
+    xtst.XTestFakeKeyEvent.argtypes = [c_void_p, c_uint, c_int, c_ulong]
+    hotkey = hotkeys.GlobalHotkey("Ctrl+F9")
+    fired = []
+    hotkey.activated.connect(lambda: fired.append(1))
+    xlib = hotkeys.load_xlib()
+    xlib.XStringToKeysym.restype = c_ulong
+    xlib.XKeysymToKeycode.restype = ctypes.c_ubyte
+    xlib.XKeysymToKeycode.argtypes = [c_void_p, c_ulong]
+    xlib.XFlush.argtypes = [c_void_p]
+    display = xlib.XOpenDisplay(None)
+    try:
+        control = xlib.XKeysymToKeycode(display, xlib.XStringToKeysym(b"Control_L"))
+        key = xlib.XKeysymToKeycode(display, xlib.XStringToKeysym(b"F9"))
+        for code, down in ((control, 1), (key, 1), (key, 0), (control, 0)):
+            xtst.XTestFakeKeyEvent(display, code, down, 0)
+        xlib.XFlush(display)
+        for _ in range(50):
+            if fired: break
+            spin(20)
+        assert fired
+    finally:
+        xlib.XCloseDisplay(display)
+        hotkey.close()
@@ -0,0 +1,58 @@
+from ctypes import c_int, c_uint, c_ulong, c_void_p
+import pytest
+from PyQt6.QtCore import QPoint, QPointF, QRect
+from conftest import ICONS_PATH, ui_frame
+import windows
+import snipper
+from metrics import latency
+
+def test_window_at_prefers_topmost():
+    rects = [QRect(50, 50, 100, 100), QRect(0, 0, 400, 300)]
+    assert windows.window_at(rects, QPoint(60, 60)) == rects[0]
+    assert windows.window_at(rects, QPoint(10, 10)) == rects[1]
+    assert windows.window_at(rects, QPoint(500, 10)) is None
+
+@pytest.fixture
+def window_snipper(qapp, monkeypatch):
+    monkeypatch.setattr(snipper, "compositing_active", lambda: False)
+    monkeypatch.setattr(snipper.Snipper, "load_windows",
+                        lambda self: setattr(self, "window_rects", [QRect(120, 100, 280, 200)]))
+    overlay = snipper.Snipper(ICONS_PATH, mode="window", frame=ui_frame())
+    yield overlay
+    overlay.release_capture()
+
+def test_uncomposited_window_mode_crops_frozen_frame(window_snipper):
+    assert window_snipper.original_pixmap is not None
+    captured = []
+    window_snipper.captured_signal.connect(lambda pixmap, mode: captured.append(pixmap))
+    window_snipper.update_selection(QPointF(200, 150))
+    assert window_snipper.selection_rect_item.isVisible()
+    window_snipper.finish_selection(QPointF(200, 150))
+    assert captured and captured[0].width() == 280 and captured[0].height() == 200
+    assert captured[0].toImage().pixelColor(10, 10).red() == 220
+
+def test_click_outside_windows_does_not_start_latency(window_snipper):
+    latency.cancel("release_to_editor")
+    window_snipper.finish_selection(QPointF(600, 450))
+    assert "release_to_editor" not in latency.pending
+
+def test_list_windows_reports_x11_window_geometry(xvfb_display):
+    xlib = windows.load_xlib()
+    xlib.XCreateSimpleWindow.restype = c_ulong
+    xlib.XCreateSimpleWindow.argtypes = [c_void_p, c_ulong, c_int, c_int, c_uint, c_uint, c_uint, c_ulong, c_ulong]
+    xlib.XMapWindow.argtypes = [c_void_p, c_ulong]
+    xlib.XSync.argtypes = [c_void_p, c_int]
+    display = xlib.XOpenDisplay(None)
+    assert display
+    try:
+        root = xlib.XDefaultRootWindow(display)
+        window = xlib.XCreateSimpleWindow(display, root, 100, 120, 300, 200, 0, 0, 0)
+        xlib.XMapWindow(display, window)
+        xlib.XSync(display, 0)
+        rects = windows.list_windows()
+        assert QRect(100, 120, 300, 200) in rects
+        assert windows.window_at(rects, QPoint(150, 150)) == QRect(100, 120, 300, 200)
+        assert windows.window_at(rects, QPoint(50, 50)) is None
+        assert not windows.compositing_active()
+    finally:
+        xlib.XCloseDisplay(display)